@@ -1,88 +1,184 @@
-from flask import Flask, render_template, request, jsonify, session, redirect
-from flask_socketio import SocketIO, emit
-import google.generativeai as genai
+from flask import Flask, render_template, request, jsonify, session, redirect, send_file, abort
+from flask_socketio import SocketIO
 import speech_recognition as sr
-import pyttsx3
 from gtts import gTTS
-import json
 import uuid
 import os
 from datetime import datetime
 import threading
 import time
-import tempfile
-import base64
-import io
 import wave
 import numpy as np
-from pydub import AudioSegment
 import re
+import atexit
+from question_prefetch import QuestionPrefetcher
+from llm_backend import create_llm_backend
+from llm_client import LLMClient, LLMUnavailableError
+from question_bank import QuestionBank
+from question_dedupe import QuestionDeduper
+from job_executor import JobExecutor, PoolSaturatedError
+from audio_stream import AudioStream, StreamLimitError, split_utterances, SAMPLE_RATE, SAMPLE_WIDTH
+from tts_cache import TTSCache
+from tts_service import TTSRenderService
+from warmup import Warmup, WarmupStage
+from stt_engines import create_stt_router
+from speech_utils import split_into_segments, SegmentSequencer, decode_audio_payload
+from session_store import create_session_store
+from interview_session import InterviewSession
+from domains import DOMAINS, canonical_difficulty
+from evaluation import stream_evaluation, unscored_evaluation, EvaluationError
+from prompts import PromptBuilder, PromptBudgetError
+from session_reaper import SessionArchive, SessionReaper
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'prepiq-secret-key-2024'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# With several workers behind a load balancer, emits are relayed through a shared message queue
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading',
+                    message_queue=os.environ.get('PREPIQ_SOCKETIO_MESSAGE_QUEUE'))
 
 # Hardcoded Google AI API Key
 GOOGLE_AI_API_KEY = ""
 
-# Configure Google AI
-genai.configure(api_key=GOOGLE_AI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash-exp')
-
-# Initialize speech recognition with optimized settings
-recognizer = sr.Recognizer()
-recognizer.energy_threshold = 300
-recognizer.dynamic_energy_threshold = True
-recognizer.pause_threshold = 0.8
-recognizer.operation_timeout = None
-recognizer.phrase_threshold = 0.3
-recognizer.non_speaking_duration = 0.8
-
-# Initialize text-to-speech engine with optimized settings
-try:
-    tts_engine = pyttsx3.init()
-    voices = tts_engine.getProperty('voices')
-    # Set female voice if available
-    for voice in voices:
-        if 'female' in voice.name.lower() or 'zira' in voice.name.lower() or 'hazel' in voice.name.lower():
-            tts_engine.setProperty('voice', voice.id)
-            break
-    tts_engine.setProperty('rate', 160)
-    tts_engine.setProperty('volume', 0.9)
-except:
-    tts_engine = None
-    print("Warning: pyttsx3 not available, using gTTS only")
-
-# Interview domains with enhanced question categories
-DOMAINS = {
-    'web_development': {
-        'name': 'Web Development',
-        'topics': ['HTML/CSS', 'JavaScript', 'React/Vue', 'Node.js', 'Databases', 'APIs', 'Security', 'Performance'],
-        'difficulty_levels': ['Junior', 'Mid-level', 'Senior'],
-        'focus_areas': ['Frontend', 'Backend', 'Full-stack', 'DevOps']
-    },
-    'ai_ml': {
-        'name': 'AI/Machine Learning',
-        'topics': ['Python', 'TensorFlow/PyTorch', 'Data Science', 'Algorithms', 'Statistics', 'Deep Learning'],
-        'difficulty_levels': ['Entry', 'Intermediate', 'Advanced'],
-        'focus_areas': ['Data Science', 'ML Engineering', 'Research', 'Computer Vision']
-    },
-    'electrical': {
-        'name': 'Core Electrical',
-        'topics': ['Circuit Analysis', 'Power Systems', 'Electronics', 'Control Systems', 'Signal Processing'],
-        'difficulty_levels': ['Graduate', 'Experienced', 'Expert'],
-        'focus_areas': ['Power', 'Electronics', 'Control', 'Communications']
-    },
-    'hr': {
-        'name': 'Human Resources',
-        'topics': ['Recruitment', 'Employee Relations', 'Compliance', 'Performance Management', 'Training'],
-        'difficulty_levels': ['Associate', 'Manager', 'Director'],
-        'focus_areas': ['Talent Acquisition', 'Employee Relations', 'Compensation', 'Learning & Development']
-    }
+# Configure the language model (gemini://model-name, or fake://... for offline load tests). Every call
+# is rate limited, bounded by a deadline and retried, and a failing upstream trips a circuit breaker
+llm = LLMClient(
+    create_llm_backend(api_key=os.environ.get('GOOGLE_AI_API_KEY', GOOGLE_AI_API_KEY)),
+    requests_per_minute=int(os.environ.get('PREPIQ_LLM_RPM', '300')),
+    timeout=float(os.environ.get('PREPIQ_LLM_TIMEOUT', '30')),
+    retries=int(os.environ.get('PREPIQ_LLM_RETRIES', '2')),
+    hedge=os.environ.get('PREPIQ_LLM_HEDGE', '1') == '1',
+    failure_threshold=int(os.environ.get('PREPIQ_LLM_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.environ.get('PREPIQ_LLM_BREAKER_RESET', '30'))
+)
+
+# Prompts open with instructions shared per domain and level, so the provider can cache them, and
+# long answers are trimmed to the token budget, counted with the model's own tokenizer
+prompt_builder = PromptBuilder(
+    max_tokens=int(os.environ.get('PREPIQ_PROMPT_MAX_TOKENS', '2000')),
+    answer_tokens=int(os.environ.get('PREPIQ_PROMPT_ANSWER_TOKENS', '1000')),
+    count_tokens=llm.count_tokens
+)
+
+# Speech recognition engines (PREPIQ_STT_ENGINES) load their models once, into pools of warm instances
+stt_router = create_stt_router()
+
+# Offline text-to-speech fallback: each pyttsx3 engine runs in its own supervised worker process
+tts_service = TTSRenderService(
+    processes=int(os.environ.get('PREPIQ_TTS_PROCESSES', '2')),
+    timeout=float(os.environ.get('PREPIQ_TTS_TIMEOUT', '30')),
+    rate=160,
+    volume=0.9
+)
+atexit.register(tts_service.shutdown)
+
+# Store active interview sessions (memory://, sqlite:///path.db or redis://host:port/db)
+session_store = create_session_store()
+
+TOTAL_QUESTIONS = 10
+
+# Questions are read aloud unless disabled (e.g. for load tests against the fake LLM backend)
+TTS_ENABLED = os.environ.get('PREPIQ_TTS_ENABLED', '1') == '1'
+
+# Pause after feedback is shown before the next question is pushed
+NEXT_QUESTION_DELAY = float(os.environ.get('PREPIQ_NEXT_QUESTION_DELAY', '0.5'))
+
+# Slow Gemini, speech and decode work runs on bounded pools, not the Socket.IO handler threads
+job_executor = JobExecutor()
+
+
+# Generated questions are banked per domain, level and topic and reused by later interviews
+question_bank = QuestionBank(
+    path=os.environ.get('PREPIQ_QUESTION_BANK', 'prepiq_questions.db'),
+    max_age=float(os.environ.get('PREPIQ_QUESTION_BANK_MAX_AGE_DAYS', '30')) * 86400,
+    max_serves=int(os.environ.get('PREPIQ_QUESTION_BANK_MAX_SERVES', '50')),
+    fresh_ratio=float(os.environ.get('PREPIQ_QUESTION_BANK_FRESH_RATIO', '0.1')),
+    min_pool=int(os.environ.get('PREPIQ_QUESTION_BANK_MIN_POOL', '5'))
+)
+
+# Repeats are caught locally, so prompts carry a coverage summary rather than every earlier question
+question_deduper = QuestionDeduper(threshold=float(os.environ.get('PREPIQ_QUESTION_DEDUPE_THRESHOLD', '0.5')))
+
+# Next question is generated while the candidate is still answering the current one. Waiting on it
+# is worthwhile for as long as the model calls behind it (one per dedupe attempt) may take
+question_prefetcher = QuestionPrefetcher(
+    submit=lambda fn: job_executor.submit('llm', fn),
+    wait_timeout=llm.timeout * (question_deduper.max_retries + 1) + 5.0
+)
+
+# Socket.IO event name -> handler(sid, data), shared by the threaded and the ASGI server
+socket_handlers = {}
+
+# Chunked recordings currently being decoded and transcribed, keyed by session
+audio_streams = {}
+audio_streams_lock = threading.Lock()
+
+# Background level of each candidate's microphone, measured on their first recording
+noise_floors = {}
+
+# Synthesized speech is content-addressed, so repeated phrases are rendered once
+tts_cache = TTSCache(root=os.environ.get('PREPIQ_TTS_CACHE_DIR', 'static/audio/cache'),
+                     max_bytes=int(os.environ.get('PREPIQ_TTS_CACHE_MB', '256')) * 1024 * 1024)
+atexit.register(tts_cache.flush)
+
+def abort_audio_streams(sid):
+    """Stop the decoders of recordings a disconnected client never finished"""
+    with audio_streams_lock:
+        abandoned = [session_id for session_id, entry in audio_streams.items() if entry['sid'] == sid]
+        entries = [audio_streams.pop(session_id) for session_id in abandoned]
+    for entry in entries:
+        entry['stream'].abort()
+
+def cleanup_session_resources(session_id):
+    """Release everything a session holds outside the store once it is evicted"""
+    question_prefetcher.discard(session_id)
+    with audio_streams_lock:
+        entry = audio_streams.pop(session_id, None)
+    if entry:
+        entry['stream'].abort()
+    noise_floors.pop(session_id, None)
+
+# Idle and over-age sessions are archived (if finished) and evicted in the background
+session_reaper = SessionReaper(
+    session_store,
+    SessionArchive(os.environ.get('PREPIQ_SESSION_ARCHIVE_DIR', 'archive')),
+    idle_ttl=int(os.environ.get('PREPIQ_SESSION_IDLE_TTL', 1800)),
+    max_age=int(os.environ.get('PREPIQ_SESSION_MAX_AGE', 4 * 3600)),
+    interval=int(os.environ.get('PREPIQ_REAPER_INTERVAL', 60)),
+    on_evict=cleanup_session_resources
+)
+if os.environ.get('PREPIQ_SESSION_REAPER', '1') == '1':
+    session_reaper.start()
+
+UNCLEAR_RESPONSE_TEXT = "I couldn't clearly understand your response. Please try speaking more clearly."
+
+NEXT_STEPS = {
+    'excellent': [
+        "You're performing excellently! Focus on advanced topics and system design.",
+        "Consider mentoring others or contributing to open source projects.",
+        "Prepare for senior-level technical discussions and architecture questions."
+    ],
+    'good': [
+        "Good foundation! Focus on deepening your technical knowledge.",
+        "Practice explaining complex concepts more clearly.",
+        "Work on real-world projects to gain more hands-on experience."
+    ],
+    'foundation': [
+        "Focus on strengthening fundamental concepts.",
+        "Practice basic technical questions daily.",
+        "Consider taking structured courses or bootcamps.",
+        "Build small projects to apply your learning."
+    ]
+}
+
+# Fixed phrases rendered and pinned in the TTS cache during warm-up, for every voice
+FIXED_PHRASES = {
+    'outro': "That completes your interview. Well done! Your detailed report is ready.",
+    'unclear': UNCLEAR_RESPONSE_TEXT,
+    **{f'next_steps_{level}_{index}': text for level, texts in NEXT_STEPS.items() for index, text in enumerate(texts)}
 }
 
-# Store active interview sessions
-active_sessions = {}
+# Phrase name -> audio URL, filled in by warm-up
+phrase_audio = {}
 
 # Create necessary directories
 os.makedirs('static/audio', exist_ok=True)
@@ -110,8 +206,8 @@ def interview(domain):
 
 @app.route('/results/<session_id>')
 def results(session_id):
-    if session_id in active_sessions:
-        session_data = active_sessions[session_id]
+    session_data = session_store.get(session_id)
+    if session_data:
         return render_template('results.html', session_data=session_data)
     return redirect('/')
 
@@ -119,108 +215,251 @@ def results(session_id):
 def static_files(filename):
     return app.send_static_file(filename)
 
-@socketio.on('start_interview')
-def handle_start_interview(data):
+@app.route('/audio/<filename>')
+def cached_audio(filename):
+    path = tts_cache.resolve(filename)
+    if not path:
+        abort(404)
+    # Cache URLs are content hashes, so browsers may keep them forever
+    response = send_file(path, max_age=31536000, conditional=True)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/api/sessions/<session_id>/report')
+def session_report(session_id):
+    """Report so far for a live interview, or the final report once it has ended"""
+    session_data = session_store.get(session_id)
+    if not session_data:
+        abort(404)
+    if session_data.final_report:
+        return jsonify({**session_data.final_report, 'partial': False})
+    return jsonify({**generate_final_report(session_data), 'partial': True})
+
+@app.route('/health')
+def health():
+    """Readiness for load balancers: 503 until warm-up has finished"""
+    report = warmup.health()
+    return jsonify(report), 200 if report['ready'] else 503
+
+@app.route('/api/phrases')
+def phrases():
+    return jsonify({name: {'text': FIXED_PHRASES[name], 'audio_url': url} for name, url in phrase_audio.items()})
+
+@app.route('/api/metrics')
+def metrics():
+    return jsonify({
+        'llm': llm.stats(),
+        'prompts': prompt_builder.stats(),
+        'question_prefetch': question_prefetcher.stats(),
+        'question_bank': question_bank.stats(),
+        'question_dedupe': question_deduper.stats(),
+        'stt': stt_router.stats(),
+        'job_pools': job_executor.stats(),
+        'tts_cache': tts_cache.stats(),
+        'tts_render': tts_service.stats(),
+        'session_store': session_store.stats(),
+        'sessions': session_reaper.stats(),
+        'warmup': warmup.health()
+    })
+
+def submit_job(pool, sid, fn, *args, error_event='error'):
+    """Queue work on a bounded pool, telling the client when the server is saturated"""
+    try:
+        return job_executor.submit(pool, fn, *args)
+    except PoolSaturatedError as e:
+        print(f"⚠️ {e}")
+        message = 'Server is busy right now. Please try again in a moment.'
+        payload = {'error': message} if error_event == 'transcription_error' else {'message': message}
+        payload['code'] = 'server_busy'
+        socketio.emit(error_event, payload, to=sid)
+        return None
+
+def socket_event(event):
+    """Register a Socket.IO handler that takes (sid, data), so the same handlers also serve the ASGI server in asgi.py"""
+    def register(handler):
+        socketio.on_event(event, lambda data=None: handler(request.sid, data))
+        socket_handlers[event] = handler
+        return handler
+    return register
+
+def schedule_next_question(session_id, delay):
+    """Push the next question after a pause, generating it on the LLM pool"""
+    def enqueue():
+        session_data = session_store.get(session_id)
+        if session_data:
+            submit_job('llm', session_data.sid, generate_next_question, session_id)
+    threading.Timer(delay, enqueue).start()
+
+@socket_event('start_interview')
+def handle_start_interview(sid, data):
     session_id = data['session_id']
     domain = data['domain']
-    difficulty = data['difficulty']
+    # The page sends levels lowercased; prompts, cached prefixes and the question bank all use the domain's spelling
+    difficulty = canonical_difficulty(domain, data['difficulty'])
+    if difficulty is None:
+        socketio.emit('error', {'message': 'Unknown domain or difficulty level'}, to=sid)
+        return
     
     print(f"🎯 Starting interview: {domain} - {difficulty} level")
     
     # Initialize session data with enhanced tracking
-    active_sessions[session_id] = {
-        'domain': domain,
-        'difficulty': difficulty,
-        'questions': [],
-        'responses': [],
-        'scores': [],
-        'emotions': [],
-        'start_time': datetime.now(),
-        'current_question': 0,
-        'total_score': 0,
-        'question_categories': [],
-        'response_times': [],
-        'confidence_levels': []
-    }
+    session_store.create(session_id, InterviewSession(sid, domain, difficulty, datetime.now()))
     
     # Generate first question
-    generate_next_question(session_id)
+    submit_job('llm', sid, generate_next_question, session_id)
 
-def generate_next_question(session_id):
-    if session_id not in active_sessions:
-        return
-        
-    session_data = active_sessions[session_id]
-    domain = session_data['domain']
-    difficulty = session_data['difficulty']
-    question_num = session_data['current_question'] + 1
-    
-    # Enhanced prompt for better question generation
-    previous_questions = [q['text'] for q in session_data['questions']]
+def choose_topic(domain, question_num):
+    """Rotate through the domain's topics so an interview covers all of them"""
     topics = DOMAINS[domain]['topics']
+    return topics[(question_num - 1) % len(topics)]
+
+def next_question(domain, difficulty, question_num, asked_questions):
+    """Draw the question from the bank when possible, otherwise write a new one and bank it"""
+    topic = choose_topic(domain, question_num)
+    asked = question_deduper.index_for(asked_questions)
+    banked = question_bank.draw(domain, difficulty, topic, asked.is_duplicate)
+    
+    if banked is None:
+        try:
+            question_data = write_question(domain, difficulty, question_num, asked, topic)
+            question_bank.add(domain, difficulty, question_data['category'], question_data['topic'], question_data['text'])
+            return question_data
+        except LLMUnavailableError as e:
+            # Keep the interview going on banked questions, however old, instead of waiting on the model
+            banked = draw_fallback_question(domain, difficulty, topic, asked)
+            if banked is None:
+                raise
+            print(f"⚠️ Q{question_num} served from the question bank, the model is unavailable: {e}")
+            topic = banked['topic']
+    elif question_bank.needs_top_up(domain, difficulty, topic):
+        top_up_question_bank(domain, difficulty, topic)
     
-    prompt = f"""
-    You are an expert technical interviewer for {DOMAINS[domain]['name']} positions at {difficulty} level.
+    return {
+        'id': question_num,
+        'text': banked['text'],
+        'timestamp': datetime.now().isoformat(),
+        'domain': domain,
+        'difficulty': difficulty,
+        'category': banked['category'],
+        'topic': topic,
+        'bank_id': banked['bank_id']
+    }
+
+def draw_fallback_question(domain, difficulty, topic, asked):
+    """Any banked question not yet asked, preferring the planned topic"""
+    topics = [topic] + [other for other in DOMAINS[domain]['topics'] if other != topic]
+    for candidate in topics:
+        banked = question_bank.draw(domain, difficulty, candidate, asked.is_duplicate, fallback=True)
+        if banked:
+            return banked
+    return None
+
+def write_question(domain, difficulty, question_num, asked, topic):
+    """Generate a question, retrying while it repeats one this interview has already asked"""
+    coverage = asked.coverage_summary()
+    rejected = None
+    for _ in range(question_deduper.max_retries + 1):
+        question_data = generate_question(domain, difficulty, question_num, coverage, topic, avoid=rejected)
+        if question_deduper.check(asked, question_data['text']):
+            return question_data
+        rejected = question_data['text']
     
-    Generate interview question #{question_num} following these guidelines:
+    question_deduper.exhausted()
+    print(f"⚠️ Q{question_num} kept repeating earlier questions; trying other banked topics")
+    for other_topic in DOMAINS[domain]['topics']:
+        banked = question_bank.draw(domain, difficulty, other_topic, asked.is_duplicate)
+        if banked:
+            return {**question_data, 'text': banked['text'], 'category': banked['category'], 'topic': other_topic,
+                    'bank_id': banked['bank_id']}
+    return question_data
+
+def top_up_question_bank(domain, difficulty, topic):
+    """Write one more question for a thin bank entry in the background"""
+    def generate():
+        question_bank.retire_stale()
+        question_data = generate_question(domain, difficulty, 0, 'Not applicable; this question is for a shared pool.', topic)
+        question_bank.add(domain, difficulty, question_data['category'], topic, question_data['text'])
     
-    CONTEXT:
-    - Position: {DOMAINS[domain]['name']} - {difficulty} level
-    - Topics to cover: {', '.join(topics)}
-    - Previous questions: {previous_questions}
+    # Like prefetching, topping up is dropped when the model pool is busy
+    try:
+        job_executor.submit('llm', generate)
+    except PoolSaturatedError:
+        pass
+
+def generate_question(domain, difficulty, question_num, coverage, topic, avoid=None):
+    """Ask Gemini for a single interview question"""
+    # Enhanced prompt for better question generation
+    prompt = prompt_builder.question(domain, difficulty, question_num, topic, coverage, avoid)
     
-    REQUIREMENTS:
-    1. Make it highly relevant to {DOMAINS[domain]['name']}
-    2. Appropriate difficulty for {difficulty} level
-    3. Avoid repeating previous question topics
-    4. Mix technical and behavioral questions
-    5. Be specific and actionable
-    6. Keep it clear and concise (2-3 sentences max)
+    question_text = llm.complete(prompt, 'question').strip()
     
-    QUESTION TYPES TO ROTATE:
-    - Technical implementation
-    - Problem-solving scenarios  
-    - Best practices and methodologies
-    - Experience-based questions
-    - Troubleshooting situations
+    # Clean up the question text
+    question_text = re.sub(r'^["\']|["\']$', '', question_text)
+    question_text = question_text.replace('\n', ' ').strip()
     
-    Generate only the question text, no additional formatting or explanations.
-    """
+    return {
+        'id': question_num,
+        'text': question_text,
+        'timestamp': datetime.now().isoformat(),
+        'domain': domain,
+        'difficulty': difficulty,
+        'category': determine_question_category(question_text),
+        'topic': topic
+    }
+
+def generate_next_question(session_id):
+    session_data = session_store.get(session_id)
+    if not session_data:
+        return
+        
+    domain = session_data.domain
+    difficulty = session_data.difficulty
+    question_num = session_data.current_question + 1
+    asked_questions = session_data.asked_questions()
     
     try:
-        response = model.generate_content(prompt)
-        question_text = response.text.strip()
+        question_data = question_prefetcher.take(session_id, question_num)
+        if question_data is None:
+            question_data = next_question(domain, difficulty, question_num, asked_questions)
+        else:
+            question_data['timestamp'] = datetime.now().isoformat()
+        bank_id = question_data.pop('bank_id', None)
         
-        # Clean up the question text
-        question_text = re.sub(r'^["\']|["\']$', '', question_text)
-        question_text = question_text.replace('\n', ' ').strip()
+        added = {}
         
-        question_data = {
-            'id': question_num,
-            'text': question_text,
-            'timestamp': datetime.now().isoformat(),
-            'domain': domain,
-            'difficulty': difficulty,
-            'category': determine_question_category(question_text)
-        }
+        def add_question(data):
+            # The session may have ended, or another worker served this turn, while we waited on the model
+            added['ok'] = not data.finished and len(data.turns) < question_num
+            if added['ok']:
+                data.add_question(question_data)
         
-        session_data['questions'].append(question_data)
-        session_data['question_categories'].append(question_data['category'])
+        session_data = session_store.update(session_id, add_question)
+        if not session_data or not added['ok']:
+            return
+        if bank_id is not None:
+            question_bank.mark_served(bank_id)
         
-        print(f"📝 Generated Q{question_num}: {question_text[:50]}...")
+        print(f"📝 Generated Q{question_num}: {question_data['text'][:50]}...")
         
-        # Generate TTS audio for the question
-        generate_question_audio(session_id, question_text)
+        # Speculatively generate the following question while this one is answered
+        if question_num < TOTAL_QUESTIONS:
+            question_prefetcher.prefetch(
+                session_id, question_num + 1, next_question,
+                domain, difficulty, question_num + 1, asked_questions + [question_data]
+            )
         
-        emit('new_question', {
+        socketio.emit('new_question', {
             'question': question_data,
             'question_number': question_num,
-            'total_questions': 10
-        })
+            'total_questions': TOTAL_QUESTIONS
+        }, to=session_data.sid)
+        
+        # Generate TTS audio for the question, streamed sentence by sentence
+        generate_question_audio(session_data.sid, question_data['text'], question_num)
         
     except Exception as e:
         print(f"❌ Error generating question: {e}")
-        emit('error', {'message': 'Failed to generate question. Please try again.'})
+        socketio.emit('error', {'message': 'Failed to generate question. Please try again.'}, to=session_data.sid)
 
 def determine_question_category(question_text):
     """Categorize questions for better analytics"""
@@ -237,396 +476,452 @@ def determine_question_category(question_text):
     else:
         return 'General Technical'
 
-def generate_question_audio(session_id, question_text):
-    """Generate high-quality TTS audio with fallback options"""
-    try:
-        audio_filename = f"static/audio/question_{session_id}_{len(active_sessions[session_id]['questions'])}.mp3"
+def generate_question_audio(sid, question_text, question_number):
+    """Synthesize each sentence concurrently and push the clips to the client in order"""
+    if not TTS_ENABLED:
+        socketio.emit('question_text_only', {'text': question_text}, to=sid)
+        return
+    
+    segments = split_into_segments(question_text) or [question_text]
+    delivered = []
+    
+    def send_chunk(index, total, audio_url):
+        delivered.append(audio_url)
+        socketio.emit('question_audio_chunk', {
+            'question_number': question_number,
+            'index': index,
+            'total': total,
+            'audio_url': audio_url,
+            'is_last': index == total - 1
+        }, to=sid)
         
-        # Try gTTS first for better quality
+        # Nothing could be synthesized, let the client fall back to showing the text
+        if index == total - 1 and not any(delivered):
+            socketio.emit('question_text_only', {'text': question_text}, to=sid)
+    
+    sequencer = SegmentSequencer(len(segments), send_chunk)
+    
+    for index, segment in enumerate(segments):
         try:
-            tts = gTTS(text=question_text, lang='en', slow=False, tld='com')
-            tts.save(audio_filename)
-            print(f"🔊 Generated audio with gTTS: {audio_filename}")
-            emit('question_audio', {'audio_url': f"/{audio_filename}"})
-            return
+            future = job_executor.submit('tts', synthesize_speech, segment)
+        except PoolSaturatedError as e:
+            print(f"⚠️ {e}")
+            sequencer.deliver(index, None)
+            continue
+        future.add_done_callback(
+            lambda done, index=index: sequencer.deliver(index, None if done.exception() else done.result())
+        )
+
+def synthesize_speech(text):
+    """Return a cached audio URL for text, rendering with gTTS and falling back to pyttsx3"""
+    # Try gTTS first for better quality
+    try:
+        return render_gtts_audio(text)
+    except Exception as e:
+        print(f"⚠️ gTTS failed: {e}")
+    
+    # Fallback to pyttsx3
+    if tts_service.available:
+        try:
+            return render_pyttsx3_audio(text)
         except Exception as e:
-            print(f"⚠️ gTTS failed: {e}")
-        
-        # Fallback to pyttsx3
-        if tts_engine:
+            print(f"⚠️ pyttsx3 failed: {e}")
+    
+    return None
+
+def render_gtts_audio(text, pin=False):
+    def render(path):
+        gTTS(text=text, lang='en', slow=False, tld='com').save(path)
+    
+    audio_url = tts_cache.get_or_create(text, 'gtts', 'en', 'com', 'normal', render, ext='mp3', pin=pin)
+    print(f"🔊 Audio ready (gTTS): {audio_url}")
+    return audio_url
+
+def render_pyttsx3_audio(text, pin=False):
+    audio_url = tts_cache.get_or_create(text, 'pyttsx3', 'en', tts_service.voice, tts_service.rate,
+                                        lambda path: tts_service.render(text, path), ext='wav', pin=pin)
+    print(f"🔊 Audio ready (pyttsx3): {audio_url}")
+    return audio_url
+
+def prerender_phrases():
+    """Render and pin every fixed phrase with each available voice; gTTS audio is preferred for playback"""
+    voices = [('gtts', render_gtts_audio)]
+    if tts_service.available:
+        voices.append(('pyttsx3', render_pyttsx3_audio))
+    
+    rendered = {}
+    for voice, render in voices:
+        rendered[voice] = 0
+        for name, text in FIXED_PHRASES.items():
             try:
-                wav_filename = audio_filename.replace('.mp3', '.wav')
-                tts_engine.save_to_file(question_text, wav_filename)
-                tts_engine.runAndWait()
-                print(f"🔊 Generated audio with pyttsx3: {wav_filename}")
-                emit('question_audio', {'audio_url': f"/{wav_filename}"})
-                return
+                audio_url = render(text, pin=True)
             except Exception as e:
-                print(f"⚠️ pyttsx3 failed: {e}")
-        
-        # If both fail, send text only
-        emit('question_text_only', {'text': question_text})
-        
-    except Exception as e:
-        print(f"❌ Audio generation failed: {e}")
-        emit('question_text_only', {'text': question_text})
+                print(f"⚠️ Could not pre-render '{name}' with {voice}: {e}")
+                continue
+            phrase_audio.setdefault(name, audio_url)
+            rendered[voice] += 1
+    
+    if not phrase_audio:
+        raise RuntimeError('no phrase could be rendered with any voice')
+    return {'phrases': len(FIXED_PHRASES), 'rendered': rendered}
 
-@socketio.on('transcribe_audio')
-def handle_audio_transcription(data):
+@socket_event('transcribe_audio')
+def handle_audio_transcription(sid, data):
     """Enhanced audio transcription with multiple engine fallback"""
+    session_id = data.get('session_id')
+    print(f"🎤 Processing audio transcription for session {session_id}")
+    
+    submit_job('decode', sid, decode_audio_for_transcription, sid, session_id, data['audio_data'],
+               error_event='transcription_error')
+
+def decode_audio_for_transcription(sid, session_id, audio_payload):
+    """Decode the browser recording to PCM in memory, cut it at silences and fan the segments out to the STT pool"""
     try:
-        session_id = data.get('session_id')
-        print(f"🎤 Processing audio transcription for session {session_id}")
-        
-        # Decode base64 audio data
-        audio_data = base64.b64decode(data['audio_data'].split(',')[1])
-        
-        # Convert WebM to WAV for better compatibility
+        audio = decode_audio_payload(audio_payload)
+        segments, noise_floor = split_utterances(audio.get_raw_data(), noise_floors.get(session_id))
+        if noise_floor is not None:
+            noise_floors.setdefault(session_id, noise_floor)
+    except Exception as e:
+        print(f"❌ Transcription error: {e}")
+        socketio.emit('transcription_error', {'error': 'Transcription failed. Please try again.'}, to=sid)
+        return
+    
+    # Pure silence never reaches the recognizers
+    if not segments:
+        send_transcript(sid, session_id, [])
+        return
+    
+    results = []
+    
+    def collect(index, total, result):
+        # Called strictly in segment order, whatever order the segments finish in
+        results.append(result)
+        if result[0]:
+            socketio.emit('transcription_partial', {
+                'session_id': session_id,
+                'segment': index,
+                'transcript': result[0],
+                'confidence': result[1],
+                'is_final': False
+            }, to=sid)
+        if index == total - 1:
+            send_transcript(sid, session_id, results)
+    
+    sequencer = SegmentSequencer(len(segments), collect)
+    for index, pcm in enumerate(segments):
         try:
-            audio_segment = AudioSegment.from_file(io.BytesIO(audio_data), format="webm")
-            wav_buffer = io.BytesIO()
-            audio_segment.export(wav_buffer, format="wav")
-            wav_buffer.seek(0)
-            audio_data = wav_buffer.getvalue()
-        except Exception as e:
-            print(f"⚠️ Audio conversion warning: {e}")
-        
-        # Save temporary audio file
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-            temp_audio.write(audio_data)
-            temp_audio_path = temp_audio.name
-        
-        transcript = ""
-        confidence = 0.0
+            job_executor.submit('stt', transcribe_upload_segment, sequencer, index, pcm)
+        except PoolSaturatedError:
+            # A busy STT pool slows this answer down rather than dropping part of it
+            transcribe_upload_segment(sequencer, index, pcm)
+
+def transcribe_upload_segment(sequencer, index, pcm):
+    """Recognize one segment of an uploaded answer and hand the result to its sequencer"""
+    try:
+        result = recognize_speech(sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH))
+    except Exception as e:
+        print(f"⚠️ Segment {index} transcription failed: {e}")
+        result = ('', 0.0)
+    sequencer.deliver(index, (*result, len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)))
+
+def send_transcript(sid, session_id, results):
+    """Stitch (transcript, confidence, seconds) segment results in order and send the final transcript"""
+    recognized = [(text, confidence, seconds) for text, confidence, seconds in results if text]
+    transcript = ' '.join(text for text, _, _ in recognized)
+    # Longer segments carry more of the answer, so they weigh more in the overall confidence
+    spoken = sum(seconds for _, _, seconds in recognized)
+    confidence = sum(confidence * seconds for _, confidence, seconds in recognized) / spoken if spoken else 0.0
+    
+    # Same payload whether the segments came from a live stream or a whole uploaded recording
+    result = {
+        'transcript': transcript,
+        'confidence': confidence,
+        'session_id': session_id,
+        'segments': len(results),
+        'segment_confidences': [round(confidence, 2) for _, confidence, _ in results]
+    }
+    if not transcript:
+        result.update(transcript=UNCLEAR_RESPONSE_TEXT, confidence=0.1, audio_url=phrase_audio.get('unclear'))
+    
+    socketio.emit('transcription_result', result, to=sid)
+
+def recognize_speech(audio):
+    """Run the configured engines under the selection policy; returns (transcript, confidence)"""
+    return stt_router.recognize(audio)
+
+@socket_event('audio_stream_start')
+def handle_audio_stream_start(sid, data):
+    """Open a streaming decoder for a new recording"""
+    session_id = data['session_id']
+    entry = {'sid': sid, 'segments': {}}
+    
+    try:
+        entry['stream'] = AudioStream(session_id, lambda index, pcm: queue_segment_transcription(entry, index, pcm),
+                                      container=data.get('format', 'webm'), noise_floor=noise_floors.get(session_id))
+    except Exception as e:
+        print(f"❌ Could not start audio stream: {e}")
+        socketio.emit('transcription_error', {'error': 'Transcription failed. Please try again.'}, to=sid)
+        return
+    
+    with audio_streams_lock:
+        previous = audio_streams.pop(session_id, None)
+        audio_streams[session_id] = entry
+    if previous:
+        previous['stream'].abort()
+    
+    print(f"🎤 Streaming audio for session {session_id}")
+
+@socket_event('audio_chunk')
+def handle_audio_chunk(sid, data):
+    """Feed one sequenced binary chunk of the recording to its decoder"""
+    session_id = data['session_id']
+    entry = audio_streams.get(session_id)
+    if not entry:
+        return
+    
+    try:
+        entry['stream'].add_chunk(int(data['seq']), data['data'])
+    except StreamLimitError as e:
+        print(f"⚠️ Audio stream rejected: {e}")
+        with audio_streams_lock:
+            audio_streams.pop(session_id, None)
+        entry['stream'].abort()
+        socketio.emit('transcription_error', {'error': 'Recording is too long. Please keep answers shorter.'}, to=sid)
+
+@socket_event('audio_end')
+def handle_audio_end(sid, data):
+    """Recording stopped: transcribe the last utterance and send the full transcript"""
+    session_id = data['session_id']
+    entry = audio_streams.get(session_id)
+    if not entry:
+        socketio.emit('transcription_error', {'error': 'Transcription failed. Please try again.'}, to=sid)
+        return
+    
+    if submit_job('decode', sid, finish_audio_stream, session_id, entry, int(data.get('last_seq', -1)),
+                  error_event='transcription_error') is None:
+        with audio_streams_lock:
+            audio_streams.pop(session_id, None)
+        entry['stream'].abort()
+
+def queue_segment_transcription(entry, index, pcm):
+    """Transcribe a finished utterance while the candidate keeps talking"""
+    try:
+        entry['segments'][index] = job_executor.submit('stt', transcribe_segment, entry, index, pcm)
+    except PoolSaturatedError:
+        # Picked up again when the recording ends
+        entry['segments'][index] = pcm
+
+def transcribe_segment(entry, index, pcm):
+    """Recognize one utterance straight from PCM and push it as an interim result"""
+    transcript, confidence = recognize_speech(sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH))
+    if transcript:
+        socketio.emit('transcription_partial', {
+            'session_id': entry['stream'].session_id,
+            'segment': index,
+            'transcript': transcript,
+            'confidence': confidence,
+            'is_final': False
+        }, to=entry['sid'])
+    return transcript, confidence, len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+def finish_audio_stream(session_id, entry, last_seq):
+    """Drain the decoder, wait for outstanding segments and stitch them in order"""
+    try:
+        # Chunks still in flight keep being accepted until the stream is drained
+        entry['stream'].finish(last_seq)
+        with audio_streams_lock:
+            if audio_streams.get(session_id) is entry:
+                audio_streams.pop(session_id)
+        if entry['stream'].segmenter.noise_floor is not None:
+            noise_floors.setdefault(session_id, entry['stream'].segmenter.noise_floor)
         
-        # Try multiple recognition engines for best accuracy
-        with sr.AudioFile(temp_audio_path) as source:
-            # Adjust for ambient noise
-            recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            audio = recognizer.record(source)
-            
-            # Try Google Speech Recognition first (most accurate)
-            try:
-                transcript = recognizer.recognize_google(audio)
-                confidence = 0.9
-                print(f"✅ Google STT: {transcript[:50]}...")
-            except sr.UnknownValueError:
-                print("⚠️ Google STT: Could not understand audio")
-            except sr.RequestError as e:
-                print(f"⚠️ Google STT service error: {e}")
-            
-            # Fallback to Sphinx if Google fails
-            if not transcript:
+        results = []
+        for index in sorted(entry['segments']):
+            pending = entry['segments'][index]
+            if isinstance(pending, bytes):
+                results.append(transcribe_segment(entry, index, pending))
+            else:
                 try:
-                    transcript = recognizer.recognize_sphinx(audio)
-                    confidence = 0.7
-                    print(f"✅ Sphinx STT: {transcript[:50]}...")
+                    results.append(pending.result(timeout=60))
                 except Exception as e:
-                    print(f"⚠️ Sphinx STT failed: {e}")
-            
-            # Last resort: basic audio processing
-            if not transcript:
-                transcript = "I couldn't clearly understand your response. Please try speaking more clearly."
-                confidence = 0.1
+                    print(f"⚠️ Segment {index} transcription failed: {e}")
         
-        # Clean up temporary file
-        try:
-            os.unlink(temp_audio_path)
-        except:
-            pass
-        
-        # Send result back to client
-        emit('transcription_result', {
-            'transcript': transcript,
-            'confidence': confidence,
-            'session_id': session_id
-        })
+        print(f"✅ Streamed transcript ({len(results)} segments, {entry['stream'].decoded_seconds:.1f}s audio)")
+        send_transcript(entry['sid'], session_id, results)
         
     except Exception as e:
         print(f"❌ Transcription error: {e}")
-        emit('transcription_error', {'error': 'Transcription failed. Please try again.'})
+        socketio.emit('transcription_error', {'error': 'Transcription failed. Please try again.'}, to=entry['sid'])
 
-@socketio.on('submit_response')
-def handle_response(data):
+@socket_event('submit_response')
+def handle_response(sid, data):
     session_id = data['session_id']
     response_text = data['response_text']
     emotion_data = data.get('emotion_data', {})
     audio_duration = data.get('audio_duration', 0)
     
-    if session_id not in active_sessions:
-        emit('error', {'message': 'Session not found'})
+    def record_delivery(data):
+        data.sid = sid
+    
+    session_data = session_store.update(session_id, record_delivery)
+    if not session_data:
+        socketio.emit('error', {'message': 'Session not found'}, to=sid)
         return
     
-    session_data = active_sessions[session_id]
-    current_question = session_data['questions'][-1]
+    current_question = session_data.turns[-1].as_question()
     
     print(f"📝 Evaluating response for Q{current_question['id']}: {response_text[:50]}...")
     
-    # Record response time
-    session_data['response_times'].append(audio_duration)
-    session_data['confidence_levels'].append(emotion_data.get('confidence', 0.5))
-    
     # Evaluate response using Gemini
-    evaluate_response(session_id, current_question, response_text, emotion_data, audio_duration)
+    submit_job('llm', sid, evaluate_response, session_id, current_question, response_text, emotion_data, audio_duration)
 
 def evaluate_response(session_id, question, response_text, emotion_data, audio_duration):
     """Enhanced response evaluation with detailed scoring"""
-    session_data = active_sessions[session_id]
-    domain = session_data['domain']
-    difficulty = session_data['difficulty']
-    
-    # Enhanced evaluation prompt
-    evaluation_prompt = f"""
-    You are an expert technical interviewer evaluating a candidate's response for a {DOMAINS[domain]['name']} position at {difficulty} level.
-    
-    INTERVIEW CONTEXT:
-    - Domain: {DOMAINS[domain]['name']}
-    - Level: {difficulty}
-    - Question Category: {question.get('category', 'General')}
-    
-    QUESTION: {question['text']}
-    
-    CANDIDATE'S RESPONSE: {response_text}
-    
-    RESPONSE METADATA:
-    - Duration: {audio_duration} seconds
-    - Confidence Level: {emotion_data.get('confidence', 0.5)}
-    
-    EVALUATION CRITERIA:
-    1. Technical Accuracy (1-10): Correctness of technical content
-    2. Communication Clarity (1-10): How well the response is articulated
-    3. Completeness (1-10): How thoroughly the question is answered
-    4. Depth of Knowledge (1-10): Demonstrates understanding beyond surface level
-    5. Professional Presentation (1-10): Overall interview performance
-    
-    SCORING GUIDELINES:
-    - 9-10: Exceptional, exceeds expectations
-    - 7-8: Strong, meets expectations well
-    - 5-6: Adequate, meets basic expectations
-    - 3-4: Below expectations, needs improvement
-    - 1-2: Poor, significant gaps
-    
-    Provide your evaluation in this exact JSON format:
-    {{
-        "overall_score": 7,
-        "technical_score": 7,
-        "communication_score": 7,
-        "completeness_score": 7,
-        "depth_score": 7,
-        "presentation_score": 7,
-        "strengths": ["specific strength 1", "specific strength 2"],
-        "improvements": ["specific improvement 1", "specific improvement 2"],
-        "detailed_feedback": "Comprehensive feedback explaining the evaluation with specific examples and suggestions for improvement",
-        "key_concepts_covered": ["concept1", "concept2"],
-        "missing_concepts": ["missing1", "missing2"]
-    }}
-    """
+    session_data = session_store.get(session_id)
+    if not session_data:
+        return
+    domain = session_data.domain
+    difficulty = session_data.difficulty
+    
+    def send_partial(kind, field, value):
+        # Scores arrive first, then strengths and improvements, then the feedback text as it is written
+        payload = {'question_number': question['id'], 'field': field}
+        payload['delta' if kind == 'text' else 'value'] = value
+        socketio.emit('response_evaluated_partial', payload, to=session_data.sid)
     
     try:
-        response = model.generate_content(evaluation_prompt)
-        response_text_clean = response.text.strip()
-        
-        # Clean JSON response - improved parsing
-        if '\`\`\`json' in response_text_clean:
-            response_text_clean = response_text_clean.split('\`\`\`json')[1].split('\`\`\`')[0]
-        elif '\`\`\`' in response_text_clean:
-            response_text_clean = response_text_clean.split('\`\`\`')[1]
-        
-        # Remove any extra whitespace and newlines
-        response_text_clean = response_text_clean.strip()
-        
-        # Try to find JSON object in the response
-        import re
-        json_match = re.search(r'\{.*\}', response_text_clean, re.DOTALL)
-        if json_match:
-            response_text_clean = json_match.group()
-        
-        print(f"🔍 Attempting to parse JSON: {response_text_clean[:200]}...")
-        
-        evaluation = json.loads(response_text_clean)
-        
-        # Validate and ensure all required fields
-        required_fields = ['overall_score', 'technical_score', 'communication_score', 'completeness_score']
-        for field in required_fields:
-            if field not in evaluation:
-                evaluation[field] = 5  # Default score
-        
-        # Ensure scores are within valid range
-        for score_field in ['overall_score', 'technical_score', 'communication_score', 'completeness_score']:
-            evaluation[score_field] = max(1, min(10, evaluation[score_field]))
-        
-        # Store response data
-        response_data = {
-            'question_id': question['id'],
-            'response_text': response_text,
-            'evaluation': evaluation,
-            'emotion_data': emotion_data,
-            'audio_duration': audio_duration,
-            'timestamp': datetime.now().isoformat(),
-            'question_category': question.get('category', 'General')
-        }
-        
-        session_data['responses'].append(response_data)
-        session_data['scores'].append(evaluation['overall_score'])
-        session_data['emotions'].append(emotion_data)
-        session_data['total_score'] += evaluation['overall_score']
-        
+        # Enhanced evaluation prompt
+        evaluation_prompt = prompt_builder.evaluation(domain, difficulty, question, response_text, emotion_data, audio_duration)
+        # The streamed reply is validated in full at the end; a bad one gets one repair request, never a made-up score
+        evaluation = stream_evaluation(llm.stream, llm.complete, evaluation_prompt, send_partial)
         print(f"✅ Evaluation complete - Score: {evaluation['overall_score']}/10")
-        
-        emit('response_evaluated', {
-            'evaluation': evaluation,
-            'question_number': question['id'],
-            'cumulative_score': sum(session_data['scores']) / len(session_data['scores'])
-        })
-        
-        # Generate next question or end interview
-        if len(session_data['questions']) < 10:
-            session_data['current_question'] += 1
-            # Add delay for better user experience
-            threading.Timer(3.0, generate_next_question, args=[session_id]).start()
-        else:
-            end_interview(session_id)
-            
-    except (json.JSONDecodeError, ValueError) as e:
-        print(f"❌ JSON parsing error: {e}")
-        print(f"🔍 Raw response: {response_text_clean}")
-        
-        # Create a more robust fallback evaluation
-        fallback_evaluation = {
-            'overall_score': 6,
-            'technical_score': 6,
-            'communication_score': 6,
-            'completeness_score': 6,
-            'depth_score': 6,
-            'presentation_score': 6,
-            'strengths': ['Provided a response', 'Engaged with the question'],
-            'improvements': ['Could provide more technical detail', 'Consider structuring the response better'],
-            'detailed_feedback': 'Your response shows engagement with the question. Consider providing more specific technical details and examples to strengthen your answer.',
-            'key_concepts_covered': ['Basic understanding'],
-            'missing_concepts': ['More detailed explanation needed']
-        }
-        
-        response_data = {
-            'question_id': question['id'],
-            'response_text': response_text,
-            'evaluation': fallback_evaluation,
-            'emotion_data': emotion_data,
-            'audio_duration': audio_duration,
-            'timestamp': datetime.now().isoformat(),
-            'question_category': question.get('category', 'General')
-        }
-        
-        session_data['responses'].append(response_data)
-        session_data['scores'].append(6)
-        session_data['emotions'].append(emotion_data)
-        session_data['total_score'] += 6
-        
-        emit('response_evaluated', {
-            'evaluation': fallback_evaluation,
-            'question_number': question['id'],
-            'cumulative_score': sum(session_data['scores']) / len(session_data['scores'])
-        })
-        
-        # Continue with next question
-        if len(session_data['questions']) < 10:
-            session_data['current_question'] += 1
-            threading.Timer(3.0, generate_next_question, args=[session_id]).start()
-        else:
-            end_interview(session_id)
+    except EvaluationError as e:
+        print(f"❌ Evaluation unusable after repair, leaving the answer unscored: {e}")
+        evaluation = unscored_evaluation(str(e))
+    except LLMUnavailableError as e:
+        print(f"❌ Model unavailable, leaving the answer unscored: {e}")
+        evaluation = unscored_evaluation(str(e))
+    except PromptBudgetError as e:
+        print(f"❌ {e}; leaving the answer unscored")
+        evaluation = unscored_evaluation(str(e))
+    except Exception as e:
+        # Anything else still records the turn, so a failed evaluation never stalls the interview
+        print(f"❌ Evaluation failed, leaving the answer unscored: {e}")
+        evaluation = unscored_evaluation(str(e))
+    
+    record_evaluation(session_id, question, response_text, evaluation, emotion_data, audio_duration)
+
+def record_evaluation(session_id, question, response_text, evaluation, emotion_data, audio_duration):
+    """Store an evaluated turn, send it to the client and move the interview on"""
+    answered_at = datetime.now().isoformat()
+    
+    def add_response(data):
+        if data.record_answer(question['id'], response_text, evaluation, emotion_data, audio_duration, answered_at):
+            if len(data.turns) < TOTAL_QUESTIONS:
+                data.current_question += 1
+    
+    session_data = session_store.update(session_id, add_response)
+    if not session_data:
+        return
+    
+    socketio.emit('response_evaluated', {
+        'evaluation': evaluation,
+        'question_number': question['id'],
+        'cumulative_score': session_data.average_score
+    }, to=session_data.sid)
+    
+    # Generate next question or end interview
+    if len(session_data.turns) < TOTAL_QUESTIONS:
+        # Add delay for better user experience; the next question is already being prefetched
+        schedule_next_question(session_id, NEXT_QUESTION_DELAY)
+    else:
+        end_interview(session_id)
 
 def end_interview(session_id):
     """Generate comprehensive interview completion report"""
-    if session_id not in active_sessions:
+    def finish(data):
+        data.end_time = datetime.now()
+        # Generate comprehensive report
+        data.final_report = generate_final_report(data)
+    
+    session_data = session_store.update(session_id, finish)
+    if not session_data:
         return
-        
-    session_data = active_sessions[session_id]
-    session_data['end_time'] = datetime.now()
     
     print(f"🏁 Ending interview for session {session_id}")
     
-    # Generate comprehensive report
-    generate_final_report(session_id)
-    
-    final_score = session_data['total_score'] / len(session_data['scores']) if session_data['scores'] else 0
+    # Throw away any speculative question for this session
+    question_prefetcher.discard(session_id)
     
-    emit('interview_completed', {
+    socketio.emit('interview_completed', {
         'session_id': session_id,
-        'final_score': final_score,
-        'total_questions': len(session_data['questions'])
-    })
+        'final_score': session_data.average_score,
+        'total_questions': len(session_data.turns),
+        'audio_url': phrase_audio.get('outro')
+    }, to=session_data.sid)
 
-def generate_final_report(session_id):
+def generate_final_report(session_data):
     """Generate detailed analytics and recommendations"""
-    session_data = active_sessions[session_id]
-    
-    # Calculate comprehensive analytics
-    scores = session_data['scores']
-    avg_score = sum(scores) / len(scores) if scores else 0
-    duration = (session_data['end_time'] - session_data['start_time']).total_seconds() / 60
+    # Every figure is read from the running analytics, so this also works mid-interview
+    analytics = session_data.analytics
+    ended_at = session_data.end_time or datetime.now()
+    duration = (ended_at - session_data.start_time).total_seconds() / 60
     
     # Emotion analysis
-    emotion_summary = analyze_emotions(session_data['emotions'])
+    emotion_summary = analyze_emotions(analytics)
     
     # Performance trends
-    performance_trend = analyze_performance_trend(scores)
+    performance_trend = analyze_performance_trend(analytics)
     
     # Category-wise analysis
-    category_analysis = analyze_by_category(session_data['responses'])
+    category_analysis = analyze_by_category(analytics)
     
     # Generate AI-powered recommendations
     recommendations = generate_recommendations(session_data)
     
-    # Response time analysis
-    avg_response_time = sum(session_data['response_times']) / len(session_data['response_times']) if session_data['response_times'] else 0
-    
-    session_data['final_report'] = {
-        'overall_score': avg_score,
+    return {
+        'overall_score': analytics.mean('overall'),
         'duration_minutes': duration,
+        'questions_answered': analytics.answered,
         'emotion_analysis': emotion_summary,
         'recommendations': recommendations,
         'performance_trend': performance_trend,
         'category_analysis': category_analysis,
-        'avg_response_time': avg_response_time,
+        'avg_response_time': analytics.durations.mean,
         'score_breakdown': {
-            'technical': sum([r['evaluation'].get('technical_score', 0) for r in session_data['responses']]) / len(session_data['responses']) if session_data['responses'] else 0,
-            'communication': sum([r['evaluation'].get('communication_score', 0) for r in session_data['responses']]) / len(session_data['responses']) if session_data['responses'] else 0,
-            'completeness': sum([r['evaluation'].get('completeness_score', 0) for r in session_data['responses']]) / len(session_data['responses']) if session_data['responses'] else 0
+            'technical': analytics.mean('technical'),
+            'communication': analytics.mean('communication'),
+            'completeness': analytics.mean('completeness')
         },
-        'strengths_summary': compile_strengths(session_data['responses']),
-        'improvement_areas': compile_improvements(session_data['responses'])
+        'score_spread': {dimension: stat.stddev for dimension, stat in analytics.scores.items() if stat.count},
+        'strengths_summary': compile_strengths(analytics),
+        'improvement_areas': compile_improvements(analytics)
     }
 
-def analyze_emotions(emotions_data):
+def analyze_emotions(analytics):
     """Analyze emotional patterns throughout interview"""
-    if not emotions_data:
+    confidence = analytics.emotions['confidence']
+    if not confidence.count:
         return {'confidence': 0.5, 'nervousness': 0.5, 'engagement': 0.5, 'trend': 'stable'}
     
-    confidences = [e.get('confidence', 0.5) for e in emotions_data]
-    nervousness_levels = [e.get('nervousness', 0.5) for e in emotions_data]
-    engagement_levels = [e.get('engagement', 0.5) for e in emotions_data]
-    
     # Calculate trends
-    confidence_trend = 'improving' if confidences[-1] > confidences[0] else 'declining' if confidences[-1] < confidences[0] else 'stable'
+    confidence_trend = 'improving' if confidence.last > confidence.first else 'declining' if confidence.last < confidence.first else 'stable'
     
     return {
-        'confidence': sum(confidences) / len(confidences),
-        'nervousness': sum(nervousness_levels) / len(nervousness_levels),
-        'engagement': sum(engagement_levels) / len(engagement_levels),
+        'confidence': confidence.mean,
+        'nervousness': analytics.emotions['nervousness'].mean,
+        'engagement': analytics.emotions['engagement'].mean,
         'confidence_trend': confidence_trend,
-        'peak_confidence': max(confidences),
-        'lowest_confidence': min(confidences)
+        'peak_confidence': confidence.maximum,
+        'lowest_confidence': confidence.minimum
     }
 
-def analyze_performance_trend(scores):
+def analyze_performance_trend(analytics):
     """Analyze how performance changed throughout interview"""
-    if len(scores) < 2:
+    if analytics.answered < 2:
         return 'insufficient_data'
     
-    first_half = scores[:len(scores)//2]
-    second_half = scores[len(scores)//2:]
-    
-    first_avg = sum(first_half) / len(first_half)
-    second_avg = sum(second_half) / len(second_half)
+    first_avg, second_avg = analytics.half_averages()
     
     if second_avg > first_avg + 0.5:
         return 'improving'
@@ -635,115 +930,63 @@ def analyze_performance_trend(scores):
     else:
         return 'consistent'
 
-def analyze_by_category(responses):
+def analyze_by_category(analytics):
     """Analyze performance by question category"""
-    category_scores = {}
-    
-    for response in responses:
-        category = response.get('question_category', 'General')
-        score = response['evaluation']['overall_score']
-        
-        if category not in category_scores:
-            category_scores[category] = []
-        category_scores[category].append(score)
-    
-    # Calculate averages
     category_analysis = {}
-    for category, scores in category_scores.items():
+    for category, stat in analytics.categories.items():
         category_analysis[category] = {
-            'average_score': sum(scores) / len(scores),
-            'question_count': len(scores),
-            'best_score': max(scores),
-            'needs_improvement': sum(scores) / len(scores) < 6
+            'average_score': stat.mean,
+            'question_count': stat.count,
+            'best_score': stat.maximum,
+            'needs_improvement': stat.mean < 6
         }
     
     return category_analysis
 
-def compile_strengths(responses):
-    """Compile all strengths mentioned across responses"""
-    all_strengths = []
-    for response in responses:
-        all_strengths.extend(response['evaluation'].get('strengths', []))
-    
-    # Count frequency and return most common
-    strength_counts = {}
-    for strength in all_strengths:
-        strength_counts[strength] = strength_counts.get(strength, 0) + 1
-    
-    return sorted(strength_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+def compile_strengths(analytics):
+    """Most frequently mentioned strengths across responses"""
+    return analytics.strengths.top(5)
 
-def compile_improvements(responses):
-    """Compile all improvement areas mentioned across responses"""
-    all_improvements = []
-    for response in responses:
-        all_improvements.extend(response['evaluation'].get('improvements', []))
-    
-    # Count frequency and return most common
-    improvement_counts = {}
-    for improvement in all_improvements:
-        improvement_counts[improvement] = improvement_counts.get(improvement, 0) + 1
-    
-    return sorted(improvement_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+def compile_improvements(analytics):
+    """Most frequently mentioned improvement areas across responses"""
+    return analytics.improvements.top(5)
 
 def generate_recommendations(session_data):
     """Generate AI-powered personalized recommendations"""
-    domain = session_data['domain']
-    avg_score = sum(session_data['scores']) / len(session_data['scores']) if session_data['scores'] else 0
-    
-    # Collect all feedback
-    weak_areas = []
-    strong_areas = []
-    
-    for response in session_data['responses']:
-        eval_data = response['evaluation']
-        if eval_data['overall_score'] < 6:
-            weak_areas.extend(eval_data.get('improvements', []))
-        else:
-            strong_areas.extend(eval_data.get('strengths', []))
+    domain = session_data.domain
+    analytics = session_data.analytics
+    focus_areas = [area for area, _ in analytics.focus_areas.top(5)]
     
     return {
-        'focus_areas': list(set(weak_areas))[:5],
-        'strengths': list(set(strong_areas))[:5],
-        'study_resources': get_study_resources(domain, weak_areas),
-        'next_steps': generate_next_steps(avg_score, domain),
-        'practice_recommendations': get_practice_recommendations(session_data)
+        'focus_areas': focus_areas,
+        'strengths': [area for area, _ in analytics.strong_areas.top(5)],
+        'study_resources': get_study_resources(domain, focus_areas),
+        'next_steps': generate_next_steps(analytics.mean('overall'), domain),
+        'practice_recommendations': get_practice_recommendations(analytics)
     }
 
 def generate_next_steps(avg_score, domain):
     """Generate specific next steps based on performance"""
     if avg_score >= 8:
-        return [
-            "You're performing excellently! Focus on advanced topics and system design.",
-            "Consider mentoring others or contributing to open source projects.",
-            "Prepare for senior-level technical discussions and architecture questions."
-        ]
+        return NEXT_STEPS['excellent']
     elif avg_score >= 6:
-        return [
-            "Good foundation! Focus on deepening your technical knowledge.",
-            "Practice explaining complex concepts more clearly.",
-            "Work on real-world projects to gain more hands-on experience."
-        ]
+        return NEXT_STEPS['good']
     else:
-        return [
-            "Focus on strengthening fundamental concepts.",
-            "Practice basic technical questions daily.",
-            "Consider taking structured courses or bootcamps.",
-            "Build small projects to apply your learning."
-        ]
+        return NEXT_STEPS['foundation']
 
-def get_practice_recommendations(session_data):
+def get_practice_recommendations(analytics):
     """Get specific practice recommendations"""
     recommendations = []
     
     # Based on response times
-    avg_time = sum(session_data['response_times']) / len(session_data['response_times']) if session_data['response_times'] else 0
+    avg_time = analytics.durations.mean
     if avg_time > 120:  # More than 2 minutes
         recommendations.append("Practice answering questions more concisely")
     elif avg_time < 30:  # Less than 30 seconds
         recommendations.append("Take more time to provide detailed, thoughtful responses")
     
     # Based on confidence levels
-    avg_confidence = sum(session_data['confidence_levels']) / len(session_data['confidence_levels']) if session_data['confidence_levels'] else 0.5
+    avg_confidence = analytics.emotions['confidence'].mean if analytics.answered else 0.5
     if avg_confidence < 0.4:
         recommendations.append("Work on building confidence through more practice interviews")
     
@@ -790,10 +1033,13 @@ def get_study_resources(domain, weak_areas):
     
     return resources.get(domain, [])
 
-@socketio.on('end_interview')
-def handle_end_interview(data):
+@socket_event('end_interview')
+def handle_end_interview(sid, data):
     session_id = data['session_id']
-    if session_id in active_sessions:
+    def rebind(session_data):
+        session_data.sid = sid
+    
+    if session_store.update(session_id, rebind):
         end_interview(session_id)
 
 @socketio.on('connect')
@@ -803,6 +1049,16 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f"❌ Client disconnected: {request.sid}")
+    abort_audio_streams(request.sid)
+
+# Engines, worker processes, client connections and fixed phrases are readied before /health reports ready
+warmup = Warmup([
+    WarmupStage('stt_engines', stt_router.warm),
+    WarmupStage('tts_render', lambda: tts_service.start().stats()),
+    WarmupStage('llm', llm.warm, required=False),
+    WarmupStage('prompt_prefixes', prompt_builder.warm, required=False),
+    WarmupStage('tts_phrases', prerender_phrases, required=False)
+]).start()
 
 if __name__ == '__main__':
     print("🚀 PrepIQ Interview Simulator Starting...")
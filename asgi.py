@@ -0,0 +1,101 @@
+"""
+ASGI server for PrepIQ Interview Simulator
+Serves Socket.IO from an asyncio AsyncServer, so an idle candidate costs a coroutine and a
+socket instead of a Werkzeug thread. The Flask routes are mounted behind it unchanged
+
+Usage:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    python asgi.py
+
+Handlers are the ones app.py registers with socket_event(). They only validate, touch the
+session store and queue work, but the store may be SQLite or Redis, so they run on a small
+thread pool and never on the event loop. Gemini, speech recognition and decoding keep running
+on the bounded job pools, which push their results back through the loop.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+from asgiref.wsgi import WsgiToAsgi
+
+import app as prepiq
+
+MESSAGE_QUEUE = os.environ.get('PREPIQ_SOCKETIO_MESSAGE_QUEUE')
+
+
+class LoopEmitter:
+    """Stands in for the threaded Socket.IO server inside app.py, handing every emit to the event loop"""
+
+    def __init__(self, server):
+        self.server = server
+        self.loop = None
+
+    def emit(self, event, data=None, to=None, namespace='/', skip_sid=None, callback=None, **kwargs):
+        if self.loop is None or self.loop.is_closed():
+            # Nothing is connected before the server starts or after it stops
+            return
+        coroutine = self.server.emit(event, data, to=to, namespace=namespace, skip_sid=skip_sid, callback=callback)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.loop.create_task(coroutine)
+        else:
+            asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+# With a message queue, app.py's emits already travel through it and reach this server like any other
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    client_manager=socketio.AsyncRedisManager(MESSAGE_QUEUE) if MESSAGE_QUEUE else None
+)
+emitter = LoopEmitter(sio)
+if not MESSAGE_QUEUE:
+    prepiq.socketio.server = emitter
+
+handler_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('PREPIQ_ASGI_HANDLER_THREADS', '16')),
+                                      thread_name_prefix='socket-handler')
+
+
+def register(event, handler):
+    async def dispatch(sid, data=None):
+        await asyncio.get_running_loop().run_in_executor(handler_executor, handler, sid, data)
+    sio.on(event, dispatch)
+
+
+for event, handler in prepiq.socket_handlers.items():
+    register(event, handler)
+
+
+@sio.on('connect')
+async def handle_connect(sid, environ, auth=None):
+    print(f"🔗 Client connected: {sid}")
+
+
+@sio.on('disconnect')
+async def handle_disconnect(sid, reason=None):
+    print(f"❌ Client disconnected: {sid}")
+    prepiq.abort_audio_streams(sid)
+
+
+async def startup():
+    emitter.loop = asyncio.get_running_loop()
+    print(f"🚀 PrepIQ ASGI server ready ({len(prepiq.socket_handlers)} Socket.IO events)")
+
+
+async def shutdown():
+    emitter.loop = None
+    handler_executor.shutdown(wait=False)
+
+
+application = socketio.ASGIApp(sio, other_asgi_app=WsgiToAsgi(prepiq.app), on_startup=startup, on_shutdown=shutdown)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(application, host='0.0.0.0', port=5000)
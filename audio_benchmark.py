@@ -0,0 +1,308 @@
+"""
+Audio ingestion benchmark for PrepIQ Interview Simulator
+Times every stage of turning a browser recording into recognizer input, with the Python
+memory peak of each stage, over synthetic WebM/Opus and WAV answers of several lengths
+
+Usage:
+    python audio_benchmark.py -o bench.json
+    python audio_benchmark.py --durations 5 30 --repeats 3 --baseline bench.json --max-regression 0.25
+
+Speech recognition itself is not timed: it is a network call and swamps everything else.
+Pipelines that trim silence report how many seconds of speech they would send to it.
+With --baseline the run exits non-zero when a pipeline's median total time on any fixture
+grows by more than --max-regression compared to the baseline file.
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import speech_recognition as sr
+from pydub import AudioSegment
+
+from audio_stream import SAMPLE_RATE, SAMPLE_WIDTH, split_utterances
+from speech_utils import decode_audio
+
+FIXTURE_RATE = 48000
+DURATIONS = (5, 30, 120)
+FORMATS = ('webm', 'wav')
+MIME_TYPES = {'webm': 'audio/webm;codecs=opus', 'wav': 'audio/wav'}
+
+
+def synthesize_answer(seconds, rate=FIXTURE_RATE, seed=0):
+    """Speech-like 16-bit mono PCM: voiced harmonic bursts separated by pauses, over room noise
+
+    Like a real answer it opens with a second or so of thinking time and ends with the
+    pause before the candidate presses stop.
+    """
+    rng = np.random.default_rng(seed)
+    samples = int(seconds * rate)
+    signal = rng.normal(0, 0.01, samples)
+
+    position = int(min(1.2, seconds * 0.1) * rate)
+    speech_end = samples - int(min(1.5, seconds * 0.1) * rate)
+    while position < speech_end:
+        length = min(int(rng.uniform(0.8, 3.0) * rate), speech_end - position)
+        t = np.arange(length) / rate
+        pitch = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * harmonic * t) / harmonic for harmonic in range(1, 6))
+        # Syllable-rate envelope so energy rises and falls like words
+        envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None)
+        signal[position:position + length] += 0.25 * voiced * envelope
+        position += length + int(rng.uniform(0.2, 0.9) * rate)
+
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def make_fixture(seconds, container):
+    """Data URL shaped exactly like the one the browser sends in transcribe_audio"""
+    segment = AudioSegment(synthesize_answer(seconds), frame_rate=FIXTURE_RATE, sample_width=2, channels=1)
+    buffer = io.BytesIO()
+    if container == 'webm':
+        segment.export(buffer, format='webm', codec='libopus', bitrate='32k')
+    else:
+        segment.export(buffer, format='wav')
+    return f'data:{MIME_TYPES[container]};base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+class StageRecorder:
+    """Collects wall time and, when tracing, the Python heap peak above the stage's starting point"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {}
+        self.peak_bytes = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        yield
+        self.seconds[name] = time.perf_counter() - started
+        if self.trace_memory:
+            self.peak_bytes[name] = tracemalloc.get_traced_memory()[1] - baseline
+
+
+def in_memory_pipeline(payload, stages):
+    """The transcribe_audio path as it runs in app.py today"""
+    with stages.stage('base64_decode'):
+        audio_data = base64.b64decode(payload[payload.find(',') + 1:])
+
+    with stages.stage('decode_pcm'):
+        audio = decode_audio(audio_data)
+
+    with stages.stage('vad'):
+        segments, _ = split_utterances(audio.get_raw_data())
+    return segments
+
+
+def tempfile_pipeline(payload, stages):
+    """The transcribe_audio path before the in-memory decoder, kept as the comparison point"""
+    recognizer = sr.Recognizer()
+    with stages.stage('base64_decode'):
+        audio_data = base64.b64decode(payload.split(',')[1])
+
+    with stages.stage('webm_to_wav'):
+        try:
+            audio_segment = AudioSegment.from_file(io.BytesIO(audio_data), format="webm")
+            wav_buffer = io.BytesIO()
+            audio_segment.export(wav_buffer, format="wav")
+            audio_data = wav_buffer.getvalue()
+        except Exception:
+            pass
+
+    with stages.stage('tempfile_write'):
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
+            temp_audio.write(audio_data)
+            temp_audio_path = temp_audio.name
+
+    try:
+        with sr.AudioFile(temp_audio_path) as source:
+            with stages.stage('ambient_noise'):
+                recognizer.adjust_for_ambient_noise(source, duration=0.5)
+            with stages.stage('record'):
+                audio = recognizer.record(source)
+    finally:
+        os.unlink(temp_audio_path)
+    return audio
+
+
+PIPELINES = {
+    'in_memory': in_memory_pipeline,
+    'tempfile': tempfile_pipeline
+}
+
+
+def summarize(samples, peaks=None):
+    values = [seconds * 1000 for seconds in samples]
+    summary = {
+        'median_ms': round(statistics.median(values), 2),
+        'min_ms': round(min(values), 2),
+        'max_ms': round(max(values), 2)
+    }
+    if peaks is not None:
+        summary['peak_kb'] = round(peaks / 1024, 1)
+    return summary
+
+
+def recognizer_seconds(output):
+    """Seconds of audio a pipeline would hand to the recognizers: one AudioData or a list of PCM segments"""
+    if isinstance(output, sr.AudioData):
+        return len(output.frame_data) / (output.sample_rate * output.sample_width)
+    return sum(len(pcm) for pcm in output) / (SAMPLE_RATE * SAMPLE_WIDTH)
+
+
+def bench(pipeline, payload, repeats):
+    """Time repeats runs untraced, then one traced run for memory, so tracing does not skew the timings"""
+    output = pipeline(payload, StageRecorder())  # also warms caches and the ffmpeg binary
+
+    timings = []
+    for _ in range(repeats):
+        stages = StageRecorder()
+        pipeline(payload, stages)
+        timings.append(stages.seconds)
+
+    traced = StageRecorder(trace_memory=True)
+    tracemalloc.start()
+    try:
+        pipeline(payload, traced)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'recognizer_audio_seconds': round(recognizer_seconds(output), 2),
+        'stages': {name: summarize([run[name] for run in timings], traced.peak_bytes.get(name))
+                   for name in timings[0]},
+        'total': summarize([sum(run.values()) for run in timings], max(traced.peak_bytes.values()))
+    }
+
+
+def ffmpeg_version():
+    try:
+        output = subprocess.run([AudioSegment.converter, '-version'], capture_output=True, text=True).stdout
+        return output.splitlines()[0]
+    except Exception:
+        return 'unknown'
+
+
+def run_suite(pipelines, durations, formats, repeats):
+    results = []
+    for container in formats:
+        for seconds in durations:
+            payload = make_fixture(seconds, container)
+            for name in pipelines:
+                print(f"⏱️ {name} on {seconds}s {container}...")
+                result = {
+                    'pipeline': name,
+                    'fixture': f'{container}-{seconds}s',
+                    'format': container,
+                    'audio_seconds': seconds,
+                    'payload_bytes': len(payload)
+                }
+                try:
+                    result.update(bench(PIPELINES[name], payload, repeats))
+                except Exception as e:
+                    print(f"❌ {name} failed on {seconds}s {container}: {e}")
+                    result['error'] = f'{type(e).__name__}: {e}'
+                results.append(result)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'ffmpeg': ffmpeg_version(),
+            # ffmpeg runs as a child process, so its memory never shows up in the traced peaks
+            'child_max_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        },
+        'repeats': repeats,
+        'results': results
+    }
+
+
+def find_regressions(report, baseline, max_regression):
+    """Pipeline/fixture pairs whose median total grew by more than max_regression, or that now fail"""
+    previous = {(result['pipeline'], result['fixture']): result['total']['median_ms']
+                for result in baseline['results'] if 'error' not in result}
+    regressions = []
+    for result in report['results']:
+        before = previous.get((result['pipeline'], result['fixture']))
+        if 'error' in result:
+            if before:
+                regressions.append({
+                    'pipeline': result['pipeline'],
+                    'fixture': result['fixture'],
+                    'baseline_ms': before,
+                    'error': result['error']
+                })
+            continue
+        after = result['total']['median_ms']
+        if before and after > before * (1 + max_regression):
+            regressions.append({
+                'pipeline': result['pipeline'],
+                'fixture': result['fixture'],
+                'baseline_ms': before,
+                'median_ms': after,
+                'change': round(after / before - 1, 3)
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the audio ingestion path stage by stage')
+    parser.add_argument('--pipelines', nargs='+', choices=sorted(PIPELINES), default=list(PIPELINES))
+    parser.add_argument('--durations', nargs='+', type=int, default=list(DURATIONS), help='fixture lengths in seconds')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--repeats', type=int, default=5, help='timed runs per pipeline and fixture')
+    parser.add_argument('-o', '--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='earlier JSON report to compare median totals against')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    args = parser.parse_args()
+
+    report = run_suite(args.pipelines, args.durations, args.formats, args.repeats)
+
+    for result in report['results']:
+        if 'error' in result:
+            print(f"   {result['pipeline']:10} {result['fixture']:10} failed: {result['error']}")
+            continue
+        stages = '  '.join(f"{name} {summary['median_ms']:.1f}" for name, summary in result['stages'].items())
+        print(f"   {result['pipeline']:10} {result['fixture']:10} total {result['total']['median_ms']:8.1f} ms "
+              f"peak {result['total']['peak_kb']:8.1f} KB   to STT {result['recognizer_audio_seconds']:6.1f}s   {stages}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = find_regressions(report, json.load(f), args.max_regression)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            if 'error' in regression:
+                print(f"❌ {regression['pipeline']} on {regression['fixture']}: {regression['baseline_ms']} ms -> "
+                      f"failed: {regression['error']}")
+                continue
+            print(f"❌ {regression['pipeline']} on {regression['fixture']}: {regression['baseline_ms']} ms -> "
+                  f"{regression['median_ms']} ms (+{regression['change']:.0%})")
+        sys.exit(1)
+    if args.baseline:
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Streaming audio ingestion for PrepIQ Interview Simulator
+Reassembles chunked MediaRecorder uploads, decodes them incrementally with ffmpeg
+and cuts the PCM into utterance segments that can be transcribed while the candidate speaks
+"""
+
+import subprocess
+import threading
+from collections import deque
+
+import numpy as np
+from pydub import AudioSegment
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * SAMPLE_WIDTH
+
+
+def frame_features(pcm):
+    """RMS energy and zero-crossing rate of every whole 30 ms frame of 16-bit mono PCM"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frames = samples[:len(samples) // FRAME_SAMPLES * FRAME_SAMPLES].reshape(-1, FRAME_SAMPLES)
+    as_float = frames.astype(np.float32)
+    energies = np.sqrt(np.mean(as_float * as_float, axis=1))
+    signs = np.signbit(frames)
+    crossings = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (FRAME_SAMPLES - 1)
+    return energies, crossings
+
+
+def estimate_noise_floor(energies):
+    """Background level: the 20th percentile of frame energy"""
+    return float(np.percentile(energies, 20))
+
+
+def speech_mask(energies, crossings, noise_floor, threshold_ratio=3.0, min_threshold=200,
+                fricative_ratio=1.5, fricative_crossings=0.3):
+    """Frames that are loud enough to be voiced speech, or quieter but crossing-heavy like s, f and sh"""
+    threshold = max(min_threshold, noise_floor * threshold_ratio)
+    voiced = energies >= threshold
+    fricative = (energies >= max(min_threshold / 2, noise_floor * fricative_ratio)) & (crossings >= fricative_crossings)
+    return voiced | fricative
+
+
+def utterance_frames(mask, silence_frames, min_speech_frames):
+    """(start, end) frame ranges of speech, bridging gaps shorter than silence_frames"""
+    speech = np.flatnonzero(mask)
+    if not len(speech):
+        return []
+    breaks = np.flatnonzero(np.diff(speech) > silence_frames)
+    starts = np.concatenate(([speech[0]], speech[breaks + 1]))
+    ends = np.concatenate((speech[breaks], [speech[-1]])) + 1
+    cumulative = np.concatenate(([0], np.cumsum(mask)))
+    voiced = cumulative[ends] - cumulative[starts]
+    return [(int(start), int(end)) for start, end, count in zip(starts, ends, voiced) if count >= min_speech_frames]
+
+
+def split_utterances(pcm, noise_floor=None, silence_ms=700, pad_ms=300, min_speech_ms=250, max_segment_seconds=20):
+    """Drop the silence in a whole recording and pack its utterances into segments of at most max_segment_seconds
+
+    Returns (segments, noise_floor). Pass the returned noise floor back in for the
+    same speaker and room to skip re-estimating it.
+    """
+    energies, crossings = frame_features(pcm)
+    if not len(energies):
+        return [], noise_floor
+    if noise_floor is None:
+        noise_floor = estimate_noise_floor(energies)
+
+    pad = pad_ms // FRAME_MS
+    max_frames = max_segment_seconds * 1000 // FRAME_MS
+    view = memoryview(pcm)
+    segments = []
+    current = []
+    current_frames = 0
+    previous_end = 0
+    for start, end in utterance_frames(speech_mask(energies, crossings, noise_floor),
+                                       silence_ms // FRAME_MS, min_speech_ms // FRAME_MS):
+        # Keep a little audio around each utterance so first and last syllables are not clipped
+        start = max(previous_end, start - pad)
+        end = previous_end = min(len(energies), end + pad)
+        for chunk_start in range(start, end, max_frames):
+            chunk_end = min(end, chunk_start + max_frames)
+            if current and current_frames + chunk_end - chunk_start > max_frames:
+                segments.append(b''.join(current))
+                current, current_frames = [], 0
+            current.append(view[chunk_start * FRAME_BYTES:chunk_end * FRAME_BYTES])
+            current_frames += chunk_end - chunk_start
+    if current:
+        segments.append(b''.join(current))
+    return segments, noise_floor
+
+
+class StreamLimitError(Exception):
+    """Raised when a client sends more audio than a single answer may contain"""
+
+
+class EnergySegmenter:
+    """Frame energy and zero-crossing voice activity detection that yields utterance segments"""
+
+    def __init__(self, silence_ms=700, pre_roll_ms=300, min_speech_ms=250, max_segment_seconds=20,
+                 calibration_ms=300, threshold_ratio=3.0, min_threshold=200, noise_floor=None):
+        self.silence_frames = silence_ms // FRAME_MS
+        self.min_speech_frames = min_speech_ms // FRAME_MS
+        self.max_segment_frames = max_segment_seconds * 1000 // FRAME_MS
+        self.calibration_frames = calibration_ms // FRAME_MS
+        self.threshold_ratio = threshold_ratio
+        self.min_threshold = min_threshold
+
+        # Leading audio kept while silent so the first syllable of an utterance is not clipped
+        self.pre_roll = deque(maxlen=pre_roll_ms // FRAME_MS)
+        self.calibration = []
+        # A floor measured earlier in the session skips calibration entirely
+        self.noise_floor = noise_floor
+        self.current = []
+        self.speech_frames = 0
+        self.trailing_silence = 0
+        self.remainder = b''
+
+    def feed(self, pcm):
+        """Consume raw 16-bit mono PCM and return any segments that closed"""
+        data = self.remainder + pcm
+        usable = len(data) - len(data) % FRAME_BYTES
+        self.remainder = data[usable:]
+        if not usable:
+            return []
+
+        energies, crossings = frame_features(data[:usable])
+        if self.noise_floor is None:
+            self.calibration.extend(energies[:self.calibration_frames - len(self.calibration)].tolist())
+            if len(self.calibration) >= self.calibration_frames:
+                self.noise_floor = estimate_noise_floor(self.calibration)
+        if self.noise_floor is None:
+            is_speech = energies >= self.min_threshold
+        else:
+            is_speech = speech_mask(energies, crossings, self.noise_floor, self.threshold_ratio, self.min_threshold)
+
+        segments = []
+        for index, speech in enumerate(is_speech.tolist()):
+            segment = self._push_frame(data[index * FRAME_BYTES:(index + 1) * FRAME_BYTES], speech)
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self):
+        """Close the utterance in progress at end of stream"""
+        if self.remainder and self.current:
+            self.current.append(self.remainder)
+        self.remainder = b''
+        return self._close_segment()
+
+    def _push_frame(self, frame, is_speech):
+        if not self.current:
+            if is_speech:
+                self.current = list(self.pre_roll) + [frame]
+                self.pre_roll.clear()
+                self.speech_frames = 1
+                self.trailing_silence = 0
+            else:
+                self.pre_roll.append(frame)
+            return None
+
+        self.current.append(frame)
+        if is_speech:
+            self.speech_frames += 1
+            self.trailing_silence = 0
+        else:
+            self.trailing_silence += 1
+
+        if self.trailing_silence >= self.silence_frames or len(self.current) >= self.max_segment_frames:
+            return self._close_segment()
+        return None
+
+    def _close_segment(self):
+        segment = b''.join(self.current) if self.speech_frames >= self.min_speech_frames else None
+        self.current = []
+        self.speech_frames = 0
+        self.trailing_silence = 0
+        return segment
+
+
+class AudioStream:
+    """One recording: ordered chunk reassembly, incremental decode and segmentation"""
+
+    def __init__(self, session_id, on_segment, container='webm', max_bytes=20 * 1024 * 1024, reorder_window=64,
+                 noise_floor=None):
+        self.session_id = session_id
+        self.on_segment = on_segment
+        self.max_bytes = max_bytes
+        self.reorder_window = reorder_window
+        self.segmenter = EnergySegmenter(noise_floor=noise_floor)
+        self.segment_count = 0
+        self.received_bytes = 0
+        self.decoded_bytes = 0
+        self.next_seq = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.all_received = threading.Event()
+        self.last_seq = None
+        self.closed = False
+
+        self.process = subprocess.Popen(
+            [AudioSegment.converter, '-loglevel', 'error', '-f', container, '-i', 'pipe:0',
+             '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self.reader = threading.Thread(target=self._read_pcm, daemon=True)
+        self.reader.start()
+
+    def add_chunk(self, seq, data):
+        """Accept a chunk that may arrive out of order; write every contiguous chunk to the decoder"""
+        with self.lock:
+            if self.closed or seq < self.next_seq or seq in self.pending:
+                return
+            if seq - self.next_seq > self.reorder_window:
+                raise StreamLimitError(f"Chunk {seq} is too far ahead of {self.next_seq}")
+
+            self.received_bytes += len(data)
+            if self.received_bytes > self.max_bytes:
+                raise StreamLimitError(f"Recording exceeds {self.max_bytes} bytes")
+
+            self.pending[seq] = data
+            while self.next_seq in self.pending:
+                chunk = self.pending.pop(self.next_seq)
+                try:
+                    self.process.stdin.write(chunk)
+                    self.process.stdin.flush()
+                except (BrokenPipeError, ValueError):
+                    pass
+                self.next_seq += 1
+
+            if self.last_seq is not None and self.next_seq > self.last_seq:
+                self.all_received.set()
+
+    def finish(self, last_seq, timeout=2.0):
+        """Wait briefly for stragglers, then drain the decoder and flush the last utterance
+
+        Returns only once the reader thread has exited, so every segment has been handed to on_segment.
+        """
+        with self.lock:
+            self.last_seq = last_seq
+            if self.next_seq > last_seq:
+                self.all_received.set()
+
+        if not self.all_received.wait(timeout):
+            print(f"⚠️ Audio stream {self.session_id}: missing chunks after {self.next_seq - 1}")
+
+        self.close()
+        self.reader.join(timeout)
+        if self.reader.is_alive():
+            # A wedged decoder is killed, which ends its output and lets the reader drain and exit
+            print(f"⚠️ Audio stream {self.session_id}: decoder did not finish, stopping it")
+            self.process.kill()
+            self.reader.join()
+        # The segmenter is only touched by the reader until it exits
+        tail = self.segmenter.flush()
+        if tail:
+            self._emit_segment(tail)
+
+    def close(self):
+        """Stop accepting chunks and let ffmpeg finish"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.pending.clear()
+            try:
+                self.process.stdin.close()
+            except Exception:
+                pass
+
+    def abort(self):
+        self.close()
+        self.process.kill()
+
+    def _read_pcm(self):
+        while True:
+            pcm = self.process.stdout.read1(FRAME_BYTES * 10)
+            if not pcm:
+                break
+            self.decoded_bytes += len(pcm)
+            for segment in self.segmenter.feed(pcm):
+                self._emit_segment(segment)
+        self.process.wait()
+
+    def _emit_segment(self, pcm):
+        index = self.segment_count
+        self.segment_count += 1
+        try:
+            self.on_segment(index, pcm)
+        except Exception as e:
+            print(f"❌ Segment handler failed: {e}")
+
+    @property
+    def decoded_seconds(self):
+        return self.decoded_bytes / (SAMPLE_RATE * SAMPLE_WIDTH)
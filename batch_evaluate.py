@@ -0,0 +1,168 @@
+"""
+Batch answer evaluation for PrepIQ Interview Simulator
+Re-scores archived interviews, or any JSON lines of question/answer pairs, by packing
+several answers into each Gemini request and fanning requests out under a rate limit
+
+Usage:
+    python batch_evaluate.py archive/sessions-2024-06-01.jsonl -o rescored.jsonl
+    python batch_evaluate.py turns.jsonl --batch-size 8 --concurrency 4 --rpm 120
+
+Plain input lines need domain, difficulty, question and response_text; category,
+audio_duration and confidence are optional and any other fields are copied to the output.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from evaluation import BATCH_EVALUATION_SCHEMA, parse_batch_evaluations, request_evaluation, unscored_evaluation
+from interview_session import InterviewSession
+from llm_backend import create_llm_backend
+from llm_client import LLMClient
+from prompts import PromptBuilder
+from session_store import deserialize_session
+
+
+def load_turns(paths):
+    """Yield one dict per answered turn from session archives or plain turn records"""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = deserialize_session(line)
+                session = record.get('session')
+                if not isinstance(session, InterviewSession):
+                    yield record
+                    continue
+
+                for turn in session.turns:
+                    if not turn.answered:
+                        continue
+                    yield {
+                        'session_id': record['session_id'],
+                        'question_id': turn.question_id,
+                        'domain': session.domain,
+                        'difficulty': session.difficulty,
+                        'question': turn.text,
+                        'category': turn.category,
+                        'response_text': turn.response_text,
+                        'audio_duration': turn.audio_duration,
+                        'confidence': (turn.emotion_data or {}).get('confidence', 0.5),
+                        'previous_score': turn.evaluation['overall_score']
+                    }
+
+
+def make_batches(turns, batch_size):
+    """Group turns that share a domain and level, in input order"""
+    open_batches = {}
+    for turn in turns:
+        key = (turn['domain'], turn['difficulty'])
+        batch = open_batches.setdefault(key, [])
+        batch.append(turn)
+        if len(batch) == batch_size:
+            yield open_batches.pop(key)
+    yield from open_batches.values()
+
+
+class BatchEvaluator:
+    """Scores turns through llm, an LLMClient, so every request passes its one rate limit and is counted there"""
+
+    def __init__(self, llm, batch_size=5, concurrency=4, max_tokens=8000, answer_tokens=1000):
+        self.llm = llm
+        self.prompts = PromptBuilder(max_tokens=max_tokens, answer_tokens=answer_tokens, count_tokens=llm.count_tokens)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        self.counters = {'turns': 0, 'batched': 0, 'single': 0, 'unscored': 0}
+
+    def _count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+    def _generate(self, prompt, purpose, schema=None):
+        return self.llm.complete(prompt, purpose, schema)
+
+    def evaluate_batch(self, turns):
+        """Score a batch in one request; answers the reply leaves out are scored one by one"""
+        domain, difficulty = turns[0]['domain'], turns[0]['difficulty']
+        results = {}
+        if len(turns) > 1:
+            try:
+                reply = self._generate(self.prompts.batch(domain, difficulty, turns), 'batch_evaluation',
+                                       BATCH_EVALUATION_SCHEMA)
+                results = parse_batch_evaluations(reply, len(turns))
+            except Exception as e:
+                print(f"⚠️ Batch of {len(turns)} failed, scoring individually: {e}")
+
+        records = []
+        for index, turn in enumerate(turns):
+            if index in results:
+                evaluation, source = results[index], 'batched'
+            else:
+                evaluation, source = self.evaluate_single(turn)
+            self._count(turns=1, **{source: 1})
+            records.append({**turn, 'evaluation': evaluation, 'source': source})
+        return records
+
+    def evaluate_single(self, turn):
+        """Score one answer with the same prompt and validation as a live interview"""
+        question = {'text': turn['question'], 'category': turn.get('category', 'General')}
+        try:
+            prompt = self.prompts.evaluation(turn['domain'], turn['difficulty'], question, turn['response_text'],
+                                             {'confidence': turn.get('confidence', 0.5)}, turn.get('audio_duration', 0))
+            return request_evaluation(self._generate, prompt), 'single'
+        except Exception as e:
+            print(f"❌ Evaluation failed, leaving the answer unscored: {e}")
+            return unscored_evaluation(str(e)), 'unscored'
+
+    def run(self, turns, output_path):
+        """Evaluate every turn and write one JSON line per result; returns throughput stats"""
+        started = time.time()
+        with open(output_path, 'w') as out, ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self.evaluate_batch, batch) for batch in make_batches(turns, self.batch_size)]
+            for future in as_completed(futures):
+                for record in future.result():
+                    out.write(json.dumps(record) + '\n')
+
+        elapsed = time.time() - started
+        with self.lock:
+            return {
+                **self.counters,
+                'seconds': round(elapsed, 2),
+                'turns_per_second': round(self.counters['turns'] / elapsed, 2) if elapsed else 0.0,
+                'llm': self.llm.stats()['client'],
+                'prompts': self.prompts.stats()['purposes']
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score interview answers in batches')
+    parser.add_argument('inputs', nargs='+', help='session archive or turn JSON lines files')
+    parser.add_argument('-o', '--output', default='evaluations.jsonl')
+    parser.add_argument('--batch-size', type=int, default=5, help='answers packed into one request')
+    parser.add_argument('--concurrency', type=int, default=4, help='requests in flight at once')
+    parser.add_argument('--rpm', type=float, default=60, help='request starts allowed per minute (0 = unlimited)')
+    parser.add_argument('--max-tokens', type=int, default=8000, help='token budget of each request')
+    parser.add_argument('--answer-tokens', type=int, default=1000, help='longer answers are trimmed to this many tokens')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed for each request, retries included')
+    parser.add_argument('--backend', default=None, help='LLM backend URL (default: PREPIQ_LLM_BACKEND or Gemini)')
+    args = parser.parse_args()
+
+    # A burst of one spaces request starts evenly, as a batch job should not spike the shared quota
+    llm = LLMClient(create_llm_backend(args.backend, api_key=os.environ.get('GOOGLE_AI_API_KEY', '')),
+                    requests_per_minute=args.rpm, burst=1, timeout=args.timeout, hedge=False)
+    evaluator = BatchEvaluator(llm, batch_size=args.batch_size, concurrency=args.concurrency,
+                               max_tokens=args.max_tokens, answer_tokens=args.answer_tokens)
+    stats = evaluator.run(load_turns(args.inputs), args.output)
+
+    print(f"✅ Evaluated {stats['turns']} answers in {stats['seconds']}s ({stats['turns_per_second']} turns/sec)")
+    print(json.dumps(stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Interview domains for PrepIQ Interview Simulator
+Shared by the web app and the offline tools
+"""
+
+# Interview domains with enhanced question categories
+DOMAINS = {
+    'web_development': {
+        'name': 'Web Development',
+        'topics': ['HTML/CSS', 'JavaScript', 'React/Vue', 'Node.js', 'Databases', 'APIs', 'Security', 'Performance'],
+        'difficulty_levels': ['Junior', 'Mid-level', 'Senior'],
+        'focus_areas': ['Frontend', 'Backend', 'Full-stack', 'DevOps']
+    },
+    'ai_ml': {
+        'name': 'AI/Machine Learning',
+        'topics': ['Python', 'TensorFlow/PyTorch', 'Data Science', 'Algorithms', 'Statistics', 'Deep Learning'],
+        'difficulty_levels': ['Entry', 'Intermediate', 'Advanced'],
+        'focus_areas': ['Data Science', 'ML Engineering', 'Research', 'Computer Vision']
+    },
+    'electrical': {
+        'name': 'Core Electrical',
+        'topics': ['Circuit Analysis', 'Power Systems', 'Electronics', 'Control Systems', 'Signal Processing'],
+        'difficulty_levels': ['Graduate', 'Experienced', 'Expert'],
+        'focus_areas': ['Power', 'Electronics', 'Control', 'Communications']
+    },
+    'hr': {
+        'name': 'Human Resources',
+        'topics': ['Recruitment', 'Employee Relations', 'Compliance', 'Performance Management', 'Training'],
+        'difficulty_levels': ['Associate', 'Manager', 'Director'],
+        'focus_areas': ['Talent Acquisition', 'Employee Relations', 'Compensation', 'Learning & Development']
+    }
+}
+
+
+def canonical_difficulty(domain, difficulty):
+    """The domain's own spelling of a level chosen in any case ('junior' -> 'Junior'), or None if it has no such level"""
+    levels = DOMAINS.get(domain, {}).get('difficulty_levels', [])
+    return next((level for level in levels if level.lower() == str(difficulty).strip().lower()), None)
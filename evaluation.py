@@ -0,0 +1,373 @@
+"""
+Answer evaluation for PrepIQ Interview Simulator
+Response parsing and score validation shared by the live interview and the batch
+re-scoring tool; the prompts themselves are built in prompts.py
+"""
+
+import json
+import math
+import re
+
+from prompts import build_repair_prompt
+
+SCORE_FIELDS = ['overall_score', 'technical_score', 'communication_score', 'completeness_score', 'depth_score',
+                'presentation_score']
+LIST_FIELDS = ['strengths', 'improvements', 'key_concepts_covered', 'missing_concepts']
+EVALUATION_FIELDS = SCORE_FIELDS + ['strengths', 'improvements', 'detailed_feedback', 'key_concepts_covered',
+                                    'missing_concepts']
+
+# Structured-output schemas, so the model is constrained to the shape validate_evaluation checks
+EVALUATION_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        **{field: {'type': 'integer'} for field in SCORE_FIELDS},
+        **{field: {'type': 'array', 'items': {'type': 'string'}} for field in LIST_FIELDS},
+        'detailed_feedback': {'type': 'string'}
+    },
+    'required': EVALUATION_FIELDS
+}
+
+BATCH_EVALUATION_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {**EVALUATION_SCHEMA['properties'], 'index': {'type': 'integer'}},
+        'required': EVALUATION_FIELDS + ['index']
+    }
+}
+
+# strict=False accepts the raw newlines and tabs models leave inside strings
+JSON_DECODER = json.JSONDecoder(strict=False)
+
+# Strings, escapes and brackets: everything the extractor needs to see, so it can skip over the rest
+JSON_TOKENS = re.compile(r'\\.|["{}\[\]]', re.DOTALL)
+DANGLING_KEY = re.compile(r',?\s*"(?:[^"\\]|\\.)*"\s*:\s*$')
+
+UNSCORED_FEEDBACK = ("We couldn't score this answer automatically, so it is left out of your scores. "
+                     "Your response has been saved.")
+
+
+class EvaluationError(ValueError):
+    """A model reply that does not hold a valid evaluation; problems lists what is wrong with it"""
+
+    def __init__(self, message, problems=None):
+        super().__init__(message)
+        self.problems = problems or [message]
+
+
+def extract_json(raw_text, opener='{'):
+    """Decode the first JSON object (or array, with opener='[') in a model reply
+
+    Prose and code fences around it are skipped. A reply that does not decode as-is is repaired
+    in a single scan: trailing commas are dropped and, if the reply was cut off, the open string,
+    arrays and objects are closed. Raises EvaluationError if nothing usable is found.
+    """
+    start = raw_text.find(opener)
+    if start < 0:
+        raise EvaluationError(f'No JSON {"object" if opener == "{" else "array"} in the reply')
+    try:
+        return JSON_DECODER.raw_decode(raw_text, start)[0]
+    except ValueError:
+        pass
+
+    try:
+        return json.loads(repair_json(raw_text, start), strict=False)
+    except ValueError as e:
+        raise EvaluationError(f'Malformed JSON in the reply: {e}')
+
+
+def repair_json(raw_text, start):
+    """The JSON value starting at start with trailing commas removed and truncation closed"""
+    pieces = []
+    copied = start
+    closers = []
+    in_string = False
+    for match in JSON_TOKENS.finditer(raw_text, start):
+        token = match.group()
+        if in_string:
+            in_string = token != '"'
+            continue
+        if token == '"':
+            in_string = True
+        elif token in '{[':
+            closers.append('}' if token == '{' else ']')
+        elif token in '}]':
+            before = raw_text[copied:match.start()].rstrip()
+            if before.endswith(','):
+                pieces.append(before[:-1])
+                copied = match.start()
+            if closers:
+                closers.pop()
+            if not closers:
+                pieces.append(raw_text[copied:match.end()])
+                return ''.join(pieces)
+
+    # Cut off mid-value: close what is open, dropping a key that never got its value
+    tail = raw_text[copied:]
+    if in_string:
+        tail += '"'
+    tail = DANGLING_KEY.sub('', tail.rstrip()).rstrip().rstrip(',')
+    pieces.append(tail)
+    pieces.extend(reversed(closers))
+    return ''.join(pieces)
+
+
+def request_evaluation(generate, prompt):
+    """Ask for an evaluation in structured-output mode, with one targeted repair request if the reply is unusable
+
+    generate(prompt, purpose, schema) returns the reply text. Raises EvaluationError if the repaired
+    reply is still invalid; no score is ever made up.
+    """
+    raw_text = generate(prompt, 'evaluation', EVALUATION_SCHEMA)
+    try:
+        return parse_evaluation(raw_text)
+    except EvaluationError as e:
+        return repair_evaluation(generate, raw_text, e)
+
+
+def stream_evaluation(stream, generate, prompt, on_event):
+    """Like request_evaluation, but reads the reply as it streams and passes each EvaluationStream event to on_event
+
+    stream(prompt, purpose, schema) yields the reply in pieces. The returned evaluation is validated
+    in full; the events are only a preview of it.
+    """
+    parser = EvaluationStream()
+    chunks = []
+    for chunk in stream(prompt, 'evaluation', EVALUATION_SCHEMA):
+        chunks.append(chunk)
+        if parser is None:
+            continue
+        try:
+            events = parser.feed(chunk)
+        except Exception as e:
+            # The preview is best effort; the full reply is still validated (and repaired) below
+            print(f"⚠️ Evaluation preview stopped, reply could not be parsed incrementally: {e}")
+            parser = None
+            continue
+        for event in events:
+            on_event(*event)
+
+    raw_text = ''.join(chunks)
+    try:
+        return parse_evaluation(raw_text)
+    except EvaluationError as e:
+        return repair_evaluation(generate, raw_text, e)
+
+
+def repair_evaluation(generate, raw_text, error):
+    """One follow-up request naming what was wrong with raw_text; raises EvaluationError if that fails too"""
+    print(f"⚠️ Evaluation reply rejected, asking for a repair: {error}")
+    repaired_text = generate(build_repair_prompt(raw_text, error.problems), 'evaluation_repair', EVALUATION_SCHEMA)
+    return parse_evaluation(repaired_text)
+
+
+class EvaluationStream:
+    """Incremental parser for a streamed evaluation object
+
+    feed() returns the events each chunk completes: ('field', name, value) once a top-level value
+    has fully arrived, and ('text', name, delta) with the newly decoded text of a string field
+    listed in text_fields while it is still being written.
+    """
+
+    def __init__(self, text_fields=('detailed_feedback',)):
+        self.text_fields = text_fields
+        self.text = ''
+        self.position = 0
+        self.state = 'object'
+        self.key = None
+        self.value_start = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        # Pending characters of a \uXXXX escape, and how much of a streamed string was already sent
+        self.unicode_left = 0
+        self.safe_end = 0
+        self.sent = 0
+        self.done = False
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text = self.text
+        index = self.position
+        while index < len(text) and not self.done:
+            character = text[index]
+            state = self.state
+            if state == 'object':
+                if character == '{':
+                    self.state = 'key'
+            elif state == 'key':
+                if character == '"':
+                    self.value_start = index
+                    self.state = 'key_string'
+                elif character == '}':
+                    self.done = True
+            elif state == 'key_string':
+                if self._string_closed(character, index):
+                    self.key = json.loads(text[self.value_start:index + 1], strict=False)
+                    self.state = 'colon'
+            elif state == 'colon':
+                if character == ':':
+                    self.state = 'value'
+            elif state == 'value':
+                if not character.isspace():
+                    self.value_start = index
+                    self.safe_end = self.sent = index + 1
+                    if character == '"':
+                        self.state = 'string'
+                    elif character in '{[':
+                        self.depth = 1
+                        self.state = 'nested'
+                    else:
+                        self.state = 'scalar'
+            elif state == 'string':
+                if self._string_closed(character, index):
+                    self._flush_text(events, index)
+                    self._complete_value(events, index + 1)
+            elif state == 'nested':
+                if self.in_string:
+                    self.in_string = not self._string_closed(character, index)
+                elif character == '"':
+                    self.in_string = True
+                elif character in '{[':
+                    self.depth += 1
+                elif character in '}]':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self._complete_value(events, index + 1)
+            elif state == 'scalar':
+                if character in ',}' or character.isspace():
+                    self._complete_value(events, index)
+                    if character == ',':
+                        self.state = 'key'
+                    elif character == '}':
+                        self.done = True
+            elif state == 'next':
+                if character == ',':
+                    self.state = 'key'
+                elif character == '}':
+                    self.done = True
+            index += 1
+        self.position = index
+
+        if self.state == 'string':
+            self._flush_text(events, self.safe_end)
+        return events
+
+    def _string_closed(self, character, index):
+        """Advance through a string; True at its closing quote. Tracks where complete escapes end"""
+        if self.unicode_left:
+            self.unicode_left -= 1
+        elif self.escaped:
+            self.escaped = False
+            if character == 'u':
+                self.unicode_left = 4
+        elif character == '\\':
+            self.escaped = True
+        elif character == '"':
+            return True
+        if not self.escaped and not self.unicode_left:
+            self.safe_end = index + 1
+        return False
+
+    def _flush_text(self, events, end):
+        if self.key in self.text_fields and end > self.sent:
+            # strict=False: models do write raw newlines and tabs inside strings
+            delta = json.loads('"' + self.text[self.sent:end] + '"', strict=False)
+            if delta and '\ud800' <= delta[-1] <= '\udbff':
+                # First half of an escaped surrogate pair; wait for the second
+                end -= 6
+                delta = delta[:-1]
+            self.sent = end
+            if delta:
+                events.append(('text', self.key, delta))
+
+    def _complete_value(self, events, end):
+        try:
+            value = json.loads(self.text[self.value_start:end], strict=False)
+        except ValueError:
+            value = None
+        if value is not None:
+            events.append(('field', self.key, value))
+        self.state = 'next'
+
+
+def parse_evaluation(raw_text):
+    """Pull the evaluation object out of a model reply; raises EvaluationError if there is no valid one"""
+    return validate_evaluation(extract_json(raw_text))
+
+
+def parse_batch_evaluations(raw_text, count):
+    """Map answer index to its evaluation; answers missing or malformed in the reply are left out"""
+    items = extract_json(raw_text, '[')
+    if not isinstance(items, list):
+        raise EvaluationError('The batch evaluation is not a JSON array')
+
+    results = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.pop('index', position)
+        if not isinstance(index, int) or not 0 <= index < count or index in results:
+            continue
+        try:
+            results[index] = validate_evaluation(item)
+        except (TypeError, ValueError):
+            continue
+    return results
+
+
+def validate_evaluation(evaluation):
+    """Check all eleven fields and coerce near misses; raises EvaluationError listing every problem
+
+    Scores must be numbers (numeric strings are accepted) and are rounded and clamped to 1-10.
+    A missing or non-numeric score is an error, never a default.
+    """
+    if not isinstance(evaluation, dict):
+        raise EvaluationError('The evaluation is not a JSON object')
+
+    problems = []
+    for field in SCORE_FIELDS:
+        value = evaluation.get(field)
+        if isinstance(value, str):
+            try:
+                value = float(value.strip())
+            except ValueError:
+                pass
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            problems.append(f'"{field}" must be a number from 1 to 10, got {json.dumps(value)}'
+                            if field in evaluation else f'"{field}" is missing')
+            continue
+        evaluation[field] = max(1, min(10, int(round(value))))
+
+    for field in LIST_FIELDS:
+        value = evaluation.get(field)
+        if isinstance(value, str):
+            value = [value] if value.strip() else []
+        if not isinstance(value, list):
+            problems.append(f'"{field}" must be a list of strings' if field in evaluation else f'"{field}" is missing')
+            continue
+        evaluation[field] = [str(item).strip() for item in value if item is not None and str(item).strip()]
+
+    feedback = evaluation.get('detailed_feedback')
+    if not isinstance(feedback, str) or not feedback.strip():
+        problems.append('"detailed_feedback" must be a non-empty string' if 'detailed_feedback' in evaluation
+                        else '"detailed_feedback" is missing')
+
+    if problems:
+        raise EvaluationError(f'Invalid evaluation: {"; ".join(problems)}', problems)
+    return evaluation
+
+
+def unscored_evaluation(reason=None):
+    """Placeholder for an answer the model could not score; it carries no scores and stays out of analytics"""
+    return {
+        'scored': False,
+        **{field: None for field in SCORE_FIELDS},
+        'strengths': [],
+        'improvements': [],
+        'detailed_feedback': UNSCORED_FEEDBACK,
+        'key_concepts_covered': [],
+        'missing_concepts': [],
+        **({'error': reason} if reason else {})
+    }
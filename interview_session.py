@@ -0,0 +1,135 @@
+"""
+Interview session model for PrepIQ Interview Simulator
+Holds each interview as slotted objects whose running aggregates are updated as answers
+arrive, so reports never rescan the transcript
+"""
+
+from session_analytics import SessionAnalytics
+from session_store import register_session_model
+
+
+class Turn:
+    """One question and, once answered, the candidate's response and its evaluation"""
+
+    __slots__ = ('question_id', 'text', 'category', 'asked_at',
+                 'response_text', 'evaluation', 'emotion_data', 'audio_duration', 'answered_at', 'topic')
+
+    def __init__(self, question_id, text, category, asked_at, response_text=None, evaluation=None,
+                 emotion_data=None, audio_duration=0.0, answered_at=None, topic=None):
+        self.question_id = question_id
+        self.text = text
+        self.category = category
+        self.asked_at = asked_at
+        self.response_text = response_text
+        self.evaluation = evaluation
+        self.emotion_data = emotion_data
+        self.audio_duration = audio_duration
+        self.answered_at = answered_at
+        self.topic = topic
+
+    @property
+    def answered(self):
+        return self.evaluation is not None
+
+    def as_question(self):
+        """The question as sent to the client and the evaluator"""
+        return {'id': self.question_id, 'text': self.text, 'category': self.category, 'topic': self.topic,
+                'timestamp': self.asked_at}
+
+    def to_list(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+
+@register_session_model
+class InterviewSession:
+    """All state for one interview, with aggregates kept current on every answer"""
+
+    MODEL_NAME = 'interview_session'
+
+    __slots__ = ('sid', 'domain', 'difficulty', 'start_time', 'end_time', 'last_activity',
+                 'current_question', 'final_report', 'turns', 'analytics')
+
+    def __init__(self, sid, domain, difficulty, start_time):
+        self.sid = sid
+        self.domain = domain
+        self.difficulty = difficulty
+        self.start_time = start_time
+        self.end_time = None
+        self.last_activity = None
+        self.current_question = 0
+        self.final_report = None
+        self.turns = []
+        self.analytics = SessionAnalytics()
+
+    @property
+    def finished(self):
+        return self.end_time is not None
+
+    def add_question(self, question_data):
+        """Append a newly asked question"""
+        turn = Turn(question_data['id'], question_data['text'], question_data.get('category', 'General'),
+                    question_data['timestamp'], topic=question_data.get('topic'))
+        self.turns.append(turn)
+        return turn
+
+    def asked_questions(self):
+        return [turn.as_question() for turn in self.turns]
+
+    def turn_for(self, question_id):
+        for turn in reversed(self.turns):
+            if turn.question_id == question_id:
+                return turn
+        return None
+
+    def record_answer(self, question_id, response_text, evaluation, emotion_data, audio_duration, answered_at):
+        """Attach an evaluated answer to its turn and fold it into the running aggregates"""
+        turn = self.turn_for(question_id)
+        if turn is None or turn.answered:
+            return None
+
+        turn.response_text = response_text
+        turn.evaluation = evaluation
+        turn.emotion_data = emotion_data
+        turn.audio_duration = audio_duration
+        turn.answered_at = answered_at
+        if evaluation.get('scored') is False:
+            # The model could not score it; keep the answer but out of every aggregate
+            return turn
+
+        self.analytics.add(evaluation, emotion_data, audio_duration, turn.category)
+        return turn
+
+    @property
+    def average_score(self):
+        return self.analytics.mean('overall')
+
+    def to_dict(self):
+        """Compact, JSON-ready form used by the session store and the archive"""
+        return {
+            '__model__': self.MODEL_NAME,
+            'sid': self.sid,
+            'domain': self.domain,
+            'difficulty': self.difficulty,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'last_activity': self.last_activity,
+            'current_question': self.current_question,
+            'final_report': self.final_report,
+            'turns': [turn.to_list() for turn in self.turns],
+            'analytics': self.analytics.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        session = cls(data['sid'], data['domain'], data['difficulty'], data['start_time'])
+        session.end_time = data['end_time']
+        session.last_activity = data['last_activity']
+        session.current_question = data['current_question']
+        session.final_report = data['final_report']
+        session.turns = [Turn.from_list(values) for values in data['turns']]
+        session.analytics = SessionAnalytics.from_dict(data['analytics'])
+        return session
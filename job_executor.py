@@ -0,0 +1,138 @@
+"""
+Bounded job executor for PrepIQ Interview Simulator
+Keeps slow LLM, speech and decode work off the Socket.IO handler threads
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool's queue is full and the job is rejected"""
+
+    def __init__(self, pool_name, queue_limit):
+        super().__init__(f"Pool '{pool_name}' is saturated ({queue_limit} jobs queued)")
+        self.pool_name = pool_name
+        self.queue_limit = queue_limit
+
+
+class BoundedPool:
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-worker')
+
+        # One slot per running or queued job; a full set of slots means backpressure
+        self.slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=500)
+        self.max_wait = 0.0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue a job, raising PoolSaturatedError instead of blocking when the pool is full"""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise PoolSaturatedError(self.name, self.max_queue)
+
+        submitted_at = time.time()
+        with self.lock:
+            self.queued += 1
+
+        def run():
+            waited = time.time() - submitted_at
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+                self.wait_times.append(waited)
+                self.max_wait = max(self.max_wait, waited)
+            try:
+                result = fn(*args, **kwargs)
+                with self.lock:
+                    self.completed += 1
+                return result
+            except Exception as e:
+                print(f"❌ Job failed in '{self.name}' pool: {e}")
+                with self.lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        def release(future):
+            # Jobs cancelled before starting never ran, so they are still counted as queued
+            if future.cancelled():
+                with self.lock:
+                    self.queued -= 1
+            self.slots.release()
+
+        try:
+            future = self.executor.submit(run)
+        except Exception:
+            with self.lock:
+                self.queued -= 1
+            self.slots.release()
+            raise
+
+        future.add_done_callback(release)
+        return future
+
+    def stats(self):
+        """Queue depth, utilisation and wait-time snapshot"""
+        with self.lock:
+            waits = sorted(self.wait_times)
+            return {
+                'workers': self.max_workers,
+                'queue_limit': self.max_queue,
+                'queue_depth': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                'p95_wait_ms': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 2)
+            }
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
+
+
+# Default pool sizes, overridable with PREPIQ_<POOL>_WORKERS / PREPIQ_<POOL>_QUEUE
+DEFAULT_POOLS = {
+    'llm': {'max_workers': 8, 'max_queue': 32},
+    'stt': {'max_workers': 4, 'max_queue': 16},
+    'tts': {'max_workers': 4, 'max_queue': 16},
+    'decode': {'max_workers': os.cpu_count() or 2, 'max_queue': 16}
+}
+
+
+class JobExecutor:
+    def __init__(self, pools=None):
+        pools = pools or DEFAULT_POOLS
+        self.pools = {}
+        for name, config in pools.items():
+            max_workers = int(os.environ.get(f'PREPIQ_{name.upper()}_WORKERS', config['max_workers']))
+            max_queue = int(os.environ.get(f'PREPIQ_{name.upper()}_QUEUE', config['max_queue']))
+            self.pools[name] = BoundedPool(name, max_workers, max_queue)
+
+    def submit(self, pool_name, fn, *args, **kwargs):
+        """Queue a job on the named pool"""
+        return self.pools[pool_name].submit(fn, *args, **kwargs)
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait=False):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
@@ -0,0 +1,282 @@
+"""
+Language model backends for PrepIQ Interview Simulator
+Every prompt goes through LLMBackend.complete(prompt, purpose, schema, timeout). Gemini is the real
+backend; FakeBackend answers locally with templated output, configurable latency and injected
+failures for load tests. Rate limiting, retries and failover live one layer up, in llm_client.py
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlparse
+
+PURPOSES = ('question', 'evaluation', 'evaluation_repair', 'batch_evaluation')
+
+
+class LLMBackend:
+    """Base class: subclasses implement _complete(prompt, purpose, schema) and return the reply text
+
+    schema, when given, is a JSON schema the reply must follow; backends with a structured-output
+    mode enforce it, the others may ignore it since callers validate replies anyway. Backends that
+    can stream also implement _stream(prompt, purpose, schema), yielding the reply in pieces.
+    timeout, in seconds, bounds the upstream call; a backend raises TimeoutError when it runs out.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def complete(self, prompt, purpose, schema=None, timeout=None):
+        started = time.time()
+        try:
+            reply = self._complete(prompt, purpose, schema, timeout)
+        except Exception:
+            self._record(purpose, time.time() - started, failed=True)
+            raise
+        self._record(purpose, time.time() - started)
+        return reply
+
+    def stream(self, prompt, purpose, schema=None, timeout=None):
+        """Yield the reply text in pieces as it is generated"""
+        started = time.time()
+        first_chunk = None
+        try:
+            for chunk in self._stream(prompt, purpose, schema, timeout):
+                if first_chunk is None:
+                    first_chunk = time.time() - started
+                yield chunk
+        except Exception:
+            self._record(purpose, time.time() - started, failed=True)
+            raise
+        self._record(purpose, time.time() - started, first_chunk=first_chunk)
+
+    def _record(self, purpose, seconds, failed=False, first_chunk=None):
+        with self.lock:
+            counter = self.counters.setdefault(purpose, {'calls': 0, 'failures': 0, 'seconds': 0.0})
+            if failed:
+                counter['failures'] += 1
+                return
+            counter['calls'] += 1
+            counter['seconds'] += seconds
+            if first_chunk is not None:
+                counter['streamed'] = counter.get('streamed', 0) + 1
+                counter['first_chunk_seconds'] = counter.get('first_chunk_seconds', 0.0) + first_chunk
+
+    def _count_tokens(self, purpose, prompt_tokens, output_tokens, cached_tokens=0):
+        with self.lock:
+            counter = self.counters.setdefault(purpose, {'calls': 0, 'failures': 0, 'seconds': 0.0})
+            counter['prompt_tokens'] = counter.get('prompt_tokens', 0) + prompt_tokens
+            counter['output_tokens'] = counter.get('output_tokens', 0) + output_tokens
+            # Prompt tokens the provider served from its cache of recently seen prefixes
+            counter['cached_tokens'] = counter.get('cached_tokens', 0) + cached_tokens
+
+    def _complete(self, prompt, purpose, schema=None, timeout=None):
+        raise NotImplementedError
+
+    def _stream(self, prompt, purpose, schema=None, timeout=None):
+        # Backends without streaming hand over the whole reply at once
+        yield self._complete(prompt, purpose, schema, timeout)
+
+    def count_tokens(self, text):
+        """Prompt tokens text would cost; backends without a tokenizer estimate four characters a token"""
+        return -(-len(text) // 4)
+
+    def warm(self):
+        """Open connections ahead of the first real prompt; nothing to do by default"""
+
+    def stats(self):
+        with self.lock:
+            return {
+                'backend': type(self).__name__,
+                'purposes': {
+                    purpose: {
+                        **counter,
+                        'avg_ms': round(counter['seconds'] / counter['calls'] * 1000, 1) if counter['calls'] else 0.0,
+                        **({'avg_first_chunk_ms': round(counter['first_chunk_seconds'] / counter['streamed'] * 1000, 1)}
+                           if counter.get('streamed') else {})
+                    }
+                    for purpose, counter in self.counters.items()
+                }
+            }
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, model_name='gemini-2.0-flash-exp', api_key=''):
+        super().__init__()
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def _complete(self, prompt, purpose, schema=None, timeout=None):
+        config = {'response_mime_type': 'application/json', 'response_schema': schema} if schema is not None else None
+        response = self.model.generate_content(prompt, generation_config=config,
+                                               request_options={'timeout': timeout} if timeout else None)
+        self._count_usage(purpose, response)
+        return response.text
+
+    def _stream(self, prompt, purpose, schema=None, timeout=None):
+        # JSON mode without the schema: this SDK's Schema has no property_ordering, and with a schema Gemini
+        # writes keys alphabetically, while a streamed reply must follow the prompt's order so scores come
+        # first. The full reply is still validated, and repaired under the schema, once the stream ends
+        config = {'response_mime_type': 'application/json'} if schema is not None else None
+        response = self.model.generate_content(prompt, generation_config=config, stream=True,
+                                               request_options={'timeout': timeout} if timeout else None)
+        for chunk in response:
+            if chunk.candidates and chunk.candidates[0].content.parts:
+                yield chunk.text
+        self._count_usage(purpose, response)
+
+    def _count_usage(self, purpose, response):
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            self._count_tokens(purpose, usage.prompt_token_count, usage.candidates_token_count,
+                               getattr(usage, 'cached_content_token_count', 0) or 0)
+
+    def count_tokens(self, text):
+        return self.model.count_tokens(text, request_options={'timeout': 2}).total_tokens
+
+    def warm(self):
+        # Token counting is free and sets up the client and its connection without generating anything
+        self.model.count_tokens('Warm-up')
+
+
+def parse_latency(spec):
+    """'fixed:0.5', 'uniform:0.5,2', 'normal:1,0.2', 'lognormal:0,0.5' or 'exp:1.2' (seconds) to a sampler"""
+    kind, _, args = spec.partition(':')
+    values = [float(value) for value in args.split(',') if value]
+    samplers = {
+        'fixed': lambda rng: values[0],
+        'uniform': lambda rng: rng.uniform(values[0], values[1]),
+        'normal': lambda rng: rng.gauss(values[0], values[1]),
+        'lognormal': lambda rng: rng.lognormvariate(values[0], values[1]),
+        'exp': lambda rng: rng.expovariate(1 / values[0])
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return samplers[kind]
+
+
+QUESTION_TEMPLATES = [
+    "How would you approach {topic} when {scenario}?",
+    "Describe a time you relied on {topic} because {scenario}. What did you learn?",
+    "Walk me through the trade-offs in {topic} if {scenario}.",
+    "What would you check first in {topic} when {scenario}?",
+    "Explain how you would teach {topic} to a new teammate, given that {scenario}."
+]
+
+SCENARIOS = [
+    "the deadline moves up by a week",
+    "a key stakeholder disagrees with the plan",
+    "the existing documentation is out of date",
+    "requirements change halfway through",
+    "two teams depend on the same resource",
+    "a production incident is still open",
+    "the budget is cut in half",
+    "results have to be shown to leadership tomorrow"
+]
+
+STRENGTHS = ['Clear structure', 'Relevant example', 'Good use of terminology', 'Considered trade-offs']
+IMPROVEMENTS = ['Add a concrete example', 'Quantify the impact', 'Address edge cases', 'Be more concise']
+
+
+class FakeBackend(LLMBackend):
+    """Offline stand-in: templated replies, reproducible for a given seed and prompt
+
+    failure_rate is the share of calls that fail like an overloaded upstream (ConnectionError).
+    """
+
+    def __init__(self, latency=None, seed=0, failure_rate=0.0):
+        super().__init__()
+        self.seed = seed
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.latency = {purpose: parse_latency(spec) for purpose, spec in (latency or {}).items()}
+
+    def _complete(self, prompt, purpose, schema=None, timeout=None):
+        self._wait(self._delay(purpose), timeout)
+        reply = self._reply(prompt, purpose)
+        self._count_tokens(purpose, len(prompt) // 4, len(reply) // 4)
+        return reply
+
+    def _stream(self, prompt, purpose, schema=None, timeout=None):
+        # A fifth of the latency before the first piece, the rest spread over the others
+        delay = self._delay(purpose)
+        deadline = time.monotonic() + timeout if timeout else None
+        reply = self._reply(prompt, purpose)
+        pieces = [reply[start:start + 16] for start in range(0, len(reply), 16)] or ['']
+        self._wait(delay * 0.2, timeout)
+        for piece in pieces:
+            yield piece
+            self._wait(delay * 0.8 / len(pieces), deadline - time.monotonic() if deadline else None)
+        self._count_tokens(purpose, len(prompt) // 4, len(reply) // 4)
+
+    def _wait(self, delay, timeout):
+        if timeout is not None and delay > timeout:
+            time.sleep(max(0.0, timeout))
+            raise TimeoutError(f'No reply within {timeout:.1f}s')
+        time.sleep(delay)
+
+    def _delay(self, purpose):
+        sampler = self.latency.get(purpose)
+        with self.rng_lock:
+            if self.failure_rate and self.rng.random() < self.failure_rate:
+                raise ConnectionError('Injected upstream failure')
+            return max(0.0, sampler(self.rng)) if sampler else 0.0
+
+    def _reply(self, prompt, purpose):
+        # Seeded by the prompt so the same request always gets the same reply
+        digest = hashlib.sha256(f'{self.seed}:{prompt}'.encode('utf-8')).digest()
+        rng = random.Random(int.from_bytes(digest[:8], 'little'))
+
+        if purpose == 'question':
+            match = re.search(r'Focus topic for this question: (.+)', prompt)
+            topic = match.group(1).strip() if match else 'this area'
+            return rng.choice(QUESTION_TEMPLATES).format(topic=topic, scenario=rng.choice(SCENARIOS))
+        if purpose in ('evaluation', 'evaluation_repair'):
+            return json.dumps(self._evaluation(rng))
+        if purpose == 'batch_evaluation':
+            count = len(re.findall(r'^\s*ANSWER \d+:', prompt, re.MULTILINE))
+            return json.dumps([{**self._evaluation(rng), 'index': index} for index in range(count)])
+        return 'OK'
+
+    @staticmethod
+    def _evaluation(rng):
+        overall = rng.randint(4, 9)
+        score = lambda: max(1, min(10, overall + rng.randint(-1, 1)))
+        return {
+            'overall_score': overall,
+            'technical_score': score(),
+            'communication_score': score(),
+            'completeness_score': score(),
+            'depth_score': score(),
+            'presentation_score': score(),
+            'strengths': rng.sample(STRENGTHS, 2),
+            'improvements': rng.sample(IMPROVEMENTS, 2),
+            'detailed_feedback': 'Generated by the offline test backend.',
+            'key_concepts_covered': [],
+            'missing_concepts': []
+        }
+
+
+def create_llm_backend(url=None, api_key=''):
+    """Build a backend from a URL: gemini://model-name or fake://?seed=1&failure_rate=0.1&question=lognormal:0,0.5"""
+    url = url or os.environ.get('PREPIQ_LLM_BACKEND', 'gemini://gemini-2.0-flash-exp')
+    parsed = urlparse(url)
+
+    if parsed.scheme == 'gemini':
+        return GeminiBackend(parsed.netloc or 'gemini-2.0-flash-exp', api_key=api_key)
+    if parsed.scheme == 'fake':
+        options = dict(parse_qsl(parsed.query))
+        seed = int(options.pop('seed', 0))
+        failure_rate = float(options.pop('failure_rate', 0))
+        unknown = set(options) - set(PURPOSES)
+        if unknown:
+            raise ValueError(f"Unknown fake backend options: {', '.join(sorted(unknown))}")
+        return FakeBackend(latency=options, seed=seed, failure_rate=failure_rate)
+    raise ValueError(f"Unsupported LLM backend URL: {url}")
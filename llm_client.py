@@ -0,0 +1,312 @@
+"""
+Language model client for PrepIQ Interview Simulator
+Wraps an LLMBackend with everything a shared, rate-limited upstream needs: a token-bucket
+rate limit, an overall deadline per call that every attempt inherits, jittered retries,
+a hedged duplicate request once a call runs past the recent p95 latency, and a circuit
+breaker that fails fast while the upstream is down so callers can serve banked content
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+HEDGED_PURPOSES = ('question', 'evaluation_repair')
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a call cannot be answered: circuit open, deadline passed or retries used up"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling the upstream while the circuit breaker is open"""
+
+
+class DeadlineExceededError(LLMUnavailableError):
+    """Raised when a call's deadline passes before any attempt succeeds"""
+
+
+class LLMRequestError(LLMUnavailableError):
+    """Raised when the upstream answers but cannot serve this request (blocked reply, 4xx); not retried"""
+
+
+def is_retryable(error):
+    """Timeouts, dropped connections, 429 and 5xx answers are worth another attempt"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # google.api_core errors carry the HTTP status as code
+    code = getattr(error, 'code', None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+
+class TokenBucket:
+    """rate tokens per second up to burst; waiting callers reserve their token so they are served in order"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=None):
+        """Take a token, waiting up to timeout seconds; False (and nothing taken) if it would take longer"""
+        if not self.rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait_seconds = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            if timeout is not None and wait_seconds > timeout:
+                return False
+            self.tokens -= 1
+        if wait_seconds:
+            time.sleep(wait_seconds)
+        return True
+
+    def try_acquire(self):
+        return self.acquire(timeout=0.0)
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold upstream failures in a row, then lets one probe through every reset_timeout seconds"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def release(self):
+        """Hand back a probe that did not settle the circuit either way"""
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"⚠️ LLM circuit open after {self.failures} failures; retrying in {self.reset_timeout:.0f}s")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Same complete/stream/warm/stats interface as an LLMBackend, with the protections above"""
+
+    def __init__(self, backend, requests_per_minute=300, burst=10, timeout=30.0, retries=2, backoff=0.5,
+                 hedge=True, hedge_min_samples=20, failure_threshold=5, reset_timeout=30.0, max_workers=16):
+        self.backend = backend
+        self.limiter = TokenBucket(requests_per_minute / 60.0, burst)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # Attempts run here so a hedge can overlap the original and a stuck call can be abandoned
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-attempt')
+        self.lock = threading.Lock()
+        # Latency of recent successful attempts per purpose, for the hedging delay
+        self.latencies = {}
+        self.counters = {'calls': 0, 'succeeded': 0, 'attempts': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0,
+                         'rate_limited': 0, 'deadline_exceeded': 0, 'circuit_rejected': 0, 'failed': 0}
+
+    def _count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def _observe(self, purpose, seconds):
+        with self.lock:
+            self.latencies.setdefault(purpose, deque(maxlen=200)).append(seconds)
+
+    def hedge_delay(self, purpose):
+        """p95 of recent attempt latencies for the purpose; None until there are enough samples"""
+        with self.lock:
+            samples = sorted(self.latencies.get(purpose, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def _admit(self, deadline):
+        """Circuit breaker and rate limit checks every attempt passes before reaching the upstream"""
+        if not self.breaker.allow():
+            self._count('circuit_rejected')
+            raise CircuitOpenError('LLM upstream is failing; circuit open')
+        if not self.limiter.acquire(timeout=deadline - time.monotonic()):
+            self._count('rate_limited')
+            self.breaker.release()
+            raise DeadlineExceededError('LLM rate limit would delay the call past its deadline')
+
+    def _backoff(self, attempt, deadline):
+        """Full-jitter exponential backoff, never sleeping past the deadline"""
+        pause = random.uniform(0, self.backoff * 2 ** attempt)
+        if time.monotonic() + pause >= deadline:
+            return False
+        time.sleep(pause)
+        return True
+
+    def complete(self, prompt, purpose, schema=None, timeout=None):
+        """Reply text for the prompt within timeout seconds (the client default if None)"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._count('calls')
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                if not self._backoff(attempt, deadline):
+                    self._count('deadline_exceeded')
+                    raise DeadlineExceededError(f'No time left to retry the LLM call: {last_error}') from last_error
+                self._count('retries')
+            self._admit(deadline)
+            try:
+                reply = self._attempt(prompt, purpose, schema, deadline)
+            except DeadlineExceededError:
+                self._count('deadline_exceeded')
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self._count('failed')
+                    raise LLMRequestError(f'LLM call rejected: {type(e).__name__}: {e}') from e
+                last_error = e
+                continue
+            self._count('succeeded')
+            return reply
+
+        self._count('failed')
+        raise LLMUnavailableError(f'LLM call failed after {self.retries + 1} attempts: {last_error}') from last_error
+
+    def _call(self, prompt, purpose, schema, deadline):
+        self._count('attempts')
+        settled = False
+        try:
+            reply = self.backend.complete(prompt, purpose, schema, timeout=max(0.1, deadline - time.monotonic()))
+            self.breaker.record_success()
+            settled = True
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+                settled = True
+            raise
+        finally:
+            # A non-retryable error says nothing about the upstream's health, but must not hold the probe
+            if not settled:
+                self.breaker.release()
+        return reply
+
+    def _attempt(self, prompt, purpose, schema, deadline):
+        """One attempt, plus a hedged duplicate if it is still running at the purpose's p95 latency"""
+        started = time.monotonic()
+        pending = {self.executor.submit(self._call, prompt, purpose, schema, deadline)}
+        hedge_at = self.hedge_delay(purpose) if self.hedge and purpose in HEDGED_PURPOSES else None
+        hedged = None
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f'No LLM reply within the deadline ({purpose})')
+            if hedge_at is not None:
+                remaining = min(remaining, max(0.0, started + hedge_at - time.monotonic()))
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    reply = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is hedged:
+                    self._count('hedge_wins')
+                self._observe(purpose, time.monotonic() - started)
+                return reply
+
+            # Still waiting at the p95 mark: race a duplicate if the rate limit has a token to spare
+            if hedge_at is not None and pending and time.monotonic() - started >= hedge_at:
+                if self.limiter.try_acquire():
+                    self._count('hedges')
+                    hedged = self.executor.submit(self._call, prompt, purpose, schema, deadline)
+                    pending.add(hedged)
+                hedge_at = None
+        raise error
+
+    def stream(self, prompt, purpose, schema=None, timeout=None):
+        """Yield the reply in pieces; retried only while nothing has been yielded yet"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._count('calls')
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count('retries')
+            self._admit(deadline)
+            self._count('attempts')
+            yielded = False
+            settled = False
+            try:
+                for chunk in self.backend.stream(prompt, purpose, schema, timeout=max(0.1, deadline - time.monotonic())):
+                    yielded = True
+                    yield chunk
+                self.breaker.record_success()
+                settled = True
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                    settled = True
+                if yielded or not is_retryable(e) or attempt == self.retries or not self._backoff(attempt + 1, deadline):
+                    self._count('failed')
+                    if is_retryable(e):
+                        raise LLMUnavailableError(f'LLM stream failed: {e}') from e
+                    raise LLMRequestError(f'LLM stream rejected: {type(e).__name__}: {e}') from e
+                continue
+            finally:
+                # Also reached when the caller stops reading mid-stream
+                if not settled:
+                    self.breaker.release()
+            self._count('succeeded')
+            return
+
+    def count_tokens(self, text):
+        """The backend's token count; not attempted while the circuit is open"""
+        if self.breaker.state == 'open':
+            raise CircuitOpenError('LLM upstream is failing; circuit open')
+        return self.backend.count_tokens(text)
+
+    def warm(self):
+        self.backend.warm()
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        return {
+            **self.backend.stats(),
+            'client': {
+                **counters,
+                'circuit': self.breaker.state,
+                'hedge_delay_ms': {purpose: round(delay * 1000, 1) for purpose in HEDGED_PURPOSES
+                                   if (delay := self.hedge_delay(purpose)) is not None}
+            }
+        }
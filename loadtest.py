@@ -0,0 +1,209 @@
+"""
+Load generator for PrepIQ Interview Simulator
+Drives simulated candidates through whole interviews over Socket.IO and reports
+p50/p95/p99 latency per stage and completed sessions per second
+
+Usage:
+    PREPIQ_LLM_BACKEND='fake://?question=lognormal:-0.7,0.4&evaluation=lognormal:0,0.4' \\
+        PREPIQ_TTS_ENABLED=0 PREPIQ_NEXT_QUESTION_DELAY=0 python app.py
+    python loadtest.py --url http://localhost:5000 --candidates 50 --questions 3 --ramp 10
+
+The next_question stage includes the server's PREPIQ_NEXT_QUESTION_DELAY pause.
+"""
+
+import argparse
+import base64
+import io
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+import socketio
+
+STAGES = ('first_question', 'transcribe', 'evaluate', 'next_question', 'end_interview')
+SERVER_EVENTS = ('new_question', 'transcription_result', 'transcription_error', 'response_evaluated',
+                 'interview_completed', 'error')
+
+ANSWERS = [
+    "I would start by clarifying the requirements with the stakeholders, then break the work into small milestones.",
+    "In my last project we had a similar problem; we measured first, fixed the largest bottleneck and documented it.",
+    "I would weigh the trade-offs between speed and maintainability and pick the simplest option that meets the goal.",
+    "First I would reproduce the issue, then narrow it down step by step and add a test so it does not come back."
+]
+
+
+def make_answer_audio(seconds=3.0, rate=16000):
+    """WAV data URL with bursts of a voiced tone, roughly the shape of a short spoken answer"""
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 3 * t) > 0)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((signal * 32767).astype(np.int16).tobytes())
+    return 'data:audio/wav;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+class Candidate:
+    """One simulated interviewee with its own Socket.IO connection"""
+
+    def __init__(self, url, domain, difficulty, questions, answer_audio, timeout):
+        self.url = url
+        self.domain = domain
+        self.difficulty = difficulty
+        self.questions = questions
+        self.answer_audio = answer_audio
+        self.timeout = timeout
+        self.session_id = str(uuid.uuid4())
+        self.timings = {stage: [] for stage in STAGES}
+        self.events = queue.Queue()
+        self.client = socketio.Client(reconnection=False)
+        for name in SERVER_EVENTS:
+            self.client.on(name, lambda data=None, name=name: self.events.put((name, data or {})))
+
+    def wait_for(self, *names):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                name, data = self.events.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                raise TimeoutError(f"Timed out waiting for {' or '.join(names)}")
+            if name in names:
+                return name, data
+            if name == 'error':
+                raise RuntimeError(data.get('message', 'server error'))
+
+    def timed(self, stage, started, *names):
+        result = self.wait_for(*names)
+        self.timings[stage].append(time.time() - started)
+        return result
+
+    def run(self):
+        self.client.connect(self.url, wait_timeout=self.timeout)
+        try:
+            started = time.time()
+            self.client.emit('start_interview', {
+                'session_id': self.session_id, 'domain': self.domain, 'difficulty': self.difficulty
+            })
+            _, question = self.timed('first_question', started, 'new_question')
+            total = question.get('total_questions', self.questions)
+
+            for answered in range(1, self.questions + 1):
+                started = time.time()
+                self.client.emit('transcribe_audio', {'session_id': self.session_id, 'audio_data': self.answer_audio})
+                self.timed('transcribe', started, 'transcription_result', 'transcription_error')
+
+                started = time.time()
+                self.client.emit('submit_response', {
+                    'session_id': self.session_id,
+                    'response_text': random.choice(ANSWERS),
+                    'emotion_data': {'confidence': round(random.uniform(0.3, 0.9), 2)},
+                    'audio_duration': random.randint(20, 90)
+                })
+                self.timed('evaluate', started, 'response_evaluated')
+
+                started = time.time()
+                if answered == total:
+                    # The server ends the interview by itself after the last question
+                    self.timed('end_interview', started, 'interview_completed')
+                    return
+                if answered < self.questions:
+                    self.timed('next_question', started, 'new_question')
+
+            started = time.time()
+            self.client.emit('end_interview', {'session_id': self.session_id})
+            self.timed('end_interview', started, 'interview_completed')
+        finally:
+            self.client.disconnect()
+
+
+def percentiles(samples):
+    if not samples:
+        return {'count': 0}
+    values = np.array(samples) * 1000
+    return {
+        'count': len(samples),
+        'p50_ms': round(float(np.percentile(values, 50)), 1),
+        'p95_ms': round(float(np.percentile(values, 95)), 1),
+        'p99_ms': round(float(np.percentile(values, 99)), 1),
+        'max_ms': round(float(values.max()), 1)
+    }
+
+
+def run_load(url, candidates, questions, ramp, domain, difficulty, timeout):
+    answer_audio = make_answer_audio()
+    timings = {stage: [] for stage in STAGES}
+    failures = []
+    lock = threading.Lock()
+
+    def simulate(index):
+        time.sleep(ramp * index / candidates)
+        candidate = Candidate(url, domain, difficulty, questions, answer_audio, timeout)
+        try:
+            candidate.run()
+            ok = True
+        except Exception as e:
+            ok = False
+            with lock:
+                failures.append(f'{type(e).__name__}: {e}')
+        with lock:
+            for stage, samples in candidate.timings.items():
+                timings[stage].extend(samples)
+        return ok
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=candidates) as executor:
+        completed = sum(executor.map(simulate, range(candidates)))
+    elapsed = time.time() - started
+
+    return {
+        'candidates': candidates,
+        'questions_per_candidate': questions,
+        'completed_sessions': completed,
+        'failed_sessions': len(failures),
+        'failure_samples': failures[:5],
+        'seconds': round(elapsed, 2),
+        'sessions_per_second': round(completed / elapsed, 3) if elapsed else 0.0,
+        'stages': {stage: percentiles(samples) for stage, samples in timings.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive simulated candidates through PrepIQ interviews')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--candidates', type=int, default=10, help='concurrent simulated candidates')
+    parser.add_argument('--questions', type=int, default=3, help='questions each candidate answers before ending')
+    parser.add_argument('--ramp', type=float, default=5.0, help='seconds over which candidates start')
+    parser.add_argument('--domain', default='web_development')
+    parser.add_argument('--difficulty', default='junior', help='level as the interview page sends it (lowercase)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for any one server reply')
+    parser.add_argument('-o', '--output', help='also write the report to this JSON file')
+    args = parser.parse_args()
+
+    report = run_load(args.url, args.candidates, args.questions, args.ramp, args.domain, args.difficulty, args.timeout)
+    try:
+        report['server_metrics'] = requests.get(f'{args.url}/api/metrics', timeout=5).json()
+    except Exception as e:
+        print(f"⚠️ Could not fetch server metrics: {e}")
+
+    print(f"✅ {report['completed_sessions']}/{args.candidates} sessions in {report['seconds']}s "
+          f"({report['sessions_per_second']} sessions/sec)")
+    for stage, summary in report['stages'].items():
+        if summary['count']:
+            print(f"   {stage:15} p50 {summary['p50_ms']:8.1f} ms   p95 {summary['p95_ms']:8.1f} ms   "
+                  f"p99 {summary['p99_ms']:8.1f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+"""
+Prompt templates for PrepIQ Interview Simulator
+Every prompt opens with a static instruction prefix, compiled once per domain and level and
+identical byte for byte across turns and sessions, so the provider can serve it from its prompt
+cache. The per-turn details follow, trimmed so that the prompt stays within its token budget
+"""
+
+import re
+import threading
+import time
+from functools import lru_cache
+
+from domains import DOMAINS
+
+# Rough characters per token for English prose, until the backend's own counts calibrate it
+CHARS_PER_TOKEN = 4
+
+# Prompts estimated above this share of the budget are counted by the backend before they are sent
+MEASURE_ABOVE = 0.8
+
+# After a failed token count, estimate for this long rather than wait on the backend every call
+COUNT_RETRY_SECONDS = 60
+
+# Token counts waited on at once; further prompts use the estimate instead of queueing
+MAX_CONCURRENT_COUNTS = 4
+
+# Trimmed text keeps its opening and its conclusion, which carry most of an answer
+TRIM_HEAD_SHARE = 0.7
+TRIM_MARKER = ' [... {words} words omitted ...] '
+
+# Below this many tokens a trimmed answer is no longer worth scoring
+MIN_ANSWER_TOKENS = 100
+
+
+class PromptBudgetError(ValueError):
+    """Raised when the fixed parts of a prompt leave too little of the budget for the per-turn text"""
+
+
+def estimate_tokens(text, chars_per_token=CHARS_PER_TOKEN):
+    return int(-(-len(text) // chars_per_token))
+
+
+def compile_template(text):
+    """Drop the source indentation and blank-line runs, which would cost tokens on every call"""
+    lines = '\n'.join(line.strip() for line in text.strip().splitlines())
+    return re.sub(r'\n{3,}', '\n\n', lines) + '\n'
+
+
+def fit_text(text, max_tokens, chars_per_token=CHARS_PER_TOKEN):
+    """Text cut to about max_tokens around a marker, keeping its opening and its conclusion"""
+    if estimate_tokens(text, chars_per_token) <= max_tokens:
+        return text
+    budget = max(0, int(max_tokens * chars_per_token) - len(TRIM_MARKER) - 8)
+    head_end = text.rfind(' ', 0, int(budget * TRIM_HEAD_SHARE))
+    tail_start = text.find(' ', len(text) - (budget - max(head_end, 0)))
+    head = text[:max(head_end, 0)]
+    tail = text[tail_start:] if tail_start != -1 else ''
+    omitted = len(text[len(head):len(text) - len(tail)].split())
+    return head.rstrip() + TRIM_MARKER.format(words=omitted) + tail.lstrip()
+
+
+EVALUATION_CRITERIA = """
+EVALUATION CRITERIA:
+1. Technical Accuracy (1-10): Correctness of technical content
+2. Communication Clarity (1-10): How well the response is articulated
+3. Completeness (1-10): How thoroughly the question is answered
+4. Depth of Knowledge (1-10): Demonstrates understanding beyond surface level
+5. Professional Presentation (1-10): Overall interview performance
+
+SCORING GUIDELINES:
+- 9-10: Exceptional, exceeds expectations
+- 7-8: Strong, meets expectations well
+- 5-6: Adequate, meets basic expectations
+- 3-4: Below expectations, needs improvement
+- 1-2: Poor, significant gaps
+"""
+
+EVALUATION_FORMAT = """{{
+  "overall_score": 7,
+  "technical_score": 7,
+  "communication_score": 7,
+  "completeness_score": 7,
+  "depth_score": 7,
+  "presentation_score": 7,
+  "strengths": ["specific strength 1", "specific strength 2"],
+  "improvements": ["specific improvement 1", "specific improvement 2"],
+  "detailed_feedback": "Comprehensive feedback explaining the evaluation with specific examples and suggestions for improvement",
+  "key_concepts_covered": ["concept1", "concept2"],
+  "missing_concepts": ["missing1", "missing2"]{extra}
+}}"""
+
+
+@lru_cache(maxsize=None)
+def question_prefix(domain, difficulty):
+    """Instructions shared by every question written for a domain and level"""
+    domain_name = DOMAINS[domain]['name']
+    return compile_template(f"""
+    You are an expert technical interviewer for {domain_name} positions at {difficulty} level.
+
+    POSITION: {domain_name} - {difficulty} level
+    TOPICS TO COVER: {', '.join(DOMAINS[domain]['topics'])}
+
+    REQUIREMENTS:
+    1. Make it highly relevant to {domain_name}
+    2. Appropriate difficulty for {difficulty} level
+    3. Avoid repeating previous question topics
+    4. Mix technical and behavioral questions
+    5. Be specific and actionable
+    6. Keep it clear and concise (2-3 sentences max)
+
+    QUESTION TYPES TO ROTATE:
+    - Technical implementation
+    - Problem-solving scenarios
+    - Best practices and methodologies
+    - Experience-based questions
+    - Troubleshooting situations
+
+    Generate only the question text, no additional formatting or explanations.
+    """)
+
+
+@lru_cache(maxsize=None)
+def evaluation_prefix(domain, difficulty):
+    """Instructions shared by every single-answer evaluation for a domain and level"""
+    domain_name = DOMAINS[domain]['name']
+    return compile_template(f"""
+    You are an expert technical interviewer evaluating a candidate's response for a {domain_name} position at {difficulty} level.
+    {EVALUATION_CRITERIA}
+    Provide your evaluation in this exact JSON format:
+    """) + EVALUATION_FORMAT.format(extra='') + '\n'
+
+
+@lru_cache(maxsize=None)
+def batch_prefix(domain, difficulty):
+    """Instructions shared by every batch evaluation for a domain and level"""
+    domain_name = DOMAINS[domain]['name']
+    return compile_template(f"""
+    You are an expert technical interviewer evaluating several candidate responses for a {domain_name} position at {difficulty} level.
+    Evaluate every answer independently; do not let one answer influence the score of another.
+    {EVALUATION_CRITERIA}
+    Provide your evaluations as a JSON array with exactly one object per answer, in this exact format:
+    """) + '[\n' + EVALUATION_FORMAT.format(extra=',\n  "index": 0') + '\n]\n'
+
+
+REPAIR_PREFIX = compile_template("""
+    Your previous evaluation could not be used. Return only the corrected evaluation as a single JSON
+    object in this exact format, with every field present and every score a whole number from 1 to 10:
+    """) + EVALUATION_FORMAT.format(extra='') + '\n'
+
+
+def build_repair_prompt(raw_text, problems):
+    """Follow-up asking the model to fix its own reply, naming exactly what was wrong with it"""
+    issues = '\n'.join(f'- {problem}' for problem in problems)
+    return f"{REPAIR_PREFIX}\nPROBLEMS:\n{issues}\n\nYOUR PREVIOUS REPLY:\n{raw_text[:4000]}\n"
+
+
+class PromptBuilder:
+    """Builds the prompts for one process within a token budget and counts what they cost
+
+    max_tokens bounds every prompt and answer_tokens caps any one answer. Only the per-turn text
+    (answers, the coverage summary) is ever trimmed; PromptBudgetError is raised if that is not
+    enough. count_tokens(text), usually the LLM backend's, measures each prefix once and any prompt
+    close to the budget; its counts also calibrate the estimate used for everything else.
+    """
+
+    def __init__(self, max_tokens=2000, answer_tokens=1000, count_tokens=None):
+        self.max_tokens = max_tokens
+        self.answer_tokens = answer_tokens
+        self.count_tokens = count_tokens
+        self.lock = threading.Lock()
+        self.prefix_tokens = {}
+        self.chars_per_token = CHARS_PER_TOKEN
+        self.count_failures = 0
+        self.count_paused_until = 0.0
+        self.counting = threading.BoundedSemaphore(MAX_CONCURRENT_COUNTS)
+        self.counters = {}
+
+    def _measure(self, text):
+        """The backend's token count for text, or None without one (or when it fails)"""
+        if self.count_tokens is None or time.monotonic() < self.count_paused_until:
+            return None
+        if not self.counting.acquire(blocking=False):
+            return None
+        try:
+            return self.count_tokens(text)
+        except Exception as e:
+            with self.lock:
+                self.count_failures += 1
+                self.count_paused_until = time.monotonic() + COUNT_RETRY_SECONDS
+            print(f"⚠️ Token count unavailable, estimating for {COUNT_RETRY_SECONDS}s: {e}")
+            return None
+        finally:
+            self.counting.release()
+
+    def _estimate(self, text):
+        return estimate_tokens(text, self.chars_per_token)
+
+    def _prefix(self, prefix):
+        """Token count of a prefix, measured once and used to calibrate the estimate"""
+        with self.lock:
+            tokens = self.prefix_tokens.get(prefix)
+        if tokens is not None:
+            return tokens
+        tokens = self._measure(prefix)
+        if tokens is None:
+            return self._estimate(prefix)
+        with self.lock:
+            self.prefix_tokens[prefix] = tokens
+            self.chars_per_token = (sum(map(len, self.prefix_tokens)) /
+                                    max(1, sum(self.prefix_tokens.values())))
+        return tokens
+
+    def _build(self, purpose, prefix, render, texts, caps, floor=0):
+        """prefix + render(fitted texts), with each text trimmed until the prompt fits max_tokens
+
+        caps are the most tokens each text may keep. The room left by the fixed parts is shared
+        evenly; a text that would have to drop below floor tokens raises PromptBudgetError.
+        """
+        prefix_tokens = self._prefix(prefix)
+        fixed = prefix_tokens + self._estimate(render([''] * len(texts)))
+        share = (self.max_tokens - fixed) // max(1, len(texts))
+        limits = [min(cap, share) for cap in caps]
+        measured = False
+        for _ in range(3):
+            if any(limit < max(floor, 0) and self._estimate(text) > limit for text, limit in zip(texts, limits)):
+                break
+            fitted = [fit_text(text, limit, self.chars_per_token) for text, limit in zip(texts, limits)]
+            prompt = prefix + render(fitted)
+            tokens = prefix_tokens + self._estimate(prompt[len(prefix):])
+            if tokens > self.max_tokens * MEASURE_ABOVE:
+                exact = self._measure(prompt)
+                if exact is not None:
+                    tokens, measured = exact, True
+            if tokens <= self.max_tokens:
+                trimmed = sum(text != kept for text, kept in zip(texts, fitted))
+                return self._record(purpose, prompt, tokens, prefix_tokens, trimmed, measured)
+            # The estimate ran short: shrink every text by its part of the overshoot and try again
+            kept = [min(limit, self._estimate(text)) for text, limit in zip(fitted, limits)]
+            scale = max(0.0, 1 - (tokens - self.max_tokens) / max(1, sum(kept))) * 0.95
+            limits = [int(limit * scale) for limit in kept]
+
+        self._record(purpose, None, 0, prefix_tokens, 0, measured)
+        raise PromptBudgetError(f'{purpose} prompt does not fit in {self.max_tokens} tokens '
+                                f'(its fixed parts alone take about {fixed})')
+
+    def _record(self, purpose, prompt, tokens, prefix_tokens, trimmed, measured):
+        with self.lock:
+            counter = self.counters.setdefault(purpose, {'prompts': 0, 'tokens': 0, 'prefix_tokens': 0,
+                                                         'trimmed': 0, 'measured': 0, 'rejected': 0})
+            if prompt is None:
+                counter['rejected'] += 1
+                return None
+            counter['prompts'] += 1
+            counter['tokens'] += tokens
+            counter['prefix_tokens'] += prefix_tokens
+            counter['trimmed'] += trimmed
+            counter['measured'] += measured
+        return prompt
+
+    def question(self, domain, difficulty, question_num, topic, coverage, avoid=None):
+        """Prompt for interview question #question_num; the coverage summary gives way to the budget"""
+        # Set when a previous attempt repeated an earlier question
+        avoid_line = f"\n- Do not ask anything close to: {avoid}" if avoid else ''
+        body = f"\nWrite interview question #{question_num}.\n- Focus topic for this question: {topic}{avoid_line}\n"
+        return self._build('question', question_prefix(domain, difficulty),
+                           lambda texts: body + f"- Already covered in this interview: {texts[0]}\n",
+                           [coverage], [self.max_tokens])
+
+    def evaluation(self, domain, difficulty, question, response_text, emotion_data, audio_duration):
+        """Prompt asking the model to score a single answer, trimmed to fit the budget"""
+        details = (f"\nQUESTION CATEGORY: {question.get('category', 'General')}\n"
+                   f"QUESTION: {question['text']}\n\n"
+                   f"RESPONSE METADATA:\n"
+                   f"- Duration: {audio_duration} seconds\n"
+                   f"- Confidence Level: {emotion_data.get('confidence', 0.5)}\n\n"
+                   f"CANDIDATE'S RESPONSE: ")
+        return self._build('evaluation', evaluation_prefix(domain, difficulty),
+                           lambda texts: details + texts[0] + '\n',
+                           [response_text], [self.answer_tokens], floor=MIN_ANSWER_TOKENS)
+
+    def batch(self, domain, difficulty, turns):
+        """Prompt scoring several answers at once; the instructions are sent a single time
+
+        Each turn is a dict with question, category, response_text, audio_duration and confidence.
+        """
+        def render(responses):
+            answers = [f"ANSWER {index}:\n"
+                       f"- Question Category: {turn.get('category', 'General')}\n"
+                       f"- Duration: {turn.get('audio_duration', 0)} seconds\n"
+                       f"- Confidence Level: {turn.get('confidence', 0.5)}\n"
+                       f"QUESTION: {turn['question']}\n"
+                       f"CANDIDATE'S RESPONSE: {response}\n"
+                       for index, (turn, response) in enumerate(zip(turns, responses))]
+            return f"\nThere are {len(turns)} answers to evaluate.\n\n" + '\n'.join(answers)
+
+        return self._build('batch_evaluation', batch_prefix(domain, difficulty), render,
+                           [turn['response_text'] for turn in turns], [self.answer_tokens] * len(turns),
+                           floor=MIN_ANSWER_TOKENS)
+
+    def warm(self):
+        """Compile and count every interview prefix ahead of the first session
+
+        Levels are spelled as in DOMAINS, which is how handle_start_interview stores them.
+        """
+        for domain, config in DOMAINS.items():
+            for difficulty in config['difficulty_levels']:
+                self._prefix(question_prefix(domain, difficulty))
+                self._prefix(evaluation_prefix(domain, difficulty))
+        with self.lock:
+            return {'measured_prefixes': len(self.prefix_tokens), 'chars_per_token': round(self.chars_per_token, 2)}
+
+    def stats(self):
+        with self.lock:
+            return {
+                'max_tokens': self.max_tokens,
+                'answer_tokens': self.answer_tokens,
+                'prefixes': sum(build.cache_info().currsize for build in (question_prefix, evaluation_prefix, batch_prefix)),
+                'measured_prefixes': len(self.prefix_tokens),
+                'chars_per_token': round(self.chars_per_token, 2),
+                'count_failures': self.count_failures,
+                'purposes': {
+                    purpose: {
+                        **counter,
+                        'avg_tokens': round(counter['tokens'] / counter['prompts'], 1) if counter['prompts'] else 0.0
+                    }
+                    for purpose, counter in self.counters.items()
+                }
+            }
@@ -0,0 +1,173 @@
+"""
+Question bank for PrepIQ Interview Simulator
+Keeps generated questions in SQLite, indexed by domain, difficulty, category and topic,
+so new interviews can draw from it locally and only call Gemini to top it up or stay fresh.
+Near-duplicates are detected with small hashed bag-of-words embeddings
+"""
+
+import hashlib
+import random
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+EMBEDDING_DIM = 256
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def embed(text):
+    """Unit-length signed feature-hashing vector of the words and word pairs in text"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    features = tokens + [f'{first} {second}' for first, second in zip(tokens, tokens[1:])]
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature in features:
+        bucket = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+        vector[bucket % EMBEDDING_DIM] += 1.0 if bucket >> 63 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QuestionBank:
+    def __init__(self, path='prepiq_questions.db', duplicate_threshold=0.85, max_age=30 * 86400,
+                 max_serves=50, fresh_ratio=0.1, min_pool=5):
+        self.path = path
+        self.duplicate_threshold = duplicate_threshold
+        # Freshness policy: questions expire after max_age seconds or max_serves uses, a
+        # fresh_ratio share of draws go to the model anyway, and keys below min_pool get topped up
+        self.max_age = max_age
+        self.max_serves = max_serves
+        self.fresh_ratio = fresh_ratio
+        self.min_pool = min_pool
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'added': 0,
+            'duplicates_rejected': 0,
+            'retired': 0,
+            'fallback_hits': 0
+        }
+
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS questions ('
+            'id INTEGER PRIMARY KEY, domain TEXT NOT NULL, difficulty TEXT NOT NULL, '
+            'category TEXT NOT NULL, topic TEXT NOT NULL, text TEXT NOT NULL, embedding BLOB NOT NULL, '
+            'created_at REAL NOT NULL, served_count INTEGER NOT NULL DEFAULT 0, last_served REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS questions_lookup ON questions (domain, difficulty, topic, category)')
+        conn.execute('CREATE INDEX IF NOT EXISTS questions_created_at ON questions (created_at)')
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def draw(self, domain, difficulty, topic, is_duplicate=None, category=None, fallback=False):
+        """Return a banked question the interview has not effectively asked yet, or None if the model should write one
+
+        With fallback (the model is unavailable) the freshness policy is ignored: no draw is
+        handed to the model and expired or overused questions are served too. The question's
+        bank_id goes to mark_served() once it is actually asked.
+        """
+        if not fallback and random.random() < self.fresh_ratio:
+            self._count('refreshes')
+            return None
+
+        query = 'SELECT id, category, text FROM questions WHERE domain = ? AND difficulty = ? AND topic = ?'
+        params = [domain, difficulty, topic]
+        if not fallback:
+            query += ' AND created_at > ? AND served_count < ?'
+            params += [time.time() - self.max_age, self.max_serves]
+        if category:
+            query += ' AND category = ?'
+            params.append(category)
+        # Least used first, shuffled within a use count so sessions do not all get the same order
+        rows = self._connection().execute(query + ' ORDER BY served_count, RANDOM() LIMIT 25', params).fetchall()
+
+        for question_id, row_category, text in rows:
+            if is_duplicate and is_duplicate(text):
+                continue
+            self._count('fallback_hits' if fallback else 'hits')
+            return {'text': text, 'category': row_category, 'topic': topic, 'source': 'bank', 'bank_id': question_id}
+
+        if not fallback:
+            self._count('misses')
+        return None
+
+    def mark_served(self, question_id):
+        """Count a use of a drawn question; drawn questions that are never asked (a discarded prefetch) are not counted"""
+        self._connection().execute(
+            'UPDATE questions SET served_count = served_count + 1, last_served = ? WHERE id = ?',
+            (time.time(), question_id)
+        )
+
+    def add(self, domain, difficulty, category, topic, text):
+        """Bank a generated question unless a near-duplicate is already stored; returns True if added"""
+        vector = embed(text)
+        rows = self._connection().execute(
+            'SELECT embedding FROM questions WHERE domain = ? AND difficulty = ? AND created_at > ?',
+            (domain, difficulty, time.time() - self.max_age)
+        ).fetchall()
+        if rows:
+            stored = np.frombuffer(b''.join(row[0] for row in rows), dtype=np.float32).reshape(len(rows), EMBEDDING_DIM)
+            if float(np.max(stored @ vector)) >= self.duplicate_threshold:
+                self._count('duplicates_rejected')
+                return False
+
+        self._connection().execute(
+            'INSERT INTO questions (domain, difficulty, category, topic, text, embedding, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (domain, difficulty, category, topic, text, vector.astype(np.float32).tobytes(), time.time())
+        )
+        self._count('added')
+        return True
+
+    def needs_top_up(self, domain, difficulty, topic):
+        """True when too few servable questions remain for this key"""
+        return self.pool_size(domain, difficulty, topic) < self.min_pool
+
+    def pool_size(self, domain, difficulty, topic):
+        row = self._connection().execute(
+            'SELECT COUNT(*) FROM questions WHERE domain = ? AND difficulty = ? AND topic = ? '
+            'AND created_at > ? AND served_count < ?',
+            (domain, difficulty, topic, time.time() - self.max_age, self.max_serves)
+        ).fetchone()
+        return row[0]
+
+    def retire_stale(self):
+        """Delete questions past their age or use limit; returns the count"""
+        cursor = self._connection().execute(
+            'DELETE FROM questions WHERE created_at <= ? OR served_count >= ?',
+            (time.time() - self.max_age, self.max_serves)
+        )
+        with self.lock:
+            self.counters['retired'] += cursor.rowcount
+        return cursor.rowcount
+
+    def stats(self):
+        entries = self._connection().execute('SELECT COUNT(*) FROM questions').fetchone()[0]
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses'] + self.counters['refreshes']
+            return {
+                **self.counters,
+                'entries': entries,
+                'hit_ratio': self.counters['hits'] / lookups if lookups else 0.0,
+                'max_age_seconds': self.max_age,
+                'max_serves': self.max_serves,
+                'fresh_ratio': self.fresh_ratio,
+                'min_pool': self.min_pool
+            }
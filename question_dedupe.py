@@ -0,0 +1,126 @@
+"""
+Question de-duplication for PrepIQ Interview Simulator
+MinHash signatures over word shingles catch repeated questions locally, so the model only
+needs a short summary of what an interview has covered instead of every earlier question
+"""
+
+import hashlib
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def shingles(text, size=3):
+    """31-bit hashes of the overlapping word n-grams in text"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < size:
+        grams = [' '.join(tokens)]
+    else:
+        grams = [' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=4).digest(), 'little') & MERSENNE_PRIME
+         for gram in grams],
+        dtype=np.uint64
+    )
+
+
+class MinHasher:
+    """Fixed random permutations (a*x + b mod p); equal seeds give comparable signatures"""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = shingles(text)
+        return ((np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME).min(axis=0)
+
+
+class DedupeIndex:
+    """Signatures and topic coverage of the questions one interview has asked"""
+
+    def __init__(self, hasher, threshold=0.5):
+        self.hasher = hasher
+        self.threshold = threshold
+        self.signatures = []
+        self.normalized = set()
+        self.topics = Counter()
+        self.categories = Counter()
+
+    def add(self, text, topic=None, category=None):
+        self.signatures.append(self.hasher.signature(text))
+        self.normalized.add(' '.join(TOKEN_PATTERN.findall(text.lower())))
+        if topic:
+            self.topics[topic] += 1
+        if category:
+            self.categories[category] += 1
+
+    def similarity(self, text):
+        """Highest estimated Jaccard similarity to any indexed question"""
+        if not self.signatures:
+            return 0.0
+        signature = self.hasher.signature(text)
+        return float(np.max(np.mean(np.array(self.signatures) == signature, axis=1)))
+
+    def is_duplicate(self, text):
+        if ' '.join(TOKEN_PATTERN.findall(text.lower())) in self.normalized:
+            return True
+        return self.similarity(text) >= self.threshold
+
+    def coverage_summary(self):
+        """A line or two describing what has been asked, independent of how many questions that was"""
+        if not self.signatures:
+            return 'Nothing yet; this is the first question.'
+        parts = []
+        if self.topics:
+            parts.append('topics ' + ', '.join(f'{topic} ({count})' for topic, count in self.topics.most_common()))
+        if self.categories:
+            parts.append('question types ' + ', '.join(
+                f'{category} ({count})' for category, count in self.categories.most_common()))
+        return f"{len(self.signatures)} questions asked; " + '; '.join(parts)
+
+
+class QuestionDeduper:
+    """Builds per-interview indexes and counts how often generated questions are rejected"""
+
+    def __init__(self, threshold=0.5, num_perm=64, max_retries=2):
+        self.hasher = MinHasher(num_perm)
+        self.threshold = threshold
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.counters = {'checked': 0, 'rejected': 0, 'retries_exhausted': 0}
+
+    def index_for(self, asked_questions):
+        """Index of the question dicts (text, topic, category) an interview has asked"""
+        index = DedupeIndex(self.hasher, self.threshold)
+        for question in asked_questions:
+            index.add(question['text'], question.get('topic'), question.get('category'))
+        return index
+
+    def check(self, index, text):
+        """True if text may be asked; counts the outcome"""
+        duplicate = index.is_duplicate(text)
+        with self.lock:
+            self.counters['checked'] += 1
+            if duplicate:
+                self.counters['rejected'] += 1
+        return not duplicate
+
+    def exhausted(self):
+        with self.lock:
+            self.counters['retries_exhausted'] += 1
+
+    def stats(self):
+        with self.lock:
+            checked = self.counters['checked']
+            return {
+                **self.counters,
+                'rejection_rate': self.counters['rejected'] / checked if checked else 0.0,
+                'threshold': self.threshold
+            }
@@ -0,0 +1,119 @@
+"""
+Speculative question prefetching for PrepIQ Interview Simulator
+Generates question N+1 in the background while the candidate answers question N
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QuestionPrefetcher:
+    def __init__(self, submit=None, max_workers=4, wait_timeout=30.0):
+        if submit is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='question-prefetch')
+            submit = executor.submit
+        self.submit = submit
+        self.wait_timeout = wait_timeout
+        self.pending = {}
+        self.lock = threading.Lock()
+
+        # Counters exposed through /api/metrics
+        self.counters = {
+            'started': 0,
+            'hits': 0,
+            'late_hits': 0,
+            'misses': 0,
+            'failures': 0,
+            'skipped': 0,
+            'discarded': 0
+        }
+        self.seconds_saved = 0.0
+
+    def prefetch(self, session_id, question_num, generate_fn, *args):
+        """Start generating a question in the background, replacing any stale prefetch"""
+        started_at = time.time()
+
+        def run():
+            result = generate_fn(*args)
+            return result, time.time() - started_at
+
+        with self.lock:
+            stale = self.pending.pop(session_id, None)
+            if stale:
+                self.counters['discarded'] += 1
+
+        # Speculative work is the first thing to drop when the workers are busy
+        try:
+            future = self.submit(run)
+        except Exception as e:
+            print(f"⚠️ Question prefetch skipped: {e}")
+            with self.lock:
+                self.counters['skipped'] += 1
+            return
+
+        with self.lock:
+            self.pending[session_id] = {
+                'question_num': question_num,
+                'future': future
+            }
+            self.counters['started'] += 1
+
+    def take(self, session_id, question_num):
+        """Return the prefetched question for this turn, or None if it has to be generated now"""
+        with self.lock:
+            entry = self.pending.pop(session_id, None)
+
+        if entry is None or entry['question_num'] != question_num:
+            with self.lock:
+                self.counters['misses'] += 1
+                if entry is not None:
+                    self.counters['discarded'] += 1
+            return None
+
+        future = entry['future']
+        ready = future.done()
+
+        # Still queued behind other work: generating it on the caller's thread is faster
+        if future.cancel():
+            with self.lock:
+                self.counters['misses'] += 1
+                self.counters['discarded'] += 1
+            return None
+        wait_start = time.time()
+
+        try:
+            question_data, generation_time = future.result(timeout=self.wait_timeout)
+        except Exception as e:
+            print(f"⚠️ Prefetched question failed: {e}")
+            with self.lock:
+                self.counters['failures'] += 1
+                self.counters['misses'] += 1
+            return None
+
+        waited = time.time() - wait_start
+        with self.lock:
+            self.counters['hits' if ready else 'late_hits'] += 1
+            self.seconds_saved += max(0.0, generation_time - waited)
+
+        return question_data
+
+    def discard(self, session_id):
+        """Drop any in-flight prefetch for a session that has ended"""
+        with self.lock:
+            entry = self.pending.pop(session_id, None)
+            if entry:
+                entry['future'].cancel()
+                self.counters['discarded'] += 1
+
+    def stats(self):
+        """Snapshot of prefetch counters"""
+        with self.lock:
+            served = self.counters['hits'] + self.counters['late_hits']
+            requests = served + self.counters['misses']
+            return {
+                **self.counters,
+                'in_flight': len(self.pending),
+                'hit_ratio': served / requests if requests else 0.0,
+                'seconds_saved': round(self.seconds_saved, 3)
+            }
@@ -0,0 +1,173 @@
+"""
+Online interview analytics for PrepIQ Interview Simulator
+Folds each evaluated answer into running statistics once, so a full or partial
+report can be read at any point of the interview without rescanning past answers
+"""
+
+import math
+
+SCORE_DIMENSIONS = ('overall', 'technical', 'communication', 'completeness', 'depth', 'presentation')
+EMOTION_DIMENSIONS = ('confidence', 'nervousness', 'engagement')
+
+
+class RunningStat:
+    """Count, mean and variance (Welford) plus min, max, first and last of a stream"""
+
+    __slots__ = ('count', 'mean', 'm2', 'minimum', 'maximum', 'first', 'last')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=None, maximum=None, first=None, last=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+        self.first = first
+        self.last = last
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.count == 1:
+            self.minimum = self.maximum = self.first = value
+        else:
+            self.minimum = min(self.minimum, value)
+            self.maximum = max(self.maximum, value)
+        self.last = value
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def to_list(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+
+class TopK:
+    """Bounded frequency counter (Space-Saving): exact while under capacity, close after"""
+
+    __slots__ = ('capacity', 'counts')
+
+    def __init__(self, capacity=32, counts=None):
+        self.capacity = capacity
+        # item -> [count, overestimate inherited from the item it replaced]
+        self.counts = counts if counts is not None else {}
+
+    def add(self, item):
+        entry = self.counts.get(item)
+        if entry:
+            entry[0] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = [1, 0]
+        else:
+            victim = min(self.counts, key=lambda key: self.counts[key][0])
+            floor = self.counts.pop(victim)[0]
+            self.counts[item] = [floor + 1, floor]
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def top(self, k=5):
+        """The k most frequent items as (item, count) pairs"""
+        ranked = sorted(self.counts.items(), key=lambda pair: pair[1][0], reverse=True)
+        return [(item, entry[0]) for item, entry in ranked[:k]]
+
+    def to_list(self):
+        return [self.capacity, self.counts]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+
+class SessionAnalytics:
+    """Running aggregates for one interview, updated once per evaluated answer"""
+
+    __slots__ = ('scores', 'emotions', 'durations', 'categories', 'score_prefix',
+                 'strengths', 'improvements', 'focus_areas', 'strong_areas')
+
+    def __init__(self):
+        self.scores = {dimension: RunningStat() for dimension in SCORE_DIMENSIONS}
+        self.emotions = {dimension: RunningStat() for dimension in EMOTION_DIMENSIONS}
+        self.durations = RunningStat()
+        self.categories = {}
+        # Cumulative overall score after each answer, for half-to-half trends
+        self.score_prefix = []
+        self.strengths = TopK()
+        self.improvements = TopK()
+        # Improvements from weak answers and strengths from good ones, for recommendations
+        self.focus_areas = TopK()
+        self.strong_areas = TopK()
+
+    @property
+    def answered(self):
+        return self.scores['overall'].count
+
+    def add(self, evaluation, emotion_data, audio_duration, category):
+        """Fold one evaluated answer into every aggregate"""
+        score = float(evaluation['overall_score'])
+        for dimension in SCORE_DIMENSIONS:
+            value = evaluation.get(f'{dimension}_score')
+            if value is not None:
+                self.scores[dimension].add(float(value))
+        for dimension in EMOTION_DIMENSIONS:
+            self.emotions[dimension].add(float(emotion_data.get(dimension, 0.5)))
+        self.durations.add(float(audio_duration or 0))
+        self.categories.setdefault(category, RunningStat()).add(score)
+        self.score_prefix.append(score + (self.score_prefix[-1] if self.score_prefix else 0.0))
+
+        strengths = evaluation.get('strengths', [])
+        improvements = evaluation.get('improvements', [])
+        self.strengths.update(strengths)
+        self.improvements.update(improvements)
+        if score < 6:
+            self.focus_areas.update(improvements)
+        else:
+            self.strong_areas.update(strengths)
+
+    def mean(self, dimension):
+        return self.scores[dimension].mean
+
+    def half_averages(self):
+        """Average overall score of the first and second half of the answers"""
+        count = len(self.score_prefix)
+        half = count // 2
+        first = self.score_prefix[half - 1]
+        return first / half, (self.score_prefix[-1] - first) / (count - half)
+
+    def to_dict(self):
+        return {
+            'scores': {dimension: stat.to_list() for dimension, stat in self.scores.items()},
+            'emotions': {dimension: stat.to_list() for dimension, stat in self.emotions.items()},
+            'durations': self.durations.to_list(),
+            'categories': {category: stat.to_list() for category, stat in self.categories.items()},
+            'score_prefix': self.score_prefix,
+            'strengths': self.strengths.to_list(),
+            'improvements': self.improvements.to_list(),
+            'focus_areas': self.focus_areas.to_list(),
+            'strong_areas': self.strong_areas.to_list()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        analytics = cls()
+        analytics.scores.update({dimension: RunningStat.from_list(values) for dimension, values in data['scores'].items()})
+        analytics.emotions.update({dimension: RunningStat.from_list(values) for dimension, values in data['emotions'].items()})
+        analytics.durations = RunningStat.from_list(data['durations'])
+        analytics.categories = {category: RunningStat.from_list(values) for category, values in data['categories'].items()}
+        analytics.score_prefix = data['score_prefix']
+        analytics.strengths = TopK.from_list(data['strengths'])
+        analytics.improvements = TopK.from_list(data['improvements'])
+        analytics.focus_areas = TopK.from_list(data['focus_areas'])
+        analytics.strong_areas = TopK.from_list(data['strong_areas'])
+        return analytics
@@ -0,0 +1,168 @@
+"""
+Session reaper for PrepIQ Interview Simulator
+Evicts idle and over-age sessions in the background, archiving finished interviews first,
+and keeps gauges of how much memory the live sessions hold
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from session_store import serialize_session
+
+
+class SessionArchive:
+    """Append-only JSON lines archive of finished interviews, one file per day"""
+
+    def __init__(self, directory='archive'):
+        self.directory = directory
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, day):
+        return os.path.join(self.directory, f'sessions-{day}.jsonl')
+
+    def append(self, session_id, session_data):
+        """Durably write one session before it is evicted"""
+        record = serialize_session({
+            'session_id': session_id,
+            'archived_at': datetime.now(),
+            'session': session_data
+        })
+        with self.lock:
+            with open(self.path_for(datetime.now().strftime('%Y-%m-%d')), 'a') as f:
+                f.write(record + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class SessionReaper:
+    def __init__(self, store, archive, idle_ttl=1800, max_age=4 * 3600, interval=60, on_evict=None):
+        self.store = store
+        self.archive = archive
+        self.idle_ttl = idle_ttl
+        self.max_age = max_age
+        self.interval = interval
+        self.on_evict = on_evict
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+        self.evictions = Counter()
+        self.recent_evictions = deque()
+        self.archived = 0
+        self.archive_failures = 0
+        self.gauges = {
+            'sessions': 0,
+            'total_bytes': 0,
+            'avg_bytes_per_session': 0,
+            'max_bytes_per_session': 0,
+            'last_sweep_seconds': 0.0,
+            'last_sweep_at': None
+        }
+
+    def start(self):
+        """Run sweeps on a daemon thread"""
+        if self.thread:
+            return
+        self.thread = threading.Thread(target=self._run, name='session-reaper', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"❌ Session sweep failed: {e}")
+
+    def sweep(self):
+        """Evict expired sessions and refresh the memory gauges; returns the number evicted"""
+        started = time.time()
+        now = time.time()
+        sizes = []
+        evicted = 0
+
+        self.store.purge_expired()
+
+        for session_id in self.store.session_ids():
+            session_data = self.store.get(session_id)
+            if session_data is None:
+                continue
+
+            reason = self._eviction_reason(session_data, now)
+            if reason is None:
+                sizes.append(len(serialize_session(session_data)))
+                continue
+
+            if self._evict(session_id, session_data, reason):
+                evicted += 1
+
+        with self.lock:
+            self.gauges.update({
+                'sessions': len(sizes),
+                'total_bytes': sum(sizes),
+                'avg_bytes_per_session': sum(sizes) // len(sizes) if sizes else 0,
+                'max_bytes_per_session': max(sizes) if sizes else 0,
+                'last_sweep_seconds': round(time.time() - started, 4),
+                'last_sweep_at': datetime.now().isoformat()
+            })
+
+        if evicted:
+            print(f"🧹 Evicted {evicted} session(s)")
+        return evicted
+
+    def _eviction_reason(self, session_data, now):
+        last_activity = session_data.last_activity or now
+        started = session_data.start_time.timestamp()
+
+        if now - last_activity > self.idle_ttl:
+            return 'finished' if session_data.finished else 'idle'
+        if now - started > self.max_age:
+            return 'max_age'
+        return None
+
+    def _evict(self, session_id, session_data, reason):
+        # Finished interviews are archived first; if that fails the session stays for the next sweep
+        if session_data.finished:
+            try:
+                self.archive.append(session_id, session_data)
+                self.archived += 1
+            except Exception as e:
+                print(f"❌ Could not archive session {session_id}: {e}")
+                self.archive_failures += 1
+                return False
+
+        if not self.store.delete(session_id):
+            return False
+
+        if self.on_evict:
+            try:
+                self.on_evict(session_id)
+            except Exception as e:
+                print(f"⚠️ Cleanup for session {session_id} failed: {e}")
+
+        with self.lock:
+            self.evictions[reason] += 1
+            self.recent_evictions.append(time.time())
+        return True
+
+    def stats(self):
+        """Live session gauges plus eviction counters and rate"""
+        with self.lock:
+            cutoff = time.time() - 600
+            while self.recent_evictions and self.recent_evictions[0] < cutoff:
+                self.recent_evictions.popleft()
+            return {
+                **self.gauges,
+                'evictions': dict(self.evictions),
+                'evictions_per_minute': round(len(self.recent_evictions) / 10, 2),
+                'archived': self.archived,
+                'archive_failures': self.archive_failures,
+                'idle_ttl_seconds': self.idle_ttl,
+                'max_age_seconds': self.max_age
+            }
@@ -0,0 +1,322 @@
+"""
+Session storage for PrepIQ Interview Simulator
+Keeps interview state outside the process so any worker can serve any session.
+Backends: in-memory (single process), SQLite (one host) and Redis (cluster)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    import redis
+    from redis.exceptions import WatchError
+except ImportError:  # only RedisSessionStore needs it
+    redis = None
+
+    class WatchError(Exception):
+        """Stand-in so RedisSessionStore stays importable; never raised without redis"""
+
+
+# Classes stored as objects rather than plain dicts, keyed by their MODEL_NAME
+SESSION_MODELS = {}
+
+
+class SessionConflictError(Exception):
+    """Raised when an optimistic update keeps losing the race to other writers"""
+
+
+def register_session_model(cls):
+    """Class decorator: store instances through to_dict() and rebuild them with from_dict()"""
+    SESSION_MODELS[cls.MODEL_NAME] = cls
+    return cls
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if type(value) in SESSION_MODELS.values():
+        return value.to_dict()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__datetime__' in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__model__' in obj:
+        return SESSION_MODELS[obj['__model__']].from_dict(obj)
+    return obj
+
+
+def _stamp_activity(data):
+    if isinstance(data, dict):
+        data['last_activity'] = time.time()
+    else:
+        data.last_activity = time.time()
+
+
+def serialize_session(data):
+    return json.dumps(data, default=_encode, separators=(',', ':'))
+
+
+def deserialize_session(blob):
+    return json.loads(blob, object_hook=_decode)
+
+
+class SessionStore:
+    """Base class: backends provide versioned load and compare-and-set"""
+
+    def __init__(self, ttl=6 * 3600, max_retries=10):
+        self.ttl = ttl
+        self.max_retries = max_retries
+        self.conflicts = 0
+
+    def get(self, session_id):
+        """Return a private copy of the session, or None if missing or expired"""
+        loaded = self._load(session_id)
+        return loaded[0] if loaded else None
+
+    def create(self, session_id, data):
+        """Insert or replace a session"""
+        _stamp_activity(data)
+        self._put(session_id, serialize_session(data))
+
+    def update(self, session_id, mutator):
+        """Apply mutator(data) atomically and return the new data, or None if the session is gone
+
+        The mutator may run more than once if another writer wins the race,
+        so it must only change the dict it is given.
+        """
+        for _ in range(self.max_retries):
+            loaded = self._load(session_id)
+            if loaded is None:
+                return None
+            data, version = loaded
+            mutator(data)
+            _stamp_activity(data)
+            if self._compare_and_set(session_id, serialize_session(data), version):
+                return data
+            self.conflicts += 1
+            time.sleep(0.001)
+        raise SessionConflictError(f"Too many concurrent updates to session {session_id}")
+
+    def delete(self, session_id):
+        """Remove a session; returns True if it existed"""
+        raise NotImplementedError
+
+    def session_ids(self):
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """Drop sessions past their TTL that have not been read since; returns the count"""
+        return 0
+
+    def __contains__(self, session_id):
+        return self._load(session_id) is not None
+
+    def stats(self):
+        return {
+            'backend': type(self).__name__,
+            'sessions': len(self.session_ids()),
+            'ttl_seconds': self.ttl,
+            'write_conflicts': self.conflicts
+        }
+
+    def _load(self, session_id):
+        raise NotImplementedError
+
+    def _put(self, session_id, blob):
+        raise NotImplementedError
+
+    def _compare_and_set(self, session_id, blob, expected_version):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Single-process store; data is still serialized so it behaves like the shared backends"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def delete(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def session_ids(self):
+        now = time.time()
+        with self.lock:
+            return [sid for sid, (_, _, expires_at) in self.sessions.items() if expires_at > now]
+
+    def purge_expired(self):
+        now = time.time()
+        with self.lock:
+            expired = [sid for sid, (_, _, expires_at) in self.sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self.sessions[sid]
+        return len(expired)
+
+    def _load(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return None
+            blob, version, expires_at = entry
+            if expires_at <= time.time():
+                del self.sessions[session_id]
+                return None
+        return deserialize_session(blob), version
+
+    def _put(self, session_id, blob):
+        with self.lock:
+            version = self.sessions[session_id][1] + 1 if session_id in self.sessions else 1
+            self.sessions[session_id] = (blob, version, time.time() + self.ttl)
+
+    def _compare_and_set(self, session_id, blob, expected_version):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None or entry[1] != expected_version:
+                return False
+            self.sessions[session_id] = (blob, expected_version + 1, time.time() + self.ttl)
+            return True
+
+
+class SQLiteSessionStore(SessionStore):
+    """File-backed store shared by every worker process on one host"""
+
+    def __init__(self, path='prepiq_sessions.db', **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, data TEXT NOT NULL, '
+            'version INTEGER NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)')
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def delete(self, session_id):
+        cursor = self._connection().execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        return cursor.rowcount == 1
+
+    def session_ids(self):
+        rows = self._connection().execute('SELECT session_id FROM sessions WHERE expires_at > ?', (time.time(),))
+        return [row[0] for row in rows]
+
+    def purge_expired(self):
+        """Physically remove expired rows; reads already ignore them"""
+        cursor = self._connection().execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),))
+        return cursor.rowcount
+
+    def _load(self, session_id):
+        row = self._connection().execute(
+            'SELECT data, version FROM sessions WHERE session_id = ? AND expires_at > ?',
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return deserialize_session(row[0]), row[1]
+
+    def _put(self, session_id, blob):
+        self._connection().execute(
+            'INSERT INTO sessions (session_id, data, version, expires_at) VALUES (?, ?, 1, ?) '
+            'ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, '
+            'version = sessions.version + 1, expires_at = excluded.expires_at',
+            (session_id, blob, time.time() + self.ttl)
+        )
+
+    def _compare_and_set(self, session_id, blob, expected_version):
+        cursor = self._connection().execute(
+            'UPDATE sessions SET data = ?, version = version + 1, expires_at = ? '
+            'WHERE session_id = ? AND version = ?',
+            (blob, time.time() + self.ttl, session_id, expected_version)
+        )
+        return cursor.rowcount == 1
+
+
+class RedisSessionStore(SessionStore):
+    """Store for multi-host deployments; works with any Redis-protocol server"""
+
+    def __init__(self, url='redis://localhost:6379/0', client=None, prefix='prepiq:session:', **kwargs):
+        super().__init__(**kwargs)
+        if client is None:
+            if redis is None:
+                raise RuntimeError("RedisSessionStore requires the 'redis' package: pip install redis")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, session_id):
+        return f'{self.prefix}{session_id}'
+
+    def delete(self, session_id):
+        return self.client.delete(self._key(session_id)) == 1
+
+    def session_ids(self):
+        offset = len(self.prefix)
+        return [
+            (key.decode() if isinstance(key, bytes) else key)[offset:]
+            for key in self.client.scan_iter(match=f'{self.prefix}*', count=500)
+        ]
+
+    def _load(self, session_id):
+        blob, version = self.client.hmget(self._key(session_id), 'data', 'version')
+        if blob is None:
+            return None
+        return deserialize_session(blob), int(version)
+
+    def _put(self, session_id, blob):
+        key = self._key(session_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, 'data', blob)
+        pipe.hincrby(key, 'version', 1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def _compare_and_set(self, session_id, blob, expected_version):
+        key = self._key(session_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                current = pipe.hget(key, 'version')
+                if current is None or int(current) != expected_version:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping={'data': blob, 'version': expected_version + 1})
+                pipe.expire(key, self.ttl)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+
+def create_session_store(url=None, ttl=None):
+    """Build a store from a URL: memory://, sqlite:///path/to.db or redis://host:port/db"""
+    url = url or os.environ.get('PREPIQ_SESSION_STORE', 'memory://')
+    ttl = ttl or int(os.environ.get('PREPIQ_SESSION_TTL', 6 * 3600))
+    scheme = urlparse(url).scheme
+
+    if scheme == 'memory':
+        return MemorySessionStore(ttl=ttl)
+    if scheme == 'sqlite':
+        return SQLiteSessionStore(path=url[len('sqlite:///'):] or 'prepiq_sessions.db', ttl=ttl)
+    if scheme in ('redis', 'rediss', 'unix'):
+        return RedisSessionStore(url=url, ttl=ttl)
+    raise ValueError(f"Unsupported session store URL: {url}")
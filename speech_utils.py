@@ -15,21 +15,146 @@ from pydub import AudioSegment
 import io
 import base64
 import wave
+import re
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from audio_stream import SAMPLE_RATE, SAMPLE_WIDTH
+from stt_engines import create_stt_router
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+CLAUSE_BOUNDARY = re.compile(r'(?<=[,;:])\s+')
+
+def split_into_segments(text, max_chars=180):
+    """Split text into sentences, breaking long sentences at clause boundaries"""
+    segments = []
+    for sentence in SENTENCE_BOUNDARY.split(text.strip()):
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+            continue
+        
+        # Pack clauses back together up to max_chars so segments stay natural
+        current = ''
+        for clause in CLAUSE_BOUNDARY.split(sentence):
+            if current and len(current) + len(clause) + 1 > max_chars:
+                segments.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}".strip()
+        if current:
+            segments.append(current)
+    
+    return [segment for segment in segments if segment.strip()]
+
+def decode_audio_payload(payload, sample_rate=SAMPLE_RATE):
+    """Decode a base64 data URL from the browser straight to recognizer-ready audio"""
+    return decode_audio(base64.b64decode(payload[payload.find(',') + 1:]), sample_rate)
+
+def decode_audio(data, sample_rate=SAMPLE_RATE):
+    """Decode a recording held in memory to 16-bit mono PCM at sample_rate, without touching disk"""
+    pcm = None
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        pcm = _wav_to_pcm(data, sample_rate)
+    if pcm is None:
+        pcm = _ffmpeg_to_pcm(data, sample_rate)
+    return sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+
+def _wav_to_pcm(data, sample_rate):
+    """16-bit PCM WAV in pure NumPy over a view of the upload; None for other sample formats so ffmpeg handles them"""
+    view = memoryview(data)
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        size = int.from_bytes(view[offset + 4:offset + 8], 'little')
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', view[offset + 8:offset + 24])
+        elif chunk_id == b'data':
+            # Streaming recorders may leave the size at 0 or 0xFFFFFFFF; the slice clamps to what was sent
+            frames = view[offset + 8:offset + 8 + size] if size else view[offset + 8:]
+            break
+        offset += 8 + size + (size & 1)
+    else:
+        return None
+    
+    if fmt is None:
+        return None
+    format_tag, channels, rate, _, _, bits = fmt
+    if format_tag not in (1, 0xFFFE) or bits != 16 or not channels:
+        return None
+    frames = frames[:len(frames) - len(frames) % (SAMPLE_WIDTH * channels)]
+    
+    if channels == 1 and rate == sample_rate:
+        return frames.tobytes()
+    
+    samples = np.frombuffer(frames, dtype=np.int16)
+    # Downmix and resample exactly once, to the rate the recognizers want
+    if rate % sample_rate == 0:
+        # Whole-number ratios (48 kHz, 32 kHz browsers) average each block of frames in one pass
+        block = rate // sample_rate * channels
+        mono = samples[:len(samples) // block * block].reshape(-1, block).mean(axis=1, dtype=np.float32)
+    else:
+        mono = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+        positions = np.arange(int(len(mono) * sample_rate / rate), dtype=np.float32) * np.float32(rate / sample_rate)
+        mono = np.interp(positions, np.arange(len(mono), dtype=np.float32), mono)
+    return np.clip(np.round(mono), -32768, 32767).astype(np.int16).tobytes()
+
+def _ffmpeg_to_pcm(data, sample_rate):
+    """Compressed containers (WebM/Opus, Ogg, MP4) through one ffmpeg pipe, downmixed and resampled on the way"""
+    process = subprocess.run(
+        [AudioSegment.converter, '-loglevel', 'error', '-i', 'pipe:0',
+         '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'],
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if process.returncode != 0 or not process.stdout:
+        raise ValueError(f"Could not decode audio: {process.stderr.decode(errors='replace').strip() or 'no audio'}")
+    return process.stdout
+
+def reserve_temp_path(extension):
+    """Create an empty temp file and return its path, so no other process can claim the name first"""
+    with tempfile.NamedTemporaryFile(suffix=f'.{extension}', delete=False) as temp_file:
+        return temp_file.name
+
+class SegmentSequencer:
+    """Release results that finish out of order strictly in index order"""
+    def __init__(self, total, callback):
+        self.total = total
+        self.callback = callback
+        self.results = {}
+        self.next_index = 0
+        self.lock = threading.Lock()
+    
+    def deliver(self, index, result):
+        """Record a finished segment and forward every contiguous ready one"""
+        with self.lock:
+            self.results[index] = result
+            while self.next_index in self.results:
+                self.callback(self.next_index, self.total, self.results.pop(self.next_index))
+                self.next_index += 1
+    
+    @property
+    def done(self):
+        return self.next_index >= self.total
 
 class SpeechToTextManager:
-    def __init__(self):
+    def __init__(self, router=None):
         self.recognizer = sr.Recognizer()
+        # Shares the app's warm engines when given its router, otherwise loads its own once
+        self.router = router
+        if self.router is None:
+            self.router = create_stt_router()
+            self.router.warm()
         self.microphone = sr.Microphone()
         
         # Adjust for ambient noise
         with self.microphone as source:
             self.recognizer.adjust_for_ambient_noise(source)
     
-    def transcribe_audio_file(self, audio_file_path):
-        """Transcribe audio from file"""
+    def transcribe_audio_data(self, audio_data):
+        """Transcribe audio from raw data"""
         try:
-            with sr.AudioFile(audio_file_path) as source:
-                audio = self.recognizer.record(source)
+            audio = decode_audio(audio_data)
             
             # Try multiple engines for better accuracy
             transcript = self._recognize_with_fallback(audio)
@@ -46,60 +171,38 @@ class SpeechToTextManager:
                 'error': str(e)
             }
     
-    def transcribe_audio_data(self, audio_data):
-        """Transcribe audio from raw data"""
-        try:
-            # Save audio data to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
-            
-            result = self.transcribe_audio_file(temp_file_path)
-            
-            # Clean up
-            os.unlink(temp_file_path)
-            
-            return result
-        except Exception as e:
-            return {
-                'transcript': '',
-                'confidence': 0.0,
-                'success': False,
-                'error': str(e)
-            }
-    
     def _recognize_with_fallback(self, audio):
-        """Try multiple recognition engines"""
-        # Try Google Speech Recognition first (free tier)
-        try:
-            return self.recognizer.recognize_google(audio)
-        except sr.UnknownValueError:
-            pass
-        except sr.RequestError:
-            pass
+        """Try the configured engines under the deployment's selection policy"""
+        transcript, _ = self.router.recognize(audio)
         
-        # Fallback to Sphinx (offline)
-        try:
-            return self.recognizer.recognize_sphinx(audio)
-        except:
-            pass
-        
-        # If all fail, return empty
-        return "Could not understand audio"
+        # If all fail, return a placeholder
+        return transcript or "Could not understand audio"
 
 class TextToSpeechManager:
-    def __init__(self, engine='gtts', language='en', rate=150):
+    def __init__(self, engine='gtts', language='en', rate=150, render_service=None):
         self.engine_type = engine
         self.language = language
         self.rate = rate
+        # pyttsx3 files are rendered in worker processes when a TTSRenderService is given
+        self.render_service = render_service
         
-        if engine == 'pyttsx3':
-            self.pyttsx3_engine = pyttsx3.init()
-            self._configure_pyttsx3()
+        # The in-process engine is only started when nothing else renders for it
+        self.pyttsx3_engine = None
+        if engine == 'pyttsx3' and render_service is None:
+            self._local_engine()
         
-        self.audio_queue = queue.Queue()
+        # One speaker thread owns the local engine; speak_text only queues
+        self.audio_queue = queue.Queue(maxsize=16)
+        self.speaker_thread = None
         self.is_speaking = False
     
+    def _local_engine(self):
+        """The in-process pyttsx3 engine, started on first use"""
+        if self.pyttsx3_engine is None:
+            self.pyttsx3_engine = pyttsx3.init()
+            self._configure_pyttsx3()
+        return self.pyttsx3_engine
+    
     def _configure_pyttsx3(self):
         """Configure pyttsx3 engine"""
         voices = self.pyttsx3_engine.getProperty('voices')
@@ -113,18 +216,60 @@ class TextToSpeechManager:
         self.pyttsx3_engine.setProperty('rate', self.rate)
         self.pyttsx3_engine.setProperty('volume', 0.8)
     
-    def generate_speech_file(self, text, output_path=None):
-        """Generate speech audio file"""
-        if not output_path:
-            output_path = tempfile.mktemp(suffix='.mp3' if self.engine_type == 'gtts' else '.wav')
+    def generate_speech_file(self, text, output_path=None, on_segment=None):
+        """Generate speech audio file, synthesizing sentences concurrently
+        
+        on_segment(index, total, audio_bytes) is called in order as soon as each
+        sentence is ready, so playback can start before the whole text is rendered.
+        """
+        extension = 'mp3' if self.engine_type == 'gtts' else 'wav'
+        created_output = not output_path
+        if created_output:
+            output_path = reserve_temp_path(extension)
+        
+        segments = split_into_segments(text) or [text]
+        segment_paths = [reserve_temp_path(extension) for _ in segments]
+        
+        def forward(index, total, path):
+            if on_segment:
+                with open(path, 'rb') as f:
+                    on_segment(index, total, f.read())
+        
+        sequencer = SegmentSequencer(len(segments), forward)
         
         try:
             if self.engine_type == 'gtts':
-                tts = gTTS(text=text, lang=self.language, slow=False)
-                tts.save(output_path)
-            else:  # pyttsx3
-                self.pyttsx3_engine.save_to_file(text, output_path)
-                self.pyttsx3_engine.runAndWait()
+                with ThreadPoolExecutor(max_workers=min(4, len(segments))) as pool:
+                    futures = {
+                        pool.submit(self._synthesize_segment, segment, path): index
+                        for index, (segment, path) in enumerate(zip(segments, segment_paths))
+                    }
+                    for future in as_completed(futures):
+                        future.result()
+                        index = futures[future]
+                        sequencer.deliver(index, segment_paths[index])
+            elif self.render_service:  # one pyttsx3 engine per worker process, render concurrently
+                with ThreadPoolExecutor(max_workers=min(self.render_service.workers or 1, len(segments))) as pool:
+                    futures = {
+                        pool.submit(self.render_service.render, segment, path): index
+                        for index, (segment, path) in enumerate(zip(segments, segment_paths))
+                    }
+                    for future in as_completed(futures):
+                        future.result()
+                        index = futures[future]
+                        sequencer.deliver(index, segment_paths[index])
+            else:  # pyttsx3 engines are single-threaded, render in order
+                for index, (segment, path) in enumerate(zip(segments, segment_paths)):
+                    self._synthesize_segment(segment, path)
+                    sequencer.deliver(index, path)
+            
+            if len(segment_paths) == 1:
+                os.replace(segment_paths[0], output_path)
+            else:
+                combined = AudioSegment.empty()
+                for path in segment_paths:
+                    combined += AudioSegment.from_file(path, format=extension)
+                combined.export(output_path, format=extension)
             
             return {
                 'success': True,
@@ -132,33 +277,65 @@ class TextToSpeechManager:
                 'error': None
             }
         except Exception as e:
+            if created_output and os.path.exists(output_path):
+                os.unlink(output_path)
             return {
                 'success': False,
                 'file_path': None,
                 'error': str(e)
             }
+        finally:
+            for path in segment_paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def _synthesize_segment(self, text, output_path):
+        """Render a single sentence to a file"""
+        if self.engine_type == 'gtts':
+            tts = gTTS(text=text, lang=self.language, slow=False)
+            tts.save(output_path)
+        else:  # pyttsx3
+            engine = self._local_engine()
+            engine.save_to_file(text, output_path)
+            engine.runAndWait()
     
     def speak_text(self, text, callback=None):
-        """Speak text directly (for pyttsx3)"""
+        """Queue text to be spoken directly (for pyttsx3); raises queue.Full if too much is already waiting"""
         if self.engine_type != 'pyttsx3':
             raise ValueError("Direct speech only available with pyttsx3 engine")
         
-        def speak_thread():
+        self.audio_queue.put_nowait((text, callback))
+        if self.speaker_thread is None or not self.speaker_thread.is_alive():
+            self.speaker_thread = threading.Thread(target=self._speak_queued, daemon=True)
+            self.speaker_thread.start()
+        return self.speaker_thread
+    
+    def _speak_queued(self):
+        """Speak queued texts one after another on the single local engine"""
+        while True:
+            try:
+                text, callback = self.audio_queue.get(timeout=5)
+            except queue.Empty:
+                return
             self.is_speaking = True
-            self.pyttsx3_engine.say(text)
-            self.pyttsx3_engine.runAndWait()
+            try:
+                engine = self._local_engine()
+                engine.say(text)
+                engine.runAndWait()
+            except Exception as e:
+                print(f"Speech error: {e}")
             self.is_speaking = False
             if callback:
                 callback()
-        
-        thread = threading.Thread(target=speak_thread)
-        thread.daemon = True
-        thread.start()
-        return thread
     
     def stop_speaking(self):
-        """Stop current speech"""
-        if self.engine_type == 'pyttsx3' and self.is_speaking:
+        """Stop current speech and drop anything still queued"""
+        while not self.audio_queue.empty():
+            try:
+                self.audio_queue.get_nowait()
+            except queue.Empty:
+                break
+        if self.pyttsx3_engine is not None and self.is_speaking:
             self.pyttsx3_engine.stop()
             self.is_speaking = False
 
@@ -275,11 +452,12 @@ def create_speech_managers(config=None):
             'tts_rate': 150
         }
     
-    stt_manager = SpeechToTextManager()
+    stt_manager = SpeechToTextManager(config.get('stt_router'))
     tts_manager = TextToSpeechManager(
         engine=config.get('tts_engine', 'gtts'),
         language=config.get('tts_language', 'en'),
-        rate=config.get('tts_rate', 150)
+        rate=config.get('tts_rate', 150),
+        render_service=config.get('tts_render_service')
     )
     
     return stt_manager, tts_manager
@@ -3,6 +3,133 @@ const io = window.io // Declare io variable
 const SESSION_ID = window.SESSION_ID // Declare SESSION_ID variable
 const DOMAIN = window.DOMAIN // Declare DOMAIN variable
 
+// Gapless, in-order playback of question audio that arrives sentence by sentence
+class QuestionAudioQueue {
+  constructor(fallbackElement, onFinished) {
+    this.fallbackElement = fallbackElement
+    this.onFinished = onFinished
+    this.context = null
+    this.questionNumber = null
+    this.reset(null)
+  }
+
+  unlock() {
+    // Must be called from a user gesture so the browser allows playback later
+    const AudioContextClass = window.AudioContext || window.webkitAudioContext
+    if (!this.context && AudioContextClass) {
+      this.context = new AudioContextClass()
+    }
+    if (this.context && this.context.state === "suspended") {
+      this.context.resume()
+    }
+  }
+
+  reset(questionNumber) {
+    if (this.sources) {
+      this.sources.forEach((source) => {
+        try {
+          source.stop()
+        } catch (error) {
+          // Source already finished
+        }
+      })
+    }
+    this.questionNumber = questionNumber
+    this.sources = []
+    this.pending = []
+    this.chain = Promise.resolve()
+    this.nextStartTime = 0
+    this.scheduled = 0
+    this.finished = 0
+    this.lastReceived = false
+  }
+
+  enqueue(chunk) {
+    if (chunk.question_number !== this.questionNumber) {
+      this.reset(chunk.question_number)
+    }
+    if (chunk.is_last) {
+      this.lastReceived = true
+    }
+    if (!chunk.audio_url) {
+      this.checkFinished()
+      return
+    }
+
+    if (!this.context) {
+      this.enqueueElement(chunk.audio_url)
+      return
+    }
+
+    // Fetch and decode immediately, but schedule strictly in arrival order
+    const questionNumber = this.questionNumber
+    const decoded = fetch(chunk.audio_url)
+      .then((response) => response.arrayBuffer())
+      .then((data) => this.context.decodeAudioData(data))
+
+    this.chain = this.chain
+      .then(() => decoded)
+      .then((buffer) => {
+        if (questionNumber === this.questionNumber) {
+          this.schedule(buffer)
+        }
+      })
+      .catch((error) => {
+        console.log("⚠️ Audio chunk failed:", error)
+        this.checkFinished()
+      })
+  }
+
+  schedule(buffer) {
+    const source = this.context.createBufferSource()
+    source.buffer = buffer
+    source.connect(this.context.destination)
+
+    const startAt = Math.max(this.context.currentTime + 0.02, this.nextStartTime)
+    source.start(startAt)
+    this.nextStartTime = startAt + buffer.duration
+    this.sources.push(source)
+    this.scheduled++
+
+    source.onended = () => {
+      this.finished++
+      this.checkFinished()
+    }
+  }
+
+  enqueueElement(audioUrl) {
+    // No Web Audio support: play clips back to back on the <audio> element
+    this.pending.push(audioUrl)
+    this.scheduled++
+    if (this.pending.length === 1) {
+      this.playNextElement()
+    }
+  }
+
+  playNextElement() {
+    const audio = this.fallbackElement
+    if (!audio || this.pending.length === 0) {
+      return
+    }
+    audio.src = this.pending[0]
+    audio.onended = () => {
+      this.pending.shift()
+      this.finished++
+      this.checkFinished()
+      this.playNextElement()
+    }
+    audio.play().catch((error) => {
+      console.log("⚠️ Audio autoplay prevented:", error)
+    })
+  }
+
+  checkFinished() {
+    if (this.lastReceived && this.finished >= this.scheduled && this.onFinished) {
+      this.onFinished()
+    }
+  }
+}
+
 class InterviewManager {
   constructor() {
     console.log("🎯 InterviewManager constructor called")
@@ -56,6 +183,10 @@ class InterviewManager {
     this.currentAudioBlob = null
     this.currentAudioDuration = 0
     this.speechRecognition = null
+    this.audioSeq = 0
+    this.serverSegments = []
+    this.streamingSupported = typeof Blob !== "undefined" && typeof Blob.prototype.arrayBuffer === "function"
+    this.audioQueue = new QuestionAudioQueue(document.getElementById("question-audio"), () => this.hideAISpeaking())
 
     console.log("🎯 Initializing Interview Manager...")
     console.log("Session ID:", this.sessionId)
@@ -134,6 +265,11 @@ class InterviewManager {
       this.playQuestionAudio(data.audio_url)
     })
 
+    this.socket.on("question_audio_chunk", (data) => {
+      console.log(`🔊 Question audio chunk ${data.index + 1}/${data.total}`)
+      this.audioQueue.enqueue(data)
+    })
+
     this.socket.on("question_text_only", (data) => {
       console.log("📄 Question text only")
       this.hideAISpeaking()
@@ -144,6 +280,10 @@ class InterviewManager {
       this.handleResponseEvaluation(data)
     })
 
+    this.socket.on("response_evaluated_partial", (data) => {
+      this.handleEvaluationPartial(data)
+    })
+
     this.socket.on("interview_completed", (data) => {
       console.log("🏁 Interview completed:", data)
       this.handleInterviewCompletion(data)
@@ -154,6 +294,11 @@ class InterviewManager {
       this.handleTranscriptionResult(data)
     })
 
+    this.socket.on("transcription_partial", (data) => {
+      console.log("🎤 Interim transcription:", data)
+      this.handleTranscriptionPartial(data)
+    })
+
     this.socket.on("transcription_error", (data) => {
       console.error("❌ Transcription error:", data.error)
       this.handleError("Transcription failed: " + data.error)
@@ -176,6 +321,9 @@ class InterviewManager {
     })
     event.target.classList.add("selected")
 
+    // Clicking is a user gesture, so audio playback can be unlocked here
+    this.audioQueue.unlock()
+
     // Hide difficulty selection and show loading
     setTimeout(() => {
       const difficultySection = document.getElementById("difficulty-selection")
@@ -202,6 +350,9 @@ class InterviewManager {
     console.log("📝 Handling new question:", data.question.text)
     this.hideLoading()
     this.currentQuestion = data.question_number
+    if (this.audioQueue.questionNumber !== data.question_number) {
+      this.audioQueue.reset(data.question_number)
+    }
 
     // Update question display
     const questionText = document.getElementById("current-question-text")
@@ -304,11 +455,24 @@ class InterviewManager {
       })
 
       this.audioChunks = []
+      this.audioSeq = 0
+      this.serverSegments = []
       this.recordingStartTime = Date.now()
 
+      // Stream the recording to the server while it is being made
+      if (this.streamingSupported) {
+        this.socket.emit("audio_stream_start", {
+          session_id: this.sessionId,
+          format: "webm",
+        })
+      }
+
       this.mediaRecorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
           this.audioChunks.push(event.data)
+          if (this.streamingSupported) {
+            this.sendAudioChunk(event.data)
+          }
         }
       }
 
@@ -316,7 +480,7 @@ class InterviewManager {
         this.processRecording()
       }
 
-      this.mediaRecorder.start(100)
+      this.mediaRecorder.start(250)
       this.isRecording = true
 
       // Update UI
@@ -418,7 +582,26 @@ class InterviewManager {
     this.currentAudioDuration = audioDuration
 
     // Send to backend for transcription
-    this.sendAudioForTranscription(audioBlob)
+    if (this.streamingSupported) {
+      this.socket.emit("audio_end", {
+        session_id: this.sessionId,
+        last_seq: this.audioSeq - 1,
+      })
+    } else {
+      this.sendAudioForTranscription(audioBlob)
+    }
+  }
+
+  sendAudioChunk(chunk) {
+    // Sequence numbers are assigned synchronously; the server reorders late buffers
+    const seq = this.audioSeq++
+    chunk.arrayBuffer().then((buffer) => {
+      this.socket.emit("audio_chunk", {
+        session_id: this.sessionId,
+        seq: seq,
+        data: buffer,
+      })
+    })
   }
 
   sendAudioForTranscription(audioBlob) {
@@ -488,13 +671,37 @@ class InterviewManager {
     }
   }
 
+  handleEvaluationPartial(data) {
+    // Fields of the evaluation as the model writes them; the final response_evaluated replaces them
+    if (!this.partialEvaluation || this.partialEvaluation.question_number !== data.question_number) {
+      this.partialEvaluation = { question_number: data.question_number, strengths: [], improvements: [] }
+      const detailedFeedback = document.getElementById("detailed-feedback")
+      if (detailedFeedback) {
+        detailedFeedback.textContent = ""
+      }
+      this.hideLoading()
+      const feedbackSection = document.getElementById("feedback-section")
+      if (feedbackSection) {
+        feedbackSection.style.display = "block"
+      }
+    }
+
+    if (data.delta !== undefined) {
+      this.partialEvaluation[data.field] = (this.partialEvaluation[data.field] || "") + data.delta
+    } else {
+      this.partialEvaluation[data.field] = data.value
+    }
+    this.displayFeedback(this.partialEvaluation)
+  }
+
   displayFeedback(evaluation) {
     console.log("📋 Displaying feedback:", evaluation)
 
     // Update score display
     const scoreElement = document.getElementById("response-score")
     if (scoreElement) {
-      scoreElement.textContent = evaluation.overall_score
+      // No score yet while streaming, and none at all for answers the model could not score
+      scoreElement.textContent = evaluation.overall_score ?? "–"
     }
 
     // Display strengths
@@ -576,6 +783,7 @@ class InterviewManager {
   handleInterviewCompletion(data) {
     console.log("🏁 Interview completed:", data)
     this.hideLoading()
+    this.playPhraseAudio(data.audio_url)
 
     // Show completion message and redirect
     this.showLoading(`Interview Complete! Final Score: ${data.final_score.toFixed(1)}/10`)
@@ -637,8 +845,40 @@ class InterviewManager {
     alert(`Error: ${message}`)
   }
 
+  handleTranscriptionPartial(data) {
+    this.serverSegments[data.segment] = data.transcript
+    const interimText = this.serverSegments.filter(Boolean).join(" ")
+
+    const transcriptionElement = document.getElementById("transcription-text")
+    if (transcriptionElement && interimText) {
+      const currentText = transcriptionElement.textContent.replace(/\s+/g, " ").trim()
+
+      // Only take over when the browser's own recognition is not doing better
+      if (interimText.length > currentText.length || !transcriptionElement.classList.contains("active")) {
+        transcriptionElement.textContent = interimText
+        transcriptionElement.classList.add("active")
+
+        const submitBtn = document.getElementById("submit-response")
+        if (submitBtn) {
+          submitBtn.disabled = false
+        }
+      }
+    }
+  }
+
+  playPhraseAudio(audioUrl) {
+    // Fixed phrases are pre-rendered at server start, so they play without waiting on TTS
+    if (!audioUrl) {
+      return
+    }
+    new Audio(audioUrl).play().catch((error) => {
+      console.log("⚠️ Phrase audio autoplay prevented:", error)
+    })
+  }
+
   handleTranscriptionResult(data) {
     console.log("🎤 Server transcription result:", data)
+    this.playPhraseAudio(data.audio_url)
 
     const transcriptionElement = document.getElementById("transcription-text")
     if (transcriptionElement && data.transcript) {
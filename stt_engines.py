@@ -0,0 +1,279 @@
+"""
+Speech-to-text engines for PrepIQ Interview Simulator
+Google, CMU Sphinx, Vosk and faster-whisper behind one interface. Every engine keeps a pool of
+warm instances, loaded once at startup, which also caps how many requests it runs at a time
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+import speech_recognition as sr
+
+SAMPLE_RATE = 16000
+POLICIES = ('race', 'fallback')
+
+
+class EngineBusyError(Exception):
+    """Raised when every warm instance of an engine stays busy past the acquire timeout"""
+
+
+class STTEngine:
+    """Base class: subclasses implement load() for one warm instance and transcribe(instance, audio)"""
+
+    name = 'engine'
+    confidence = 0.5
+
+    def __init__(self, model=None, instances=1, acquire_timeout=5.0):
+        self.model = model
+        self.instances = instances
+        self.acquire_timeout = acquire_timeout
+        self.pool = queue.Queue()
+        self.available = False
+        self.error = None
+        self.lock = threading.Lock()
+        self.counters = {'calls': 0, 'recognized': 0, 'unrecognized': 0, 'failures': 0, 'busy': 0, 'seconds': 0.0}
+        self.load_seconds = 0.0
+
+    def warm(self):
+        """Load every instance up front so no request pays for model loading"""
+        started = time.time()
+        try:
+            for _ in range(self.instances):
+                self.pool.put(self.load())
+            self.available = True
+            print(f"✅ {self.name} STT ready ({self.instances} warm, {time.time() - started:.1f}s)")
+        except Exception as e:
+            self.error = str(e)
+            print(f"⚠️ {self.name} STT unavailable: {e}")
+        self.load_seconds = time.time() - started
+
+    def load(self):
+        raise NotImplementedError
+
+    def transcribe(self, instance, audio):
+        """Return the transcript, raising sr.UnknownValueError when nothing was recognized"""
+        raise NotImplementedError
+
+    def recognize(self, audio):
+        """Run the audio on a borrowed warm instance"""
+        try:
+            instance = self.pool.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            self._count('busy')
+            raise EngineBusyError(f"All {self.instances} {self.name} instances are busy")
+
+        started = time.time()
+        outcome = 'failures'
+        try:
+            transcript = self.transcribe(instance, audio)
+            outcome = 'recognized' if transcript else 'unrecognized'
+            return transcript
+        except sr.UnknownValueError:
+            outcome = 'unrecognized'
+            raise
+        finally:
+            self.pool.put(instance)
+            with self.lock:
+                self.counters['calls'] += 1
+                self.counters[outcome] += 1
+                self.counters['seconds'] += time.time() - started
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            calls = self.counters['calls']
+            return {
+                **self.counters,
+                'available': self.available,
+                'error': self.error,
+                'instances': self.instances,
+                'idle_instances': self.pool.qsize(),
+                'load_seconds': round(self.load_seconds, 2),
+                'avg_ms': round(self.counters['seconds'] / calls * 1000, 1) if calls else 0.0
+            }
+
+
+class GoogleEngine(STTEngine):
+    """Google Web Speech API; instances only bound the number of requests in flight"""
+
+    name = 'Google'
+    confidence = 0.9
+
+    def load(self):
+        return sr.Recognizer()
+
+    def transcribe(self, instance, audio):
+        return instance.recognize_google(audio, language=self.model or 'en-US')
+
+
+class SphinxEngine(STTEngine):
+    """CMU PocketSphinx with the en-US models bundled in SpeechRecognition, one decoder per instance"""
+
+    name = 'Sphinx'
+    confidence = 0.7
+
+    def load(self):
+        from pocketsphinx import pocketsphinx
+
+        language_directory = os.path.join(os.path.dirname(sr.__file__), 'pocketsphinx-data', self.model or 'en-US')
+        config = pocketsphinx.Config()
+        config.set_string('-hmm', os.path.join(language_directory, 'acoustic-model'))
+        config.set_string('-lm', os.path.join(language_directory, 'language-model.lm.bin'))
+        config.set_string('-dict', os.path.join(language_directory, 'pronounciation-dictionary.dict'))
+        config.set_string('-logfn', os.devnull)
+        return pocketsphinx.Decoder(config)
+
+    def transcribe(self, decoder, audio):
+        decoder.start_utt()
+        decoder.process_raw(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2), False, True)
+        decoder.end_utt()
+        hypothesis = decoder.hyp()
+        if hypothesis is None or not hypothesis.hypstr:
+            raise sr.UnknownValueError()
+        return hypothesis.hypstr
+
+
+class VoskEngine(STTEngine):
+    """Vosk (Kaldi) from a model directory; the model is shared, recognizers are cheap per request"""
+
+    name = 'Vosk'
+    confidence = 0.75
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shared_model = None
+
+    def load(self):
+        from vosk import Model
+
+        if self.shared_model is None:
+            self.shared_model = Model(self.model or 'model')
+        return self.shared_model
+
+    def transcribe(self, model, audio):
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(model, SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2))
+        transcript = json.loads(recognizer.FinalResult()).get('text', '')
+        if not transcript:
+            raise sr.UnknownValueError()
+        return transcript
+
+
+class WhisperEngine(STTEngine):
+    """faster-whisper on CPU with int8 weights, one model per instance"""
+
+    name = 'Whisper'
+    confidence = 0.85
+
+    def __init__(self, *args, compute_type='int8', cpu_threads=0, beam_size=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compute_type = compute_type
+        self.cpu_threads = int(cpu_threads)
+        self.beam_size = int(beam_size)
+
+    def load(self):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(self.model or 'base', device='cpu', compute_type=self.compute_type,
+                            cpu_threads=self.cpu_threads)
+
+    def transcribe(self, model, audio):
+        pcm = np.frombuffer(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2), dtype=np.int16)
+        segments, _ = model.transcribe(pcm.astype(np.float32) / 32768.0, language='en', beam_size=self.beam_size)
+        transcript = ''.join(segment.text for segment in segments).strip()
+        if not transcript:
+            raise sr.UnknownValueError()
+        return transcript
+
+
+ENGINES = {
+    'google': GoogleEngine,
+    'sphinx': SphinxEngine,
+    'vosk': VoskEngine,
+    'whisper': WhisperEngine
+}
+
+
+class STTRouter:
+    """Applies the selection policy across the engines that loaded"""
+
+    def __init__(self, engines, policy='race'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown STT policy: {policy}")
+        self.engines = engines
+        self.policy = policy
+        self.executor = ThreadPoolExecutor(max_workers=sum(engine.instances for engine in engines) or 1,
+                                           thread_name_prefix='stt-engine')
+
+    def warm(self):
+        for engine in self.engines:
+            engine.warm()
+
+    def _attempt(self, engine, audio):
+        """One recognition attempt; an empty string when the engine fails, is busy or hears nothing"""
+        try:
+            transcript = engine.recognize(audio)
+            print(f"✅ {engine.name} STT: {transcript[:50]}...")
+            return transcript
+        except sr.UnknownValueError:
+            print(f"⚠️ {engine.name} STT: Could not understand audio")
+        except (sr.RequestError, EngineBusyError) as e:
+            print(f"⚠️ {engine.name} STT service error: {e}")
+        except Exception as e:
+            print(f"⚠️ {engine.name} STT failed: {e}")
+        return ''
+
+    def recognize(self, audio):
+        """Returns (transcript, confidence); ('', 0.0) when no engine understood the audio"""
+        engines = [engine for engine in self.engines if engine.available]
+
+        if self.policy == 'fallback' or len(engines) == 1:
+            for engine in engines:
+                transcript = self._attempt(engine, audio)
+                if transcript:
+                    return transcript, engine.confidence
+            return '', 0.0
+
+        # First engine with a usable transcript wins; the others finish in the background and are ignored
+        attempts = {self.executor.submit(self._attempt, engine, audio): engine for engine in engines}
+        for attempt in as_completed(attempts):
+            transcript = attempt.result()
+            if transcript:
+                return transcript, attempts[attempt].confidence
+        return '', 0.0
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'engines': {engine.name: engine.stats() for engine in self.engines}
+        }
+
+
+def create_stt_engine(url):
+    """Build an engine from a URL: google://?instances=8, sphinx://en-US, vosk:///opt/vosk-model, whisper://base?instances=2"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ENGINES:
+        raise ValueError(f"Unsupported STT engine URL: {url}")
+    options = dict(parse_qsl(parsed.query))
+    instances = int(options.pop('instances', 1))
+    acquire_timeout = float(options.pop('timeout', 5.0))
+    model = (parsed.netloc + parsed.path) or None
+    return ENGINES[parsed.scheme](model, instances=instances, acquire_timeout=acquire_timeout, **options)
+
+
+def create_stt_router(spec=None, policy=None):
+    """Engines from a comma-separated list of URLs (PREPIQ_STT_ENGINES), in fallback order"""
+    spec = spec or os.environ.get('PREPIQ_STT_ENGINES', 'google://?instances=8,sphinx://en-US?instances=2')
+    policy = policy or os.environ.get('PREPIQ_STT_POLICY', 'race')
+    return STTRouter([create_stt_engine(url.strip()) for url in spec.split(',') if url.strip()], policy=policy)
@@ -0,0 +1,153 @@
+import copy
+import json
+import random
+
+import pytest
+
+from evaluation import (BATCH_EVALUATION_SCHEMA, EVALUATION_SCHEMA, SCORE_FIELDS, EvaluationError, EvaluationStream,
+                        extract_json, parse_batch_evaluations, parse_evaluation, request_evaluation,
+                        stream_evaluation, validate_evaluation)
+
+
+@pytest.mark.parametrize('schema', [EVALUATION_SCHEMA, BATCH_EVALUATION_SCHEMA], ids=['single', 'batch'])
+def test_schema_converts_to_a_gemini_generation_config(schema):
+    generation_types = pytest.importorskip('google.generativeai.types.generation_types')
+    # The same config GeminiBackend._complete sends; an unknown Schema field fails here, not per request
+    config = generation_types.to_generation_config_dict({
+        'response_mime_type': 'application/json',
+        'response_schema': copy.deepcopy(schema)
+    })
+    assert config['response_schema'] is not None
+
+
+def make_evaluation(**overrides):
+    evaluation = {field: 7 for field in SCORE_FIELDS}
+    evaluation.update(strengths=['Clear structure'], improvements=['Add an example'],
+                      detailed_feedback='A solid answer.\nIt could go deeper.',
+                      key_concepts_covered=['caching'], missing_concepts=[])
+    evaluation.update(overrides)
+    return evaluation
+
+
+def test_extract_json_skips_prose_and_code_fences():
+    reply = 'Here is the evaluation:\n```json\n{"a": {"b": [1, "}"]}}\n```\nHope this helps.'
+    assert extract_json(reply) == {'a': {'b': [1, '}']}}
+
+
+def test_extract_json_drops_trailing_commas():
+    assert extract_json('{"a": [1, 2,], "b": {"c": 3,},}') == {'a': [1, 2], 'b': {'c': 3}}
+
+
+@pytest.mark.parametrize('reply, expected', [
+    ('{"a": 1, "b": "cut off mid', {'a': 1, 'b': 'cut off mid'}),
+    ('{"a": [1, 2', {'a': [1, 2]}),
+    ('{"a": 1, "b":', {'a': 1}),
+    ('{"a": 1, "b": {"c": "x\\"y",', {'a': 1, 'b': {'c': 'x"y'}}),
+], ids=['string', 'array', 'dangling key', 'nested'])
+def test_extract_json_closes_a_truncated_reply(reply, expected):
+    assert extract_json(reply) == expected
+
+
+def test_extract_json_without_an_object_raises():
+    with pytest.raises(EvaluationError):
+        extract_json('I cannot evaluate this answer.')
+
+
+def test_validate_evaluation_coerces_near_misses():
+    evaluation = validate_evaluation(make_evaluation(overall_score='8.6', technical_score=14,
+                                                     strengths='Concise', missing_concepts=[None, ' ']))
+    assert evaluation['overall_score'] == 9
+    assert evaluation['technical_score'] == 10
+    assert evaluation['strengths'] == ['Concise']
+    assert evaluation['missing_concepts'] == []
+
+
+@pytest.mark.parametrize('value', [float('inf'), float('nan'), 'high', None, True])
+def test_validate_evaluation_rejects_unusable_scores(value):
+    with pytest.raises(EvaluationError) as raised:
+        validate_evaluation(make_evaluation(overall_score=value))
+    assert len(raised.value.problems) == 1
+
+
+def test_parse_evaluation_reports_infinity_as_an_evaluation_error():
+    with pytest.raises(EvaluationError):
+        parse_evaluation(json.dumps(make_evaluation(overall_score=float('inf'))))
+
+
+def test_parse_batch_evaluations_keeps_only_valid_answers():
+    items = [make_evaluation(index=1), make_evaluation(index=0, overall_score=float('inf')),
+             make_evaluation(index=1), make_evaluation(index=5)]
+    assert list(parse_batch_evaluations(json.dumps(items), 3)) == [1]
+
+
+def test_request_evaluation_repairs_once():
+    replies = iter(['{"overall_score": 7', json.dumps(make_evaluation())])
+    purposes = []
+
+    def generate(prompt, purpose, schema):
+        purposes.append(purpose)
+        return next(replies)
+
+    assert request_evaluation(generate, 'prompt')['overall_score'] == 7
+    assert purposes == ['evaluation', 'evaluation_repair']
+
+
+def test_request_evaluation_never_invents_a_score():
+    with pytest.raises(EvaluationError):
+        request_evaluation(lambda prompt, purpose, schema: '{"overall_score": 7}', 'prompt')
+
+
+STREAMED_REPLY = json.dumps(make_evaluation(
+    strengths=['Named the {trade-offs}', 'Quoted "Big O"'],
+    detailed_feedback='Good start — then a tab\tand an emoji \U0001F680, "quoted" and a \\ backslash.'
+)) + '\n'
+
+
+def collect(chunks):
+    """Field values and the streamed feedback text from feeding chunks one at a time"""
+    parser = EvaluationStream()
+    fields, text = {}, []
+    for chunk in chunks:
+        for kind, name, value in parser.feed(chunk):
+            if kind == 'field':
+                fields[name] = value
+            else:
+                text.append(value)
+    return fields, ''.join(text)
+
+
+def test_stream_reports_every_field_and_the_feedback_text():
+    fields, text = collect([STREAMED_REPLY])
+    assert fields == json.loads(STREAMED_REPLY)
+    assert text == fields['detailed_feedback']
+
+
+@pytest.mark.parametrize('split', ['every position', 'single characters', 'random'])
+def test_stream_result_does_not_depend_on_chunk_boundaries(split):
+    expected = collect([STREAMED_REPLY])
+    if split == 'every position':
+        splits = [[STREAMED_REPLY[:cut], STREAMED_REPLY[cut:]] for cut in range(1, len(STREAMED_REPLY))]
+    elif split == 'single characters':
+        splits = [list(STREAMED_REPLY)]
+    else:
+        rng = random.Random(7)
+        splits = []
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(1, len(STREAMED_REPLY)), 12))
+            splits.append([STREAMED_REPLY[start:end] for start, end in zip([0] + cuts, cuts + [None])])
+    for chunks in splits:
+        assert collect(chunks) == expected
+
+
+def test_stream_evaluation_previews_fields_and_returns_the_validated_result():
+    events = []
+    evaluation = stream_evaluation(lambda prompt, purpose, schema: iter([STREAMED_REPLY[:40], STREAMED_REPLY[40:]]),
+                                   None, 'prompt', lambda *event: events.append(event))
+    assert evaluation == json.loads(STREAMED_REPLY)
+    assert events[0] == ('field', 'overall_score', 7)
+
+
+def test_stream_accepts_raw_control_characters_in_the_feedback():
+    reply = STREAMED_REPLY.replace('\\n', '\n').replace('\\t', '\t')
+    fields, text = collect(list(reply))
+    assert text == fields['detailed_feedback'] == json.loads(STREAMED_REPLY)['detailed_feedback']
@@ -0,0 +1,158 @@
+import threading
+import time
+
+import pytest
+
+from llm_client import (CircuitBreaker, CircuitOpenError, LLMClient, LLMRequestError, LLMUnavailableError,
+                        TokenBucket)
+
+
+class ScriptedBackend:
+    """Plays back one scripted step per call: a reply, an exception, or (seconds, reply) to answer slowly"""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _next(self):
+        with self.lock:
+            self.calls += 1
+            return self.steps.pop(0) if len(self.steps) > 1 else self.steps[0]
+
+    def complete(self, prompt, purpose, schema=None, timeout=None):
+        step = self._next()
+        if isinstance(step, Exception):
+            raise step
+        if isinstance(step, tuple):
+            time.sleep(step[0])
+            return step[1]
+        return step
+
+    def stream(self, prompt, purpose, schema=None, timeout=None):
+        step = self._next()
+        for piece in step:
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+
+    def stats(self):
+        return {}
+
+
+def client(backend, **kwargs):
+    return LLMClient(backend, **{'backoff': 0.001, 'hedge': False, **kwargs})
+
+
+def test_token_bucket_allows_a_burst_then_refuses_without_waiting():
+    bucket = TokenBucket(rate=1.0, burst=3)
+    assert all(bucket.try_acquire() for _ in range(3))
+    assert not bucket.try_acquire()
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=50.0, burst=1)
+    assert bucket.try_acquire()
+    started = time.monotonic()
+    assert bucket.acquire(timeout=1.0)
+    assert 0.01 <= time.monotonic() - started < 0.5
+
+
+def test_token_bucket_without_a_rate_is_unlimited():
+    bucket = TokenBucket(rate=0, burst=1)
+    assert all(bucket.try_acquire() for _ in range(100))
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_probe_through_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.02)
+    breaker.record_failure()
+    time.sleep(0.03)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_a_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.02)
+    breaker.record_failure()
+    time.sleep(0.03)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_retryable_errors_are_retried():
+    backend = ScriptedBackend(TimeoutError('slow'), ConnectionError('reset'), 'reply')
+    llm = client(backend, retries=2)
+    assert llm.complete('prompt', 'question') == 'reply'
+    assert backend.calls == 3
+    assert llm.stats()['client']['retries'] == 2
+
+
+def test_non_retryable_errors_fail_on_the_first_attempt():
+    backend = ScriptedBackend(ValueError('bad request'), 'reply')
+    llm = client(backend, retries=2)
+    with pytest.raises(LLMRequestError):
+        llm.complete('prompt', 'question')
+    assert backend.calls == 1
+    assert llm.breaker.state == 'closed'
+
+
+def test_an_open_circuit_fails_fast_without_calling_the_backend():
+    backend = ScriptedBackend(TimeoutError('down'))
+    llm = client(backend, retries=0, failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            llm.complete('prompt', 'question')
+    with pytest.raises(CircuitOpenError):
+        llm.complete('prompt', 'question')
+    assert backend.calls == 2
+
+
+def test_a_slow_call_is_hedged_and_the_duplicate_wins():
+    backend = ScriptedBackend((1.0, 'slow'), 'fast')
+    llm = client(backend, hedge=True, hedge_min_samples=5)
+    for _ in range(5):
+        llm._observe('question', 0.01)
+
+    started = time.monotonic()
+    assert llm.complete('prompt', 'question') == 'fast'
+    assert time.monotonic() - started < 0.5
+    counters = llm.stats()['client']
+    assert counters['hedges'] == 1 and counters['hedge_wins'] == 1
+
+
+def test_purposes_outside_the_hedged_list_are_not_hedged():
+    backend = ScriptedBackend((0.1, 'reply'))
+    llm = client(backend, hedge=True, hedge_min_samples=1)
+    llm._observe('evaluation', 0.01)
+    assert llm.complete('prompt', 'evaluation') == 'reply'
+    assert llm.stats()['client']['hedges'] == 0
+
+
+def test_a_stream_is_retried_only_before_its_first_chunk():
+    backend = ScriptedBackend([TimeoutError('slow')], ['a', 'b'])
+    llm = client(backend, retries=2)
+    assert ''.join(llm.stream('prompt', 'evaluation')) == 'ab'
+
+    backend = ScriptedBackend(['a', TimeoutError('dropped')], ['never'])
+    llm = client(backend, retries=2)
+    with pytest.raises(LLMUnavailableError):
+        list(llm.stream('prompt', 'evaluation'))
+    assert backend.calls == 1
@@ -0,0 +1,76 @@
+import pytest
+
+from domains import DOMAINS, canonical_difficulty
+from prompts import PromptBudgetError, PromptBuilder, estimate_tokens, evaluation_prefix, fit_text, question_prefix
+
+
+@pytest.fixture
+def builder():
+    return PromptBuilder(count_tokens=lambda text: len(text) // 4)
+
+
+def test_warm_counts_the_prefixes_a_started_session_looks_up(builder):
+    builder.warm()
+    for domain, config in DOMAINS.items():
+        for level in config['difficulty_levels']:
+            # The interview page sends data-level="{{ level.lower() }}"
+            difficulty = canonical_difficulty(domain, level.lower())
+            assert question_prefix(domain, difficulty) in builder.prefix_tokens
+            assert evaluation_prefix(domain, difficulty) in builder.prefix_tokens
+
+
+def test_unknown_levels_have_no_canonical_spelling():
+    assert canonical_difficulty('web_development', 'Wizard') is None
+    assert canonical_difficulty('no_such_domain', 'junior') is None
+
+
+QUESTION = {'text': 'How would you cache API responses?', 'category': 'Performance'}
+LONG_ANSWER = ' '.join(f'word{index}' for index in range(3000)) + ' In conclusion, measure first.'
+
+
+def test_fit_text_leaves_short_text_alone():
+    assert fit_text('A short answer.', 100) == 'A short answer.'
+
+
+def test_fit_text_keeps_the_opening_and_the_conclusion():
+    fitted = fit_text(LONG_ANSWER, 200)
+    assert estimate_tokens(fitted) <= 200
+    assert fitted.startswith('word0 word1')
+    assert fitted.endswith('In conclusion, measure first.')
+    assert 'words omitted' in fitted
+
+
+def test_a_long_answer_is_trimmed_to_the_budget():
+    builder = PromptBuilder(max_tokens=1000, answer_tokens=1000)
+    prompt = builder.evaluation('web_development', 'Junior', QUESTION, LONG_ANSWER, {'confidence': 0.8}, 30)
+    assert estimate_tokens(prompt) <= 1000
+    assert prompt.rstrip().endswith('In conclusion, measure first.')
+    assert builder.stats()['purposes']['evaluation']['trimmed'] == 1
+
+
+def test_a_budget_the_fixed_parts_overflow_raises():
+    builder = PromptBuilder(max_tokens=300)
+    with pytest.raises(PromptBudgetError):
+        builder.evaluation('web_development', 'Junior', QUESTION, LONG_ANSWER, {'confidence': 0.8}, 30)
+    assert builder.stats()['purposes']['evaluation']['rejected'] == 1
+
+
+def test_a_prompt_the_estimate_undercounts_is_trimmed_again():
+    # Every "wordN" costs a token more than the character estimate expects
+    def count_tokens(text):
+        return len(text) // 4 + text.count('word')
+
+    builder = PromptBuilder(max_tokens=1000, count_tokens=count_tokens)
+    prompt = builder.evaluation('web_development', 'Junior', QUESTION, LONG_ANSWER, {'confidence': 0.8}, 30)
+    assert count_tokens(prompt) <= 1000
+    assert builder.stats()['purposes']['evaluation']['measured'] == 1
+
+
+def test_a_failing_token_count_falls_back_to_the_estimate():
+    def count_tokens(text):
+        raise ConnectionError('offline')
+
+    builder = PromptBuilder(max_tokens=1000, count_tokens=count_tokens)
+    prompt = builder.evaluation('web_development', 'Junior', QUESTION, 'Short answer.', {'confidence': 0.8}, 5)
+    assert prompt.rstrip().endswith('Short answer.')
+    assert builder.stats()['count_failures'] == 1
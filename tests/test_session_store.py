@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from session_store import RedisSessionStore
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture
+def store():
+    return RedisSessionStore(client=fakeredis.FakeRedis())
+
+
+def test_update_retries_after_a_write_between_watch_and_exec(store):
+    store.create('s1', {'count': 0})
+    real_pipeline = store.client.pipeline
+    interfered = []
+
+    def interfering_pipeline(*args, **kwargs):
+        pipe = real_pipeline(*args, **kwargs)
+        watch = pipe.watch
+
+        def watch_then_write(*keys):
+            watch(*keys)
+            if not interfered:
+                # Another worker touches the session after WATCH, so the first EXEC must abort
+                interfered.append(True)
+                store.client.hset(keys[0], 'touched', 1)
+
+        pipe.watch = watch_then_write
+        return pipe
+
+    store.client.pipeline = interfering_pipeline
+    calls = []
+
+    def increment(data):
+        calls.append(1)
+        data['count'] += 1
+
+    assert store.update('s1', increment)['count'] == 1
+    assert len(calls) == 2
+    assert store.conflicts == 1
+    assert store.get('s1')['count'] == 1
+
+
+def test_update_retries_when_the_version_moved(store):
+    store.create('s1', {'count': 0})
+
+    def increment_with_a_rival(data):
+        if data['count'] == 0 and not store.conflicts:
+            store.update('s1', lambda rival: rival.update(count=rival['count'] + 10))
+        data['count'] += 1
+
+    assert store.update('s1', increment_with_a_rival)['count'] == 11
+    assert store.conflicts == 1
+
+
+def test_concurrent_updates_are_not_lost():
+    store = RedisSessionStore(client=fakeredis.FakeRedis(), max_retries=1000)
+    store.create('s1', {'count': 0})
+
+    def worker():
+        for _ in range(25):
+            store.update('s1', lambda data: data.update(count=data['count'] + 1))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.get('s1')['count'] == 100
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from tts_cache import CacheInUseError, TTSCache
+
+
+def render(path):
+    with open(path, 'wb') as f:
+        f.write(b'x' * 10)
+
+
+def test_a_second_process_cannot_share_the_cache_directory(tmp_path):
+    cache = TTSCache(root=str(tmp_path))
+    with pytest.raises(CacheInUseError):
+        TTSCache(root=str(tmp_path))
+    cache.owner_lock.close()
+    TTSCache(root=str(tmp_path))
+
+
+def test_rerendering_a_missing_file_keeps_the_byte_count(tmp_path):
+    cache = TTSCache(root=str(tmp_path))
+    cache.get_or_create('Hello', 'gtts', 'en', 'com', 'normal', render, pin=True)
+    os.unlink(cache.path_for(cache.make_key('Hello', 'gtts', 'en', 'com', 'normal'), 'mp3'))
+
+    cache.get_or_create('Hello', 'gtts', 'en', 'com', 'normal', render)
+
+    assert cache.stats()['bytes'] == 10
+    assert cache.stats()['pinned_bytes'] == 10
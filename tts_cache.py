@@ -0,0 +1,232 @@
+"""
+Content-addressed TTS audio cache for PrepIQ Interview Simulator
+Synthesized audio is keyed by a hash of everything that affects the waveform,
+stored in a sharded directory and evicted least-recently-used once the cache is full
+
+The index and byte budget live in the owning process, so a cache directory has a single
+writer: a second process opening the same root gets CacheInUseError. Give each worker its
+own root (PREPIQ_TTS_CACHE_DIR) when running several.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CACHE_NAME_PATTERN = re.compile(r'^[0-9a-f]{64}\.(mp3|wav)$')
+
+
+class CacheInUseError(RuntimeError):
+    """Raised when another process already owns the cache directory"""
+
+
+def _lock_exclusive(lock_file):
+    """Non-blocking exclusive lock, released by the OS when the process exits; False if already held"""
+    try:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class TTSCache:
+    def __init__(self, root='static/audio/cache', max_bytes=256 * 1024 * 1024, url_prefix='/audio',
+                 auto_pin_hits=3, max_pinned_fraction=0.25):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.url_prefix = url_prefix
+        self.auto_pin_hits = auto_pin_hits
+        self.max_pinned_bytes = int(max_bytes * max_pinned_fraction)
+        self.index_path = os.path.join(root, 'index.json')
+
+        # key -> {'ext', 'size', 'hits', 'pinned', 'last_access'}, least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.pinned_bytes = 0
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(root, exist_ok=True)
+        # Each process would otherwise overwrite the others' index and enforce max_bytes on its own
+        self.owner_lock = open(os.path.join(root, '.lock'), 'a+')
+        if not _lock_exclusive(self.owner_lock):
+            self.owner_lock.close()
+            raise CacheInUseError(f"TTS cache {root} is in use by another process; give each worker its own directory")
+        self._load_index()
+
+    @staticmethod
+    def make_key(text, engine, language, voice, rate):
+        """Stable hash of every input that changes the rendered audio"""
+        material = json.dumps([text.strip(), engine, language, voice, rate], ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def path_for(self, key, ext):
+        return os.path.join(self.root, key[:2], key[2:4], f'{key}.{ext}')
+
+    def url_for(self, key, ext):
+        return f'{self.url_prefix}/{key}.{ext}'
+
+    def resolve(self, filename):
+        """Map a public cache filename back to its file, or None"""
+        if not CACHE_NAME_PATTERN.match(filename):
+            return None
+        key, ext = filename.split('.')
+        path = self.path_for(key, ext)
+        return path if os.path.exists(path) else None
+
+    def get_or_create(self, text, engine, language, voice, rate, render, ext='mp3', pin=False):
+        """Return a stable URL for the audio, calling render(path) only on a miss"""
+        key = self.make_key(text, engine, language, voice, rate)
+
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry and os.path.exists(self.path_for(key, entry['ext'])):
+                    self._touch(key, entry, pin)
+                    self.hits += 1
+                    return self.url_for(key, entry['ext'])
+
+                # Only one thread renders a given phrase; the rest wait for it
+                waiter = self.inflight.get(key)
+                if waiter is None:
+                    self.inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            waiter.wait()
+            with self.lock:
+                if key not in self.entries:
+                    raise RuntimeError('Concurrent TTS render failed')
+
+        path = self.path_for(key, ext)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            render(temp_path)
+            os.replace(temp_path, path)
+            with self.lock:
+                self._insert(key, ext, os.path.getsize(path), pin)
+                self._evict()
+                self._save_index()
+            return self.url_for(key, ext)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            with self.lock:
+                self.inflight.pop(key).set()
+
+    def pin(self, text, engine, language, voice, rate):
+        """Exempt an already cached phrase from eviction"""
+        key = self.make_key(text, engine, language, voice, rate)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and not entry['pinned']:
+                entry['pinned'] = True
+                self.pinned_bytes += entry['size']
+                self.dirty = True
+
+    def flush(self):
+        """Persist access order and hit counts gathered since the last write"""
+        with self.lock:
+            if self.dirty:
+                self._save_index()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'pinned_bytes': self.pinned_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+    def _touch(self, key, entry, pin):
+        entry['hits'] += 1
+        entry['last_access'] = time.time()
+        self.entries.move_to_end(key)
+        if not entry['pinned'] and (pin or entry['hits'] >= self.auto_pin_hits):
+            if pin or self.pinned_bytes + entry['size'] <= self.max_pinned_bytes:
+                entry['pinned'] = True
+                self.pinned_bytes += entry['size']
+        self.dirty = True
+
+    def _insert(self, key, ext, size, pin):
+        # A re-render replaces an entry whose file went missing; its bytes are counted afresh
+        previous = self.entries.pop(key, None)
+        if previous:
+            self.total_bytes -= previous['size']
+            if previous['pinned']:
+                self.pinned_bytes -= previous['size']
+            pin = pin or previous['pinned']
+        self.entries[key] = {
+            'ext': ext,
+            'size': size,
+            'hits': 0,
+            'pinned': bool(pin),
+            'last_access': time.time()
+        }
+        self.total_bytes += size
+        if pin:
+            self.pinned_bytes += size
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            entry = self.entries[key]
+            if entry['pinned']:
+                continue
+            try:
+                os.unlink(self.path_for(key, entry['ext']))
+            except FileNotFoundError:
+                pass
+            del self.entries[key]
+            self.total_bytes -= entry['size']
+            self.evictions += 1
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            saved = []
+
+        # Saved least recently used first; entries whose files vanished are dropped
+        for key, entry in saved:
+            if os.path.exists(self.path_for(key, entry['ext'])):
+                self.entries[key] = entry
+                self.total_bytes += entry['size']
+                if entry['pinned']:
+                    self.pinned_bytes += entry['size']
+
+        self._evict()
+
+    def _save_index(self):
+        temp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(temp_path, self.index_path)
+        self.dirty = False
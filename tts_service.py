@@ -0,0 +1,241 @@
+"""
+Offline speech rendering service for PrepIQ Interview Simulator
+pyttsx3 engines are neither thread-safe nor cheap to start, so each one lives in its own worker
+process. Render jobs go to whichever process is idle, with a timeout, and a worker that hangs
+or dies is killed and replaced
+
+Run as `python tts_service.py --worker`, the module is the worker: it reads JSON lines with
+text and path on stdin and answers each with one JSON line on stdout.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PREFERRED_VOICES = ('female', 'zira', 'hazel', 'karen')
+
+
+class TTSRenderError(Exception):
+    """Raised when a render fails, times out or finds no worker free"""
+
+
+class RenderWorker:
+    """Parent-side handle on one worker process and its reply stream"""
+
+    def __init__(self, rate, volume, startup_timeout):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker', '--rate', str(rate), '--volume', str(volume)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+        )
+        self.replies = queue.Queue()
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+        hello = self._reply(startup_timeout)
+        if not hello.get('ready'):
+            self.kill()
+            raise TTSRenderError(hello.get('error', 'worker failed to start'))
+        self.voice = hello.get('voice')
+
+    def _read_replies(self):
+        for line in self.process.stdout:
+            try:
+                self.replies.put(json.loads(line))
+            except ValueError:
+                continue
+        # EOF: the process exited, wake up whoever is waiting
+        self.replies.put({'ok': False, 'error': 'worker exited', 'crashed': True})
+
+    def _reply(self, timeout):
+        try:
+            return self.replies.get(timeout=timeout)
+        except queue.Empty:
+            return {'ok': False, 'error': f'no reply within {timeout}s', 'timed_out': True}
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def render(self, text, path, timeout):
+        """Render text to path in the worker; returns the reply dict"""
+        try:
+            self.process.stdin.write(json.dumps({'text': text, 'path': path}) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            return {'ok': False, 'error': 'worker exited', 'crashed': True}
+        return self._reply(timeout)
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class TTSRenderService:
+    def __init__(self, processes=2, timeout=30.0, startup_timeout=20.0, rate=160, volume=0.9):
+        self.processes = processes
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.rate = rate
+        self.volume = volume
+        self.voice = None
+        self.error = None
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.workers = 0
+        self.counters = {'renders': 0, 'failures': 0, 'timeouts': 0, 'crashes': 0, 'restarts': 0, 'busy': 0,
+                         'seconds': 0.0}
+
+    def start(self):
+        """Launch the worker processes in parallel; the service is available if at least one starts"""
+        with ThreadPoolExecutor(max_workers=self.processes) as executor:
+            futures = [executor.submit(self._spawn) for _ in range(self.processes)]
+        for future in futures:
+            try:
+                worker = future.result()
+            except Exception as e:
+                self.error = str(e)
+                continue
+            self.voice = self.voice or worker.voice
+            self.idle.put(worker)
+        if self.available:
+            print(f"✅ pyttsx3 render service ready ({self.workers} processes)")
+        else:
+            print(f"⚠️ pyttsx3 not available, using gTTS only: {self.error}")
+        return self
+
+    def _spawn(self):
+        worker = RenderWorker(self.rate, self.volume, self.startup_timeout)
+        with self.lock:
+            self.workers += 1
+        return worker
+
+    @property
+    def available(self):
+        return self.workers > 0
+
+    def render(self, text, path):
+        """Render text to a WAV file at path on an idle worker, replacing the worker if it hangs or dies"""
+        if not self.available:
+            raise TTSRenderError(f"pyttsx3 render service is not available: {self.error}")
+        try:
+            worker = self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self._count('busy')
+            raise TTSRenderError(f"No pyttsx3 worker free within {self.timeout}s")
+
+        started = time.time()
+        if not worker.alive:
+            # Died while idle; replace it before use
+            self._count('crashes')
+            worker = self._respawn(worker)
+            if worker is None:
+                raise TTSRenderError("pyttsx3 worker could not be restarted")
+
+        reply = worker.render(text, path, self.timeout)
+        if reply.get('timed_out') or reply.get('crashed'):
+            self._count('timeouts' if reply.get('timed_out') else 'crashes')
+        if reply.get('timed_out') or reply.get('crashed') or reply.get('restart'):
+            # Restarted off the request path; the slot comes back once the new process is up
+            threading.Thread(target=self._restore, args=(worker,), daemon=True).start()
+        else:
+            self.idle.put(worker)
+
+        with self.lock:
+            self.counters['renders' if reply.get('ok') else 'failures'] += 1
+            self.counters['seconds'] += time.time() - started
+        if not reply.get('ok'):
+            raise TTSRenderError(reply.get('error', 'render failed'))
+
+    def _respawn(self, worker):
+        """Kill a bad worker and start its replacement; None if the replacement fails to start"""
+        worker.kill()
+        with self.lock:
+            self.workers -= 1
+        try:
+            replacement = self._spawn()
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ Could not restart pyttsx3 worker: {e}")
+            return None
+        self._count('restarts')
+        return replacement
+
+    def _restore(self, worker):
+        replacement = self._respawn(worker)
+        if replacement:
+            self.idle.put(replacement)
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            finished = self.counters['renders'] + self.counters['failures']
+            return {
+                **self.counters,
+                'available': self.available,
+                'processes': self.workers,
+                'idle': self.idle.qsize(),
+                'voice': self.voice,
+                'avg_ms': round(self.counters['seconds'] / finished * 1000, 1) if finished else 0.0
+            }
+
+    def shutdown(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.kill()
+
+
+def run_worker(rate, volume):
+    """Worker process main loop: one pyttsx3 engine, one render at a time"""
+    # Keep the protocol stream private; anything the engine prints goes to stderr
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w', buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def reply(**message):
+        channel.write(json.dumps(message) + '\n')
+
+    try:
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        for voice in engine.getProperty('voices'):
+            if any(keyword in voice.name.lower() for keyword in PREFERRED_VOICES):
+                engine.setProperty('voice', voice.id)
+                break
+        engine.setProperty('rate', rate)
+        engine.setProperty('volume', volume)
+    except Exception as e:
+        reply(ready=False, error=f'{type(e).__name__}: {e}')
+        return
+    reply(ready=True, voice=engine.getProperty('voice'))
+
+    for line in sys.stdin:
+        try:
+            job = json.loads(line)
+            engine.save_to_file(job['text'], job['path'])
+            engine.runAndWait()
+            if not os.path.exists(job['path']) or not os.path.getsize(job['path']):
+                raise RuntimeError('engine produced no audio')
+            reply(ok=True)
+        except Exception as e:
+            # The engine may be left mid-utterance; exit and let the parent start a clean one
+            reply(ok=False, error=f'{type(e).__name__}: {e}', restart=True)
+            return
+
+
+if __name__ == '__main__':
+    if '--worker' in sys.argv:
+        arguments = dict(zip(sys.argv[2::2], sys.argv[3::2]))
+        run_worker(int(arguments.get('--rate', 160)), float(arguments.get('--volume', 0.9)))
@@ -0,0 +1,79 @@
+"""
+Startup warm-up for PrepIQ Interview Simulator
+Runs the slow one-off setup (model loading, worker processes, client connections, pre-rendered
+phrases) in the background before traffic arrives and reports readiness for health checks
+"""
+
+import threading
+import time
+
+
+class WarmupStage:
+    def __init__(self, name, run, required=True):
+        self.name = name
+        self.run = run
+        # A failed optional stage leaves the server usable but degraded; a failed required one keeps it unready
+        self.required = required
+        self.status = 'pending'
+        self.seconds = 0.0
+        self.error = None
+        self.detail = None
+
+
+class Warmup:
+    def __init__(self, stages):
+        self.stages = stages
+        self.started_at = None
+        self.finished_at = None
+        self.ready = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Run every stage in order on a background thread"""
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self.run, daemon=True, name='warmup')
+        self.thread.start()
+        return self
+
+    def run(self):
+        for stage in self.stages:
+            stage.status = 'running'
+            started = time.time()
+            try:
+                stage.detail = stage.run()
+                stage.status = 'ok'
+            except Exception as e:
+                stage.status = 'failed'
+                stage.error = f'{type(e).__name__}: {e}'
+                print(f"⚠️ Warm-up stage '{stage.name}' failed: {e}")
+            stage.seconds = time.time() - started
+
+        self.finished_at = time.time()
+        if not any(stage.required and stage.status == 'failed' for stage in self.stages):
+            self.ready.set()
+        print(f"🔥 Warm-up finished in {self.finished_at - self.started_at:.1f}s ({self.status})")
+
+    @property
+    def status(self):
+        if self.finished_at is None:
+            return 'starting'
+        if not self.ready.is_set():
+            return 'failed'
+        return 'degraded' if any(stage.status == 'failed' for stage in self.stages) else 'ready'
+
+    def health(self):
+        return {
+            'status': self.status,
+            'ready': self.ready.is_set(),
+            'seconds': round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else 0.0,
+            'stages': {
+                stage.name: {
+                    'status': stage.status,
+                    'required': stage.required,
+                    'seconds': round(stage.seconds, 2),
+                    **({'error': stage.error} if stage.error else {}),
+                    **({'detail': stage.detail} if stage.detail is not None else {})
+                }
+                for stage in self.stages
+            }
+        }